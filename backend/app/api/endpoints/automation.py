@@ -1,4 +1,7 @@
+import json
+from itertools import chain
 from fastapi import APIRouter, HTTPException, Body
+from fastapi.responses import StreamingResponse
 from typing import Dict, Any, Optional, List
 from pydantic import BaseModel
 from datetime import datetime
@@ -10,7 +13,8 @@ from ...services.automation import (
     restart_failed_emails,
     get_automation_status,
     get_automation_settings,
-    update_automation_settings
+    update_automation_settings,
+    preview_emails
 )
 import logging
 
@@ -65,6 +69,14 @@ class EmailLogEntry(BaseModel):
     error_message: Optional[str] = None
 
 
+class PreviewRequest(BaseModel):
+    templateId: Optional[str] = None  # Defaults to the automation template
+    status: str = "Pending"
+    limit: Optional[int] = 1000
+    includeBody: bool = False
+    stream: bool = False  # Return newline-delimited JSON, one line per email
+
+
 class SMTPValidationRequest(BaseModel):
     smtpServer: str
     port: int 
@@ -273,6 +285,61 @@ async def update_template(template_id: str):
         raise HTTPException(status_code=500, detail="Failed to update automation template")
 
 
+@router.post("/preview")
+def preview(request: PreviewRequest = Body(PreviewRequest())):
+    """
+    Render a template against email records without sending anything.
+    
+    Returns the size and SHA-256 of every rendered body (and the bodies
+    themselves with includeBody). With stream, results are sent as
+    newline-delimited JSON while rows are still being rendered, followed by
+    a final {"done": true, ...} line, or an {"error": ...} line if the preview
+    failed part way.
+    """
+    try:
+        template_id = request.templateId or get_automation_settings().get("template_id")
+        items = preview_emails(template_id, request.status, request.limit, request.includeBody)
+        
+        if request.stream:
+            # Render the first row before responding, so an early failure is still a 500
+            first = next(items, None)
+            items = chain([first], items) if first is not None else iter(())
+            return StreamingResponse(_preview_lines(items), media_type="application/x-ndjson")
+            
+        items = list(items)
+        return {
+            "success": True,
+            "data": {
+                "templateId": template_id,
+                "status": request.status,
+                "count": len(items),
+                "totalBytes": sum(item["size"] for item in items),
+                "items": items
+            }
+        }
+    except Exception as e:
+        logger.error(f"Error previewing emails: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to preview emails")
+
+
+def _preview_lines(items):
+    """NDJSON lines for a streamed preview, ending with a summary or error line"""
+    count = 0
+    total_bytes = 0
+    try:
+        for item in items:
+            count += 1
+            total_bytes += item["size"]
+            yield json.dumps(item, default=str) + "\n"
+    except Exception as e:
+        # Headers are already sent, so the failure is reported in the stream itself
+        logger.error(f"Error previewing emails: {str(e)}")
+        yield json.dumps({"error": "Failed to preview emails", "count": count}) + "\n"
+        return
+        
+    yield json.dumps({"done": True, "count": count, "totalBytes": total_bytes}) + "\n"
+
+
 @router.post("/validate-smtp")
 async def validate_smtp(settings: SMTPValidationRequest):
     """
@@ -402,20 +469,23 @@ async def debug_env():
 
 
 @router.get("/logs")
-async def get_logs(limit: int = 100, filter_status: Optional[str] = None):
+async def get_logs(limit: int = 100, filter_status: Optional[str] = None,
+                   email_id: Optional[int] = None, process_id: Optional[str] = None):
     """
     Get the most recent email automation logs.
     
     Args:
         limit: Maximum number of log entries to return
         filter_status: Filter logs by status (success, failed, pending)
+        email_id: Only logs of this email
+        process_id: Only logs of this automation process
         
     Returns:
         List of log entries
     """
     try:
         from ...utils.email_logger import email_logger
-        logs = email_logger.get_recent_logs(limit, filter_status)
+        logs = email_logger.get_recent_logs(limit, filter_status, email_id=email_id, process_id=process_id)
         
         return {
             "success": True,
@@ -427,20 +497,25 @@ async def get_logs(limit: int = 100, filter_status: Optional[str] = None):
 
 
 @router.get("/logs/frontend")
-async def get_frontend_logs(limit: int = 50, filter_status: Optional[str] = None):
+async def get_frontend_logs(limit: int = 50, filter_status: Optional[str] = None,
+                            email_id: Optional[int] = None, process_id: Optional[str] = None):
     """
     Get cleaned and deduplicated logs specifically for frontend display.
     
     Args:
         limit: Maximum number of log entries to return
         filter_status: Filter logs by status (success, failed, pending)
+        email_id: Only logs of this email
+        process_id: Only logs of this automation process
         
     Returns:
         List of cleaned log entries optimized for frontend display
     """
     try:
         from ...utils.email_logger import email_logger
-        raw_logs = email_logger.get_recent_logs(limit * 3, filter_status)  # Get more to filter
+        raw_logs = email_logger.get_recent_logs(
+            limit * 3, filter_status, email_id=email_id, process_id=process_id
+        )  # Get more to filter
         
         # Clean and format logs for frontend
         cleaned_logs = []
@@ -532,12 +607,16 @@ async def clear_logs():
 
 
 @router.post("/archive/cleanup")
-async def cleanup_archive(days: int = Body(30)):
+async def cleanup_archive(days: int = Body(30), max_cache_mb: Optional[int] = Body(None)):
     """
     Clean up the email archive by removing .zip files older than the specified days.
     
+    Cached attachment archives count as used whenever they are reused, and the
+    cache is then trimmed to its size limit, least recently used first.
+    
     Args:
         days: Number of days to keep files for (files older than this will be deleted)
+        max_cache_mb: Size to trim the attachment cache to (defaults to ATTACHMENT_CACHE_MAX_MB)
         
     Returns:
         Number of files deleted
@@ -547,6 +626,7 @@ async def cleanup_archive(days: int = Body(30)):
         import time
         from datetime import datetime, timedelta
         from ...services.email import get_archive_path
+        from ...services.email.core.compression_cache import get_compression_cache
         from pathlib import Path
         
         archive_path = get_archive_path()
@@ -560,7 +640,8 @@ async def cleanup_archive(days: int = Body(30)):
         
         # Ensure the archive path exists
         if os.path.exists(archive_path):
-            for file_path in Path(archive_path).glob('*.zip'):
+            # Also sweeps .partial files left behind by a crash mid-compression
+            for file_path in [*Path(archive_path).glob('*.zip'), *Path(archive_path).glob('*.partial')]:
                 try:
                     # Get the file's modification time
                     file_mtime = os.path.getmtime(file_path)
@@ -577,10 +658,17 @@ async def cleanup_archive(days: int = Body(30)):
                 except Exception as e:
                     logger.error(f"Error processing file {file_path}: {str(e)}")
         
+        # Trim the attachment cache, forgetting archives the age-based pass removed
+        cache = get_compression_cache(archive_path)
+        cache.forget_missing()
+        evicted = cache.evict(max_cache_mb * 1024 * 1024 if max_cache_mb is not None else None)
+        
         return {
             "success": True,
-            "message": f"Archive cleaned up successfully. {count} files older than {days} days removed.",
-            "filesDeleted": count
+            "message": f"Archive cleaned up successfully. {count} files older than {days} days removed, {evicted} cached archives evicted.",
+            "filesDeleted": count + evicted,
+            "cacheEvicted": evicted,
+            "cache": cache.stats()
         }
     except Exception as e:
         logger.error(f"Error cleaning up archive: {str(e)}")
@@ -25,6 +25,14 @@ class Settings(BaseSettings):
     DB_PASSWORD: str
     DB_DRIVER: str
     
+    # Database connection pool settings
+    DB_POOL_MIN_SIZE: int = 1
+    DB_POOL_MAX_SIZE: int = 10
+    DB_POOL_IDLE_TIMEOUT: int = 300  # Seconds an idle connection above min size is kept
+    DB_POOL_MAX_LIFETIME: int = 1800  # Seconds before a connection is recycled
+    DB_POOL_VALIDATION_INTERVAL: int = 30  # Validate on checkout if idle longer than this
+    DB_POOL_ACQUIRE_TIMEOUT: int = 30  # Seconds to wait for a free connection
+    
     # Table names
     EMAIL_TABLE: str
     
@@ -35,21 +43,65 @@ class Settings(BaseSettings):
     EMAIL_PASSWORD: Optional[str] = None
     SMTP_TLS: Optional[str] = "True"
     SENDER_EMAIL: Optional[str] = None
+    SMTP_MAX_MESSAGES_PER_SESSION: int = 100  # Reconnect after this many messages
+    SMTP_KEEPALIVE_SECONDS: float = 30.0  # NOOP-check a session idle longer than this
+    SMTP_POOL_SIZE: int = 4  # Persistent SMTP sessions per sender
+    SMTP_MAX_CONCURRENCY_PER_SERVER: int = 10  # Concurrent sends allowed towards one SMTP server
+    SMTP_THROTTLE_BACKOFF_SECONDS: float = 1.0  # First pause after a 421/4xx throttling reply
+    SMTP_THROTTLE_BACKOFF_MAX_SECONDS: float = 60.0
+    SMTP_THROTTLE_MAX_RETRIES: int = 3  # Retries for a message that was throttled
     
     # Path configurations - must be read from environment variables
     EMAIL_ARCHIVE_PATH: str
     LOG_DIR_PATH: str
     DEFAULT_EMAIL_TEMPLATE_PATH: Optional[str] = "templates/default_template.txt"
+    TEMPLATE_VALIDATE_ON_STARTUP: bool = True  # Validate every template file in the background on startup
     
     # Email attachment size limits (in MB)
     EMAIL_MAX_SIZE_MB: int = 25
     EMAIL_SAFE_SIZE_MB: int = 20
     GDRIVE_UPLOAD_THRESHOLD_MB: int = 20
     
+    # Compressed attachment cache (archives are reused while a folder is unchanged)
+    FOLDER_SCAN_CACHE_SECONDS: float = 60.0  # Reuse a folder's size for this long while its directories are unchanged
+    FOLDER_SCAN_WORKERS: int = 8  # Threads prefetching attachment folders for claimed emails
+    ATTACHMENT_CACHE_ENABLED: bool = True
+    ATTACHMENT_CACHE_MAX_MB: int = 2048  # Least recently used archives are evicted beyond this
+    ATTACHMENT_CACHE_HASH_CONTENTS: bool = False  # Also hash file contents, not just sizes and mtimes
+    ATTACHMENT_ESTIMATE_MARGIN: float = 0.1  # Relative error allowed for before an attachment is rejected on its predicted size
+    ATTACHMENT_COMPRESSION_LEVEL: int = 6  # zlib level 0-9 for files that are not already compressed
+    ATTACHMENT_IN_MEMORY_MAX_MB: int = 0  # Folders up to this size are zipped in memory with no archive copy (0 = always archive)
+    ATTACHMENT_MEMORY_CACHE_MB: int = 64  # In-memory zips kept for later recipients of the same folder (0 = not kept)
+    ATTACHMENT_PARALLEL_ZIP_MIN_MB: int = 50  # Folders at least this big are deflated file-by-file across the compression processes
+    
+    # Automation worker pool / pipeline stages
+    AUTOMATION_WORKERS: int = 4  # Threads sending emails in parallel
+    AUTOMATION_RENDER_WORKERS: int = 2  # Threads for mapping checks and template rendering
+    AUTOMATION_COMPRESS_WORKERS: int = 2  # Threads for compression, Drive uploads and message building
+    AUTOMATION_PERSIST_WORKERS: int = 1  # Threads recording outcomes
+    AUTOMATION_STAGE_QUEUE_SIZE: int = 16  # Emails buffered between pipeline stages
+    AUTOMATION_LOAD_PAGE_SIZE: int = 500  # Records fetched per keyset page when streaming emails by status (campaign preview)
+    AUTOMATION_CLAIM_BATCH_SIZE: int = 50  # Pending records leased per claim, so several instances can share the table
+    AUTOMATION_LEASE_SECONDS: int = 900  # Claimed records are reclaimable by any instance after this long
+    AUTOMATION_COMPRESSION_PROCESSES: int = 0  # Processes for zipping attachments (0 = compress in the worker thread)
+    AUTOMATION_ENGINE: str = "threaded"  # "threaded" or "asyncio" (requires aiosmtplib)
+    AUTOMATION_ASYNC_CONCURRENCY: int = 100  # Emails in flight at once with the asyncio engine
+    AUTOMATION_ASYNC_MAX_SENDS: int = 20  # Messages built or being delivered at once with the asyncio engine
+    
+    # Automation status write-back batching
+    AUTOMATION_STATUS_BATCH_SIZE: int = 50  # Flush after this many status updates
+    AUTOMATION_STATUS_FLUSH_SECONDS: float = 5.0  # ...or once the oldest buffered update is this old
+    
 # Google Drive configuration
     GDRIVE_CREDENTIALS_PATH: Optional[str] = "credentials/oauth_credentials.json"
     GDRIVE_TOKEN_PATH: Optional[str] = "credentials/token.pickle"
     GDRIVE_FOLDER_ID: Optional[str] = None  # Optional folder ID for uploads
+    GDRIVE_TOKEN_REFRESH_MARGIN_SECONDS: int = 300  # Refresh the OAuth token this long before it expires
+    GDRIVE_UPLOAD_CHUNK_MB: float = 8  # Resumable upload chunk size (rounded to a multiple of 256 KB)
+    GDRIVE_UPLOAD_MAX_RETRIES: int = 5  # Resume attempts after transient errors, per chunk
+    GDRIVE_UPLOAD_WORKERS: int = 4  # Uploads running at once across the process
+    GDRIVE_DEDUP_ENABLED: bool = True  # Upload an archive once and share the same Drive file with later recipients ('anyone' links only)
+    GDRIVE_DEDUP_TTL_HOURS: float = 24  # Upload again after this long instead of reusing the Drive file
 
     # Server environment flag
     SERVER_ENV: Optional[str] = "false"  # Use 'true' to enable non-interactive mode
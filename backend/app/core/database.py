@@ -1,10 +1,8 @@
 """
 Database - Module for database connection handling
 """
-import pyodbc
-from ..utils.db_utils import get_connection_string
+from ..services.database.core.connection_manager import get_connection_manager
 
 def get_db_connection():
-    """Create and return a connection to the database."""
-    conn_str = get_connection_string()
-    return pyodbc.connect(conn_str)
+    """Borrow a connection to the database from the shared pool."""
+    return get_connection_manager().get_connection()
@@ -3,6 +3,7 @@ from fastapi.middleware.cors import CORSMiddleware
 import logging
 import sys
 import os
+import threading
 from .api.endpoints import database, emails, automation
 from .api import email_records_router
 from .core.config import settings
@@ -56,6 +57,23 @@ from .api.endpoints import templates
 app.include_router(templates.router, prefix="/api/templates", tags=["templates"])
 
 
+@app.on_event("startup")
+def validate_templates_on_startup():
+    """Validate all template files in the background, logging any that have issues."""
+    if not settings.TEMPLATE_VALIDATE_ON_STARTUP:
+        return
+        
+    from .services.templates import validate_template_directory
+    threading.Thread(target=validate_template_directory, name="template-validate", daemon=True).start()
+
+
+@app.on_event("shutdown")
+def close_db_pool():
+    """Close pooled database connections on application shutdown."""
+    from .services.database.core.connection_manager import get_connection_manager
+    get_connection_manager().close()
+
+
 @app.get("/")
 async def root():
     """Root endpoint to verify API is running."""
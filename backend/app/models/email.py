@@ -6,6 +6,7 @@ from enum import Enum
 
 class EmailStatus(str, Enum):
     PENDING = "Pending"
+    PROCESSING = "Processing"
     FAILED = "Failed"
     SUCCESS = "Success"
 
@@ -18,6 +18,10 @@ from .scheduling.scheduler import (
     get_schedule_settings
 )
 
+from .processing.preview import (
+    preview_emails
+)
+
 from .database.status_repository import (
     update_email_status
 )
@@ -37,6 +41,7 @@ __all__ = [
     'stop_scheduler',
     'update_schedule_settings',
     'get_schedule_settings',
+    'preview_emails',
     'update_email_status',
     '_validate_recipient_mapping'
 ]
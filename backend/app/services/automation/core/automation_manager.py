@@ -13,7 +13,6 @@ a complete email automation solution.
 """
 
 import logging
-import queue
 import threading
 from datetime import datetime
 from typing import Dict, Any
@@ -22,8 +21,11 @@ from ....models.email import EmailStatus
 from ....utils.email_logger import email_logger
 from ....core.config import get_settings
 from ....utils.db_utils import get_db_connection
-from ..database.email_repository import _load_emails_by_status
-from ..processing.email_processor import _process_email_queue
+from ..database.email_repository import (
+    _count_emails_by_status,
+    ClaimedEmailStream
+)
+from ..processing.email_processor import _process_email_queue, _prefetch_attachment_folders
 from ..processing.batch_processor import _update_summary
 from .state_manager import get_automation_state
 
@@ -44,18 +46,17 @@ def start_automation() -> Dict[str, Any]:
         process_id = f"auto_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
         email_logger.start_process(process_id, "Email Automation Process")
         
-        emails_to_process = _load_emails_by_status(EmailStatus.PENDING.value)
-        automation_state["summary"]["pending"] = len(emails_to_process)
+        pending_count = _count_emails_by_status(EmailStatus.PENDING.value)
+        automation_state["summary"]["pending"] = pending_count
         
-        if not emails_to_process:
+        if not pending_count:
             email_logger.end_process(process_id, "completed", "No pending emails to process")
             logger.info("No pending emails to process")
             return get_automation_status()
         
-        automation_state["email_queue"] = queue.Queue()
-        
-        for email in emails_to_process:
-            automation_state["email_queue"].put(email)
+        # Records are claimed in small leased batches while the run goes, so sending
+        # starts right away and other instances can work through the same table
+        automation_state["email_source"] = ClaimedEmailStream(on_batch=_prefetch_attachment_folders)
         
         automation_state["process_id"] = process_id
         automation_state["is_running"] = True
@@ -66,7 +67,7 @@ def start_automation() -> Dict[str, Any]:
         )
         automation_state["automation_thread"].start()
         
-        email_logger.log_info(f"Started email automation with {len(emails_to_process)} pending emails to process", process_id=process_id)
+        email_logger.log_info(f"Started email automation with {pending_count} pending emails to process", process_id=process_id)
         return get_automation_status()
         
     except Exception as e:
@@ -115,52 +116,38 @@ def restart_failed_emails() -> Dict[str, Any]:
         email_logger.start_process(process_id, "Failed Email Retry Process")
         email_logger.log_info("🔄 Starting automation process: Failed Email Retry Process", process_id=process_id)
         
-        # Get failed emails only
+        # Reset failed emails back to pending, keeping their IDs so only they are retried
         conn = get_db_connection()
         cursor = conn.cursor()
         settings = get_settings()
         
-        # First, get the count of failed emails only
-        check_query = f"""
-            SELECT COUNT(*) FROM {settings.EMAIL_TABLE}
-            WHERE Email_Status = ?
-        """
-        
-        cursor.execute(check_query, [EmailStatus.FAILED.value])
-        failed_count = cursor.fetchone()[0]
-        
-        if failed_count == 0:
-            email_logger.log_info("❌ No failed emails to restart", process_id=process_id)
-            email_logger.end_process(process_id, "completed", "No failed emails to restart")
-            return get_automation_status()
-            
-        email_logger.log_info(f"❌ Found {failed_count} failed emails to restart", process_id=process_id)
-        
-        # Get all failed emails
-        failed_emails = _load_emails_by_status(EmailStatus.FAILED.value)
-        
-        # Update status back to pending for only the failed emails
         update_query = f"""
             UPDATE {settings.EMAIL_TABLE}
             SET Email_Status = ?
+            OUTPUT inserted.Email_ID
             WHERE Email_Status = ?
         """
         
         cursor.execute(update_query, [EmailStatus.PENDING.value, EmailStatus.FAILED.value])
+        failed_email_ids = [row[0] for row in cursor.fetchall()]
         conn.commit()
         
-        # Create a queue specifically for these emails
-        automation_state["email_queue"] = queue.Queue()
-        
-        # Put all previously failed (now pending) emails into the queue
-        for email in failed_emails:
-            # Update the status in our local copy to match what we just did in the database
-            email["Email_Status"] = EmailStatus.PENDING.value
-            automation_state["email_queue"].put(email)
+        if not failed_email_ids:
+            email_logger.log_info("❌ No failed emails to restart", process_id=process_id)
+            email_logger.end_process(process_id, "completed", "No failed emails to restart")
+            return get_automation_status()
             
-            # Track this email in the process
-            if 'Email_ID' in email and email['Email_ID']:
-                email_logger.add_email_to_process(process_id, email['Email_ID'])
+        email_logger.log_info(f"❌ Found {len(failed_email_ids)} failed emails to restart", process_id=process_id)
+        
+        # Track the reset emails in the process
+        for email_id in failed_email_ids:
+            email_logger.add_email_to_process(process_id, email_id)
+        
+        # Only the reset emails are claimed, not every Pending row in the table
+        automation_state["email_source"] = ClaimedEmailStream(
+            on_batch=_prefetch_attachment_folders,
+            email_ids=failed_email_ids
+        )
         
         # Store process ID in automation state
         automation_state["process_id"] = process_id
@@ -178,7 +165,7 @@ def restart_failed_emails() -> Dict[str, Any]:
         automation_state["automation_thread"].start()
         
         # Enhanced logging with more details and consistent formatting with normal process
-        email_logger.log_info(f"🔄 Started reprocessing of {len(failed_emails)} previously failed emails", process_id=process_id)
+        email_logger.log_info(f"🔄 Started reprocessing of {len(failed_email_ids)} previously failed emails", process_id=process_id)
         
         return get_automation_status()
             
@@ -204,8 +191,12 @@ def get_automation_status() -> Dict[str, Any]:
     if not automation_state["is_running"]:
         _update_summary()
     
+    # Per-stage throughput and queue depth of the current (or last) run
+    pipeline = automation_state.get("pipeline")
+    
     return {
         "status": automation_state["status"],
         "lastRun": automation_state["last_run"].isoformat() if automation_state["last_run"] else None,
-        "summary": automation_state["summary"]
+        "summary": automation_state["summary"],
+        "pipeline": pipeline.stats() if pipeline else None
     }
@@ -30,12 +30,28 @@ _automation_state = {
         "lastRun": None,
         "nextRun": None
     },
-    "email_queue": None,
+    "email_source": None,
+    "pipeline": None,
     "scheduler_thread": None,
     "scheduler_running": False
 }
 
 
+# Guards summary counters and processed_emails while several workers are running
+_summary_lock = threading.Lock()
+
+
 def get_automation_state() -> dict:
     return _automation_state
 
+
+def get_summary_lock() -> threading.Lock:
+    return _summary_lock
+
+
+def increment_summary(**counts: int):
+    """Atomically add to the counters in the automation summary"""
+    with _summary_lock:
+        for key, amount in counts.items():
+            _automation_state["summary"][key] += amount
+
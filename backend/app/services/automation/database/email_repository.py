@@ -1,7 +1,11 @@
 """Email repository for database operations"""
 
 import logging
-from typing import List, Tuple
+import os
+import socket
+import uuid
+from threading import Event, Lock, Thread
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
 
 from ....utils.db_utils import get_db_connection
 from ....core.config import get_settings
@@ -9,38 +13,345 @@ from ....core.config import get_settings
 logger = logging.getLogger(__name__)
 
 
-def _load_emails_by_status(status) -> List[dict]:
-    """Load email records from the database by status"""
+def _count_emails_by_status(status) -> int:
+    """Count email records with a status"""
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
         settings = get_settings()
         
         query = f"""
-            SELECT Email_ID, Company_Name, Email, Subject, File_Path, 
-                   Email_Send_Date, Email_Status, Date, Reason 
-            FROM {settings.EMAIL_TABLE}
+            SELECT COUNT(*) FROM {settings.EMAIL_TABLE}
             WHERE Email_Status = ?
-            ORDER BY Email_Send_Date
         """
         
         cursor.execute(query, [status])
+        return cursor.fetchone()[0]
+    except Exception as e:
+        logger.error(f"Error counting emails with status '{status}': {str(e)}")
+        return 0
+    finally:
+        if 'conn' in locals():
+            conn.close()
+
+
+def _iter_emails_by_status(status, page_size: Optional[int] = None, strict: bool = False) -> Iterator[dict]:
+    """
+    Stream email records by status, ordered by (Email_Send_Date, Email_ID).
+    
+    Uses keyset pagination so only one page is held in memory and every page is
+    an index seek past the last row seen rather than an OFFSET scan. A connection
+    is borrowed from the pool per page, not for the whole iteration.
+    
+    A failed page query is logged and ends the iteration, or is raised with
+    strict, for callers that must tell a short result from a failed one.
+    """
+    settings = get_settings()
+    page_size = max(1, page_size or settings.AUTOMATION_LOAD_PAGE_SIZE)
+    
+    select = f"""
+        SELECT TOP (?) Email_ID, Company_Name, Email, Subject, File_Path, 
+               Email_Send_Date, Email_Status, Date, Reason 
+        FROM {settings.EMAIL_TABLE}
+        WHERE Email_Status = ?
+    """
+    order = "ORDER BY Email_Send_Date, Email_ID"
+    first_page_query = f"{select} {order}"
+    # SQL Server sorts NULL dates first, so rows without a date come before all dated rows
+    after_null_date_query = f"""{select}
+          AND ((Email_Send_Date IS NULL AND Email_ID > ?) OR Email_Send_Date IS NOT NULL)
+        {order}"""
+    after_date_query = f"""{select}
+          AND (Email_Send_Date > ? OR (Email_Send_Date = ? AND Email_ID > ?))
+        {order}"""
+        
+    last_row = None
+    while True:
+        conn = None
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+            
+            if last_row is None:
+                cursor.execute(first_page_query, [page_size, status])
+            elif last_row["Email_Send_Date"] is None:
+                cursor.execute(after_null_date_query, [page_size, status, last_row["Email_ID"]])
+            else:
+                send_date = last_row["Email_Send_Date"]
+                cursor.execute(after_date_query, [page_size, status, send_date, send_date, last_row["Email_ID"]])
+                
+            columns = [column[0] for column in cursor.description]
+            page = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Error loading emails with status '{status}': {str(e)}")
+            if strict:
+                raise
+            return
+        finally:
+            if conn:
+                conn.close()
+                
+        yield from page
+        
+        if len(page) < page_size:
+            return
+        last_row = page[-1]
+
+
+class EmailRecordStream:
+    """
+    Thread-safe source of email records for an automation run.
+    
+    Wraps a (possibly lazy) iterable so several workers can take records one at
+    a time; next_record returns None once the records are exhausted.
+    """
+    
+    # Claim owner of the records, if they are leased (see ClaimedEmailStream)
+    lease_owner: Optional[str] = None
+    
+    def __init__(self, records: Iterable[dict]):
+        self._records = iter(records)
+        self._lock = Lock()
+        
+    def next_record(self) -> Optional[dict]:
+        """Take the next record, or None when there are no more"""
+        with self._lock:
+            return next(self._records, None)
+
+    def close(self):
+        """Stop any background work of the stream (call once the run is over)"""
+
+
+def _new_lease_owner() -> str:
+    """Claim owner for one automation run, unique across hosts, processes and runs"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _claim_emails(lease_owner: str,
+                  batch_size: Optional[int] = None,
+                  lease_seconds: Optional[int] = None,
+                  email_ids: Optional[Sequence[int]] = None) -> List[dict]:
+    """
+    Atomically claim a batch of emails for this run.
+    
+    Pending rows, and Processing rows whose lease has expired (their instance
+    stopped or died), are moved to Processing with this owner and a fresh lease
+    in a single UPDATE ... OUTPUT. UPDLOCK/READPAST make concurrent claims from
+    other instances skip rows that are being claimed instead of blocking on them
+    or taking them twice, so no per-row status check is needed afterwards.
+    
+    Args:
+        lease_owner: Claim owner of the run
+        batch_size: Maximum rows to claim
+        lease_seconds: Lease length
+        email_ids: Only claim among these Email_IDs (at most a few hundred per call)
+    
+    Returns:
+        The claimed records in (Email_Send_Date, Email_ID) order
+    """
+    settings = get_settings()
+    batch_size = max(1, batch_size or settings.AUTOMATION_CLAIM_BATCH_SIZE)
+    lease_seconds = max(1, lease_seconds or settings.AUTOMATION_LEASE_SECONDS)
+    
+    # Import here to avoid circular imports
+    from ....models.email import EmailStatus
+    
+    id_filter = ""
+    if email_ids is not None:
+        if not email_ids:
+            return []
+        id_filter = f"AND Email_ID IN ({', '.join('?' * len(email_ids))})"
+        
+    query = f"""
+        WITH claimable AS (
+            SELECT TOP (?) *
+            FROM {settings.EMAIL_TABLE} WITH (UPDLOCK, READPAST, ROWLOCK)
+            WHERE (Email_Status = ?
+               OR (Email_Status = ? AND Lease_Expires < GETUTCDATE()))
+              {id_filter}
+            ORDER BY Email_Send_Date, Email_ID
+        )
+        UPDATE claimable
+        SET Email_Status = ?,
+            Lease_Owner = ?,
+            Lease_Expires = DATEADD(SECOND, ?, GETUTCDATE())
+        OUTPUT inserted.Email_ID, inserted.Company_Name, inserted.Email, inserted.Subject,
+               inserted.File_Path, inserted.Email_Send_Date, inserted.Email_Status,
+               inserted.Date, inserted.Reason, deleted.Lease_Owner AS Previous_Lease_Owner
+    """
+    
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
         
+        cursor.execute(query, [
+            batch_size,
+            EmailStatus.PENDING.value,
+            EmailStatus.PROCESSING.value,
+            *(email_ids or ()),
+            EmailStatus.PROCESSING.value,
+            lease_owner,
+            lease_seconds
+        ])
         columns = [column[0] for column in cursor.description]
-        results = []
+        records = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        conn.commit()
         
-        for row in cursor.fetchall():
-            results.append(dict(zip(columns, row)))
+        reclaimed = [record["Email_ID"] for record in records if record["Previous_Lease_Owner"]]
+        if reclaimed:
+            logger.warning(f"Reclaimed {len(reclaimed)} emails with expired leases: {reclaimed}")
             
-        return results
+        # OUTPUT rows come back in no particular order
+        records.sort(key=lambda record: (record["Email_Send_Date"] is not None, record["Email_Send_Date"], record["Email_ID"]))
+        return records
     except Exception as e:
-        logger.error(f"Error loading emails with status '{status}': {str(e)}")
+        logger.error(f"Error claiming pending emails: {str(e)}")
         return []
     finally:
         if 'conn' in locals():
             conn.close()
 
 
+def _release_claims(lease_owner: str) -> int:
+    """
+    Return rows still held by a run to Pending (e.g. after a stop)
+    
+    Returns:
+        Number of rows released
+    """
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        settings = get_settings()
+        
+        # Import here to avoid circular imports
+        from ....models.email import EmailStatus
+        
+        query = f"""
+            UPDATE {settings.EMAIL_TABLE}
+            SET Email_Status = ?, Lease_Owner = NULL, Lease_Expires = NULL
+            WHERE Email_Status = ? AND Lease_Owner = ?
+        """
+        
+        cursor.execute(query, [EmailStatus.PENDING.value, EmailStatus.PROCESSING.value, lease_owner])
+        conn.commit()
+        return cursor.rowcount
+    except Exception as e:
+        logger.error(f"Error releasing claimed emails: {str(e)}")
+        return 0
+    finally:
+        if 'conn' in locals():
+            conn.close()
+
+
+def _renew_claims(lease_owner: str, lease_seconds: Optional[int] = None) -> int:
+    """
+    Extend the lease of every row a run still holds
+    
+    Claimed rows can wait in the pipeline queues or on a slow Drive upload for
+    longer than one lease, so a running stream renews them periodically;
+    otherwise another instance would reclaim and send them again.
+    
+    Returns:
+        Number of rows renewed, or -1 if the renewal failed
+    """
+    settings = get_settings()
+    lease_seconds = max(1, lease_seconds or settings.AUTOMATION_LEASE_SECONDS)
+    
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        # Import here to avoid circular imports
+        from ....models.email import EmailStatus
+        
+        query = f"""
+            UPDATE {settings.EMAIL_TABLE}
+            SET Lease_Expires = DATEADD(SECOND, ?, GETUTCDATE())
+            WHERE Email_Status = ? AND Lease_Owner = ?
+        """
+        
+        cursor.execute(query, [lease_seconds, EmailStatus.PROCESSING.value, lease_owner])
+        conn.commit()
+        return cursor.rowcount
+    except Exception as e:
+        logger.error(f"Error renewing email leases: {str(e)}")
+        return -1
+    finally:
+        if 'conn' in locals():
+            conn.close()
+
+
+class ClaimedEmailStream(EmailRecordStream):
+    """
+    Record source that leases emails from the table in small batches.
+    
+    The next batch is only claimed once the previous one has been handed out,
+    so each instance holds few rows at a time and several backend instances
+    can drain the same table in parallel. While the stream is open, a
+    background thread renews the leases of the rows it holds every third of a
+    lease, so rows still queued or sending are never reclaimed by another
+    instance. on_batch, if given, is called with each claimed batch before
+    its records are handed out; email_ids, if given, limits the claims to
+    those Email_IDs.
+    """
+    
+    def __init__(self,
+                 lease_owner: Optional[str] = None,
+                 batch_size: Optional[int] = None,
+                 on_batch: Optional[Callable[[List[dict]], None]] = None,
+                 email_ids: Optional[Iterable[int]] = None,
+                 lease_seconds: Optional[int] = None):
+        self.lease_owner = lease_owner or _new_lease_owner()
+        self.batch_size = max(1, batch_size or get_settings().AUTOMATION_CLAIM_BATCH_SIZE)
+        self.lease_seconds = max(1, lease_seconds or get_settings().AUTOMATION_LEASE_SECONDS)
+        self.on_batch = on_batch
+        self.email_ids = list(email_ids) if email_ids is not None else None
+        self._closed = Event()
+        self._heartbeat: Optional[Thread] = None
+        super().__init__(self._claim_batches())
+        
+    def _claim_batches(self) -> Iterator[dict]:
+        if self.email_ids is None:
+            batches = iter(lambda: _claim_emails(self.lease_owner, self.batch_size, self.lease_seconds), [])
+        else:
+            # One claim per slice of IDs keeps each statement well under the parameter limit
+            batches = (
+                _claim_emails(self.lease_owner, self.batch_size, self.lease_seconds,
+                              self.email_ids[start:start + self.batch_size])
+                for start in range(0, len(self.email_ids), self.batch_size)
+            )
+            
+        for batch in batches:
+            if not batch:
+                continue
+            self._start_heartbeat()
+            if self.on_batch:
+                try:
+                    self.on_batch(batch)
+                except Exception as e:
+                    logger.warning(f"Error handling claimed batch: {str(e)}")
+            yield from batch
+            
+    def _start_heartbeat(self):
+        if self._heartbeat is None and not self._closed.is_set():
+            self._heartbeat = Thread(target=self._renew_leases, name="email-lease-heartbeat", daemon=True)
+            self._heartbeat.start()
+            
+    def _renew_leases(self):
+        interval = max(1.0, self.lease_seconds / 3)
+        while not self._closed.wait(interval):
+            renewed = _renew_claims(self.lease_owner, self.lease_seconds)
+            if renewed > 0:
+                logger.debug(f"Renewed leases of {renewed} claimed emails")
+                
+    def close(self):
+        """Stop renewing leases; rows still held expire or are released by the caller"""
+        self._closed.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join(timeout=5)
+
+
 def _check_email_status(email_id: int) -> Tuple[bool, str]:
     """
     Check if email status is still Pending to prevent duplicate processing
@@ -0,0 +1,114 @@
+"""Buffered status write-back for the automation worker"""
+
+import logging
+import time
+from datetime import datetime
+from threading import Event, Lock, Thread
+from typing import List, Optional, Tuple
+
+from ....core.config import get_settings
+from .unit_of_work import AutomationUnitOfWork
+
+logger = logging.getLogger(__name__)
+
+
+class BufferedStatusWriter:
+    """
+    Collects email status outcomes and writes them in batches.
+    
+    Outcomes are flushed with one bulk UPDATE + commit once batch_size updates are
+    buffered or the oldest buffered update is flush_interval seconds old. The age
+    check also runs on a background thread, so outcomes are written on time even
+    while sends stall (SMTP backoff, long Drive uploads). Callers must call close()
+    when the run stops or fails so nothing is left behind.
+    """
+    
+    def __init__(self,
+                 unit_of_work: AutomationUnitOfWork,
+                 batch_size: Optional[int] = None,
+                 flush_interval: Optional[float] = None):
+        settings = get_settings()
+        self.unit_of_work = unit_of_work
+        self.batch_size = max(1, batch_size or settings.AUTOMATION_STATUS_BATCH_SIZE)
+        self.flush_interval = flush_interval if flush_interval is not None else settings.AUTOMATION_STATUS_FLUSH_SECONDS
+        
+        self._buffer: List[Tuple[int, str, Optional[str], Optional[datetime], Optional[datetime]]] = []
+        self._oldest: Optional[float] = None
+        self._lock = Lock()
+        self._closed = Event()
+        self._flusher = Thread(target=self._flush_periodically, name="email-status-flush", daemon=True)
+        self._flusher.start()
+        
+    def add(self,
+            email_id: int,
+            status: str,
+            reason: Optional[str] = None,
+            send_date: Optional[datetime] = None,
+            date: Optional[datetime] = None):
+        """Buffer a status outcome, flushing if the batch is full or old enough"""
+        with self._lock:
+            self._buffer.append((email_id, status, reason, send_date, date))
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+                
+            if len(self._buffer) >= self.batch_size or self._is_due_locked():
+                self._flush_locked()
+                
+    def flush_if_due(self) -> int:
+        """Write the buffered outcomes if the oldest one has waited flush_interval seconds"""
+        with self._lock:
+            return self._flush_locked() if self._is_due_locked() else 0
+                
+    def flush(self) -> int:
+        """Write all buffered outcomes now"""
+        with self._lock:
+            return self._flush_locked()
+            
+    def pending_count(self) -> int:
+        """Number of outcomes waiting to be written"""
+        with self._lock:
+            return len(self._buffer)
+            
+    def close(self) -> int:
+        """Stop the background flusher and write all buffered outcomes"""
+        self._closed.set()
+        self._flusher.join(timeout=max(5.0, self.flush_interval))
+        return self.flush()
+        
+    def _is_due_locked(self) -> bool:
+        return self._oldest is not None and time.monotonic() - self._oldest >= self.flush_interval
+        
+    def _flush_periodically(self):
+        interval = max(0.1, self.flush_interval / 2)
+        while not self._closed.wait(interval):
+            try:
+                self.flush_if_due()
+            except Exception as e:
+                logger.error(f"Error flushing email status updates: {str(e)}")
+            
+    def _flush_locked(self) -> int:
+        if not self._buffer:
+            return 0
+            
+        batch = self._buffer
+        self._buffer = []
+        self._oldest = None
+        
+        try:
+            written = self.unit_of_work.update_email_statuses(batch)
+            logger.debug(f"Flushed {written} email status updates")
+            return written
+        except Exception as e:
+            # Fall back to one statement per row so a single bad row cannot lose the batch
+            logger.warning(f"Batched status update failed, writing {len(batch)} updates individually: {str(e)}")
+            written = 0
+            unmatched = []
+            for email_id, status, reason, send_date, date in batch:
+                if self.unit_of_work.update_email_status(email_id, status, reason, send_date, date):
+                    written += 1
+                else:
+                    unmatched.append(email_id)
+            if unmatched:
+                logger.warning(f"{len(unmatched)} status updates were not written "
+                               f"(lease lost, record removed or write failed): {unmatched}")
+            return written
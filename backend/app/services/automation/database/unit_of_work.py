@@ -0,0 +1,243 @@
+"""Unit of work that keeps one database connection for a whole automation run"""
+
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Any
+
+import pyodbc
+
+from ....core.config import get_settings
+from ....utils.db_utils import get_db_connection
+from ....services.email.status.status_updater import build_status_update
+from ..validation.mapping_validator import _match_recipient_mapping
+
+logger = logging.getLogger(__name__)
+
+# Outcomes per bulk UPDATE; 5 parameters each keeps a statement under SQL Server's 2100 parameter limit
+_STATUS_UPDATE_CHUNK_SIZE = 400
+
+
+class AutomationUnitOfWork:
+    """
+    Holds a single pooled connection for the per-email database work of an automation run.
+    
+    Each distinct SQL statement gets its own cursor, so pyodbc keeps the statement
+    prepared and only re-binds parameters for the next email.
+    
+    Args:
+        lease_owner: Claim owner of the run (optional). Status updates then only
+            apply to rows this owner still holds, and release their lease.
+    """
+    
+    def __init__(self, lease_owner: Optional[str] = None):
+        self.lease_owner = lease_owner
+        self._connection = None
+        self._cursors: Dict[str, Any] = {}
+        self._email_state: Optional[Tuple[int, Optional[tuple]]] = None
+        
+        settings = get_settings()
+        self._state_query = f"""
+            SELECT Email_Status, Email, File_Path FROM {settings.EMAIL_TABLE}
+            WHERE Email_ID = ?
+        """
+        self._email_table = settings.EMAIL_TABLE
+        
+    def __enter__(self):
+        return self
+        
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        
+    @property
+    def connection(self):
+        """The connection held by this unit of work, borrowed on first use"""
+        if self._connection is None:
+            self._connection = get_db_connection()
+        return self._connection
+        
+    def close(self):
+        """Close the cached cursors and return the connection to the pool"""
+        for cursor in self._cursors.values():
+            try:
+                cursor.close()
+            except Exception:
+                pass
+        self._cursors = {}
+        self._email_state = None
+        
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            finally:
+                self._connection = None
+                
+    def _execute(self, query: str, params, retry: bool = True):
+        """Execute a statement on its dedicated cursor, reconnecting once if the connection dropped"""
+        try:
+            cursor = self._cursors.get(query)
+            if cursor is None:
+                cursor = self.connection.cursor()
+                self._cursors[query] = cursor
+            cursor.execute(query, params)
+            return cursor
+        except pyodbc.Error as e:
+            if not retry:
+                raise
+            logger.warning(f"Automation database connection failed, reconnecting: {str(e)}")
+            self.close()
+            return self._execute(query, params, retry=False)
+            
+    def _load_email_state(self, email_id: int) -> Optional[tuple]:
+        """Fetch (status, email, file path) for an email, reusing the row for the current email"""
+        if self._email_state and self._email_state[0] == email_id:
+            return self._email_state[1]
+            
+        row = self._execute(self._state_query, [email_id]).fetchone()
+        self._email_state = (email_id, tuple(row) if row else None)
+        return self._email_state[1]
+        
+    def validate_recipient_mapping(self, email_id: int, recipient: str, file_path: str) -> Tuple[bool, Optional[str]]:
+        """Validate that the recipient email matches the Email_id in the database"""
+        try:
+            state = self._load_email_state(email_id)
+            
+            if not state:
+                return False, f"No email record found with ID {email_id}"
+                
+            _, db_email, db_file_path = state
+            return _match_recipient_mapping(recipient, file_path, db_email, db_file_path)
+        except Exception as e:
+            logger.error(f"Error validating recipient mapping: {str(e)}")
+            return False, f"Error validating recipient: {str(e)}"
+            
+    def update_email_status(
+        self,
+        email_id: int,
+        status: str,
+        reason: Optional[str] = None,
+        send_date: Optional[datetime] = None,
+        date: Optional[datetime] = None
+    ) -> bool:
+        """Update the status of an email record and commit"""
+        try:
+            query, params = build_status_update(email_id, status, reason, send_date, date, self.lease_owner)
+            cursor = self._execute(query, params)
+            self.connection.commit()
+            
+            if self._email_state and self._email_state[0] == email_id:
+                self._email_state = None
+                
+            return cursor.rowcount > 0
+        except Exception as e:
+            logger.error(f"Error updating email status for record {email_id}: {str(e)}")
+            try:
+                if self._connection is not None:
+                    self._connection.rollback()
+            except Exception:
+                pass
+            return False
+
+    def update_email_statuses(self, updates: List[Tuple[int, str, Optional[str], Optional[datetime], Optional[datetime]]]) -> int:
+        """
+        Write a batch of status outcomes with one set-based UPDATE per chunk and a single commit
+        
+        The outcomes are sent as a VALUES list joined to the table rather than with
+        cursor.executemany / fast_executemany: executemany reports no reliable
+        per-row rowcount, so lost updates could not be told apart, and
+        fast_executemany sizes its parameter arrays for NVARCHAR(MAX) reasons. The
+        OUTPUT clause returns exactly which Email_IDs were updated, in one round
+        trip per chunk. Rows this run no longer holds (their lease expired and
+        another instance reclaimed them) match nothing; they are logged and not counted.
+        
+        Args:
+            updates: Tuples of (email_id, status, reason, send_date, date)
+            
+        Returns:
+            Number of rows updated
+            
+        Raises:
+            pyodbc.Error: If the batch could not be written
+        """
+        if not updates:
+            return 0
+            
+        updated_ids = set()
+        try:
+            for start in range(0, len(updates), _STATUS_UPDATE_CHUNK_SIZE):
+                chunk = updates[start:start + _STATUS_UPDATE_CHUNK_SIZE]
+                params = [value for email_id, status, reason, send_date, date in chunk
+                          for value in (email_id, status, reason, send_date, date)]
+                if self.lease_owner:
+                    params.append(self.lease_owner)
+                  
+                # Statements are cached per chunk size, so full batches reuse one prepared statement
+                cursor = self._execute(self._bulk_status_query(len(chunk)), params, retry=start == 0)
+                updated_ids.update(row[0] for row in cursor.fetchall())
+            self.connection.commit()
+        except Exception:
+            try:
+                if self._connection is not None:
+                    self._connection.rollback()
+            except Exception:
+                pass
+            raise
+            
+        self._email_state = None
+        
+        unmatched = [email_id for email_id, *_ in updates if email_id not in updated_ids]
+        if unmatched:
+            logger.warning(f"{len(unmatched)} status updates matched no row held by this run "
+                           f"(lease lost or record removed): {unmatched}")
+        return len(updated_ids)
+        
+    def _bulk_status_query(self, row_count: int) -> str:
+        """UPDATE joined to a VALUES list of row_count outcomes, returning the updated Email_IDs"""
+        rows = ", ".join(
+            ["(CAST(? AS INT), CAST(? AS NVARCHAR(50)), CAST(? AS NVARCHAR(MAX)), CAST(? AS DATETIME), CAST(? AS DATETIME))"]
+            * row_count
+        )
+        lease_fields = ", Lease_Owner = NULL, Lease_Expires = NULL" if self.lease_owner else ""
+        lease_filter = "WHERE target.Lease_Owner = ?" if self.lease_owner else ""
+        return f"""
+            UPDATE target
+            SET Email_Status = outcome.Email_Status,
+                Reason = COALESCE(outcome.Reason, target.Reason),
+                Email_Send_Date = COALESCE(outcome.Email_Send_Date, target.Email_Send_Date),
+                Date = COALESCE(outcome.Date, target.Date){lease_fields}
+            OUTPUT inserted.Email_ID
+            FROM {self._email_table} AS target
+            JOIN (VALUES {rows}) AS outcome (Email_ID, Email_Status, Reason, Email_Send_Date, Date)
+              ON target.Email_ID = outcome.Email_ID
+            {lease_filter}
+        """
+
+
+class ThreadLocalUnitsOfWork:
+    """
+    Gives each thread its own AutomationUnitOfWork.
+    
+    pyodbc connections must not be shared between threads, so code that spreads
+    per-email database work over several threads borrows one connection per thread.
+    """
+    
+    def __init__(self):
+        self._local = threading.local()
+        self._units: List[AutomationUnitOfWork] = []
+        self._lock = threading.Lock()
+        
+    def current(self) -> AutomationUnitOfWork:
+        """The unit of work for the calling thread, created on first use"""
+        unit_of_work = getattr(self._local, "unit_of_work", None)
+        if unit_of_work is None:
+            unit_of_work = self._local.unit_of_work = AutomationUnitOfWork()
+            with self._lock:
+                self._units.append(unit_of_work)
+        return unit_of_work
+        
+    def close_all(self):
+        """Close every unit of work handed out (call once the threads are done)"""
+        with self._lock:
+            units, self._units = self._units, []
+        for unit_of_work in units:
+            unit_of_work.close()
@@ -0,0 +1,99 @@
+"""
+asyncio engine for processing the automation queue.
+
+Selected with AUTOMATION_ENGINE=asyncio. A fixed number of consumer coroutines
+drain the same record source as the threaded pipeline, so stop semantics are identical;
+SMTP delivery is native asyncio while database work runs on a small thread pool.
+"""
+
+import asyncio
+import logging
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from ....core.config import get_settings
+from ....services.email.core.async_email_sender import AsyncEmailSender
+from ..core.state_manager import get_automation_state
+from ..database.unit_of_work import ThreadLocalUnitsOfWork
+from ..database.status_writer import BufferedStatusWriter
+
+logger = logging.getLogger(__name__)
+
+
+async def _run_async_engine(smtp_settings: Dict[str, Any],
+                            compression_executor: Optional[Executor],
+                            sender_email: str,
+                            template: Optional[dict],
+                            template_id: Optional[str],
+                            status_writer: BufferedStatusWriter,
+                            process_id: Optional[str],
+                            process_emoji: str):
+    """Send emails from the shared queue with bounded asyncio concurrency"""
+    # Import here to avoid circular imports
+    from .email_processor import _prepare_email_job, _build_send_arguments, _record_email_outcome, _record_email_error
+    
+    settings = get_settings()
+    automation_state = get_automation_state()
+    email_source = automation_state["email_source"]
+    loop = asyncio.get_running_loop()
+    
+    # Each database thread gets its own connection
+    units = ThreadLocalUnitsOfWork()
+    
+    def prepare(email_record: dict) -> Optional[str]:
+        return _prepare_email_job(
+            email_record, template, template_id, units.current(), status_writer, process_id, process_emoji
+        )
+        
+    def record_error(email_record: dict, error: Exception, recorded: bool):
+        _record_email_error(email_record, error, status_writer, process_id, process_emoji, recorded=recorded)
+        
+    email_sender = AsyncEmailSender(
+        smtp_server=smtp_settings["smtp_server"],
+        port=smtp_settings["port"],
+        username=smtp_settings["username"],
+        password=smtp_settings["password"],
+        use_tls=smtp_settings["use_tls"],
+        archive_path=smtp_settings["archive_path"],
+        compression_executor=compression_executor
+    )
+    db_executor = ThreadPoolExecutor(max_workers=max(1, settings.AUTOMATION_WORKERS), thread_name_prefix="email-db")
+    
+    async def consume():
+        # A stop lets in-flight emails finish; nothing new is taken from the source
+        while not automation_state["stop_requested"]:
+            # Loading a new page hits the database, so keep it off the event loop
+            email_record = await loop.run_in_executor(db_executor, email_source.next_record)
+            if email_record is None:
+                return
+                
+            recorded = False
+            try:
+                email_body = await loop.run_in_executor(db_executor, prepare, email_record)
+                if email_body is None:
+                    continue
+                    
+                success, reason = await email_sender.send_email_with_validation(
+                    **_build_send_arguments(email_record, email_body, sender_email)
+                )
+                recorded = True
+                await loop.run_in_executor(
+                    db_executor, _record_email_outcome,
+                    email_record, success, reason, status_writer, process_id, process_emoji
+                )
+            except Exception as e:
+                try:
+                    await loop.run_in_executor(db_executor, record_error, email_record, e, recorded)
+                except Exception as error:
+                    logger.error(f"Error recording failed email: {str(error)}")
+                
+    try:
+        concurrency = max(1, settings.AUTOMATION_ASYNC_CONCURRENCY)
+        await asyncio.gather(*(consume() for _ in range(concurrency)))
+    finally:
+        try:
+            await email_sender.close()
+        except Exception as e:
+            logger.warning(f"Error closing async SMTP sessions: {str(e)}")
+        db_executor.shutdown(wait=True)
+        units.close_all()
@@ -3,23 +3,24 @@ Batch processor for updating summaries and batch operations
 """
 
 import logging
-from ..core.state_manager import get_automation_state
+from ..core.state_manager import get_automation_state, get_summary_lock
 
 logger = logging.getLogger(__name__)
 
 
-def _update_summary():
-    """Update the summary counts from the database"""
+def _update_summary(connection=None):
+    """Update the summary counts from the database, optionally reusing an open connection"""
     try:
         from ....services.database.repositories.email_repository import get_email_status_summary
-        summary = get_email_status_summary()
+        summary = get_email_status_summary(connection)
         
         automation_state = get_automation_state()
         
         # Always update all counts from the database for accuracy
-        automation_state["summary"]["pending"] = summary["Pending"]
-        automation_state["summary"]["successful"] = summary["Success"]
-        automation_state["summary"]["failed"] = summary["Failed"]
+        with get_summary_lock():
+            automation_state["summary"]["pending"] = summary["Pending"]
+            automation_state["summary"]["successful"] = summary["Success"]
+            automation_state["summary"]["failed"] = summary["Failed"]
             
     except Exception as e:
         # Just log at debug level since this is called frequently by polling
@@ -3,28 +3,39 @@ Email queue processing and automation execution.
 
 This module handles the actual processing of emails in the automation queue,
 including template processing, validation, sending, and status updates.
-It runs in a separate thread to avoid blocking the main application.
+It runs in a separate thread to avoid blocking the main application and
+moves emails through a staged pipeline (render, compress, send, persist).
 """
 
+import asyncio
 import logging
-import queue
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
+from ....core.config import get_settings
 from ....models.email import EmailStatus
 from ....services.email import EmailSender
-from ....services.templates import get_template_by_id
+from ....services.email.core.folder_scanner import get_folder_scanner
+from ....services.templates import get_template_by_id, compile_template
 from ....utils.email_logger import email_logger
-from ..core.state_manager import get_automation_state
+from ..core.state_manager import get_automation_state, get_summary_lock, increment_summary
 from ..core.settings_manager import _get_smtp_settings
-from ..database.email_repository import _check_email_status
+from ..database.email_repository import _release_claims
+from ..database.unit_of_work import AutomationUnitOfWork, ThreadLocalUnitsOfWork
+from ..database.status_writer import BufferedStatusWriter
 from ..templates.template_manager import _load_default_template
-from ..validation.mapping_validator import _validate_recipient_mapping
 from .batch_processor import _update_summary
+from .pipeline import PipelineStage, StagedPipeline
 
 logger = logging.getLogger(__name__)
 
 
+def _prefetch_attachment_folders(email_records: List[dict]):
+    """Start scanning the attachment folders of claimed emails in the background"""
+    get_folder_scanner().prefetch(record.get("File_Path") for record in email_records)
+
+
 def _process_email_queue():
     """Process the email queue in a separate thread"""
     automation_state = get_automation_state()
@@ -49,6 +60,7 @@ def _process_email_queue():
     
     # Initialize processed emails tracking
     automation_state["processed_emails"] = []
+    automation_state["pipeline"] = None
     
     # Get template
     template = None
@@ -75,210 +87,63 @@ def _process_email_queue():
         automation_state["last_run"] = datetime.now()
         return
 
+    settings = get_settings()
+    
+    # Status outcomes from all workers are written back in batches on one shared connection,
+    # and only to rows this run still holds a claim on
+    lease_owner = automation_state["email_source"].lease_owner
+    status_unit_of_work = AutomationUnitOfWork(lease_owner)
+    status_writer = BufferedStatusWriter(status_unit_of_work)
+    
+    # Optional process pool so zipping attachments is not limited by the GIL
+    compression_executor = None
+    if settings.AUTOMATION_COMPRESSION_PROCESSES > 0:
+        compression_executor = ProcessPoolExecutor(max_workers=settings.AUTOMATION_COMPRESSION_PROCESSES)
+    
     try:
-        # Create email sender
-        email_sender = EmailSender(
-            smtp_server=smtp_settings["smtp_server"],
-            port=smtp_settings["port"],
-            username=smtp_settings["username"],
-            password=smtp_settings["password"],
-            use_tls=smtp_settings["use_tls"],
-            archive_path=smtp_settings["archive_path"]
-        )
-        
         # Create the default sender email (from username if not specified)
         sender_email = smtp_settings["sender_email"] or smtp_settings["username"]
         
-        # Process emails while queue is not empty and not stopped
-        while not automation_state["stop_requested"] and not automation_state["email_queue"].empty():
-            try:
-                # Get next email from queue with a timeout
-                email_record = automation_state["email_queue"].get(timeout=1)
-                
-                # Check if email is still pending (race condition check)
-                is_pending, current_status = _check_email_status(email_record["Email_ID"])
-                if not is_pending:
-                    # Log with process_id
-                    email_logger.log_info(
-                        f"Skipping email ID {email_record['Email_ID']} - " +
-                        f"Status changed from Pending to {current_status} (race condition prevention)",
-                        email_id=email_record["Email_ID"],
-                        process_id=process_id
-                    )
-                    
-                    # Mark task as done and continue to next email
-                    automation_state["email_queue"].task_done()
-                    continue
-                
-                # Log with process_id and consistent emoji
-                email_logger.log_info(
-                    f"{process_emoji} Processing email ID {email_record['Email_ID']} to {email_record['Email']}",
-                    email_id=email_record["Email_ID"],
-                    recipient=email_record["Email"],
-                    subject=email_record["Subject"],
-                    process_id=process_id
-                )
-                
-                # Update processed count
-                automation_state["summary"]["processed"] += 1
-                
-                # Generate email body from template if available
-                email_body = _load_default_template()  # Start with default template from file
-                
-                if template:
-                    try:
-                        # Enhanced template processing with more placeholders
-                        placeholders = {
-                            "{{company_name}}": email_record.get("Company_Name", ""),
-                            "{{recipient}}": email_record.get("Email", ""),
-                            "{{subject}}": email_record.get("Subject", ""),
-                            "{{date}}": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                            "{{file_path}}": email_record.get("File_Path", "")
-                        }
-                        
-                        template_body = template['body_template']
-                        for placeholder, value in placeholders.items():
-                            template_body = template_body.replace(placeholder, str(value))
-                        
-                        # Only override default template if the SQL template is valid
-                        if template_body and len(template_body.strip()) > 0:
-                            email_body = template_body
-                            email_logger.log_info(f"Using template ID {template_id} for email ID {email_record['Email_ID']}")
-                        else:
-                            email_logger.log_info(f"Template ID {template_id} body was empty, using default file template")
-                    except Exception as e:
-                        error_msg = f"Error processing template: {str(e)}, using default file template"
-                        logger.error(error_msg)
-                        email_logger.log_error(error_msg)
-                else:
-                    email_logger.log_info(f"Using default file template for email ID {email_record['Email_ID']}")
-                
-                # Validate recipient mapping before sending
-                is_valid, error_reason = _validate_recipient_mapping(
-                    email_record["Email_ID"],
-                    email_record["Email"],
-                    email_record["File_Path"]
-                )
-                
-                if not is_valid:
-                    error_message = f"ERROR: {error_reason}"
-                    
-                    # Update status to failed
-                    from ....services.email import update_email_status as update_status
-                    update_status(
-                        email_id=email_record["Email_ID"],
-                        status=EmailStatus.FAILED.value,
-                        reason=error_message,
-                        date=datetime.now()
-                    )
-                    
-                    # Log the error
-                    email_logger.log_info(
-                        f"Email processing failed - ID: {email_record['Email_ID']}, "
-                        f"To: {email_record['Email']}, Subject: {email_record['Subject']}, "
-                        f"Status: Failed, Reason: {error_message}"
-                    )
-                    
-                    # Mark task as done and continue to next email
-                    automation_state["email_queue"].task_done()
-                    automation_state["summary"]["failed"] += 1
-                    continue
-                
-                # Get the sharing options from the automation state
-                sharing_option = automation_state["settings"].get("sharing_option", "anyone")
-                specific_emails = automation_state["settings"].get("specific_emails", [])
-                
-                # Send email with validation - we already validated recipient mapping here
-                # so we set validate_mapping=False to avoid duplicate validation
-                success, reason = email_sender.send_email_with_validation(
-                    recipient=email_record["Email"],
-                    subject=email_record["Subject"],
-                    body=email_body,
-                    folder_path=email_record["File_Path"],
-                    sender=sender_email,
-                    email_id=email_record["Email_ID"],
-                    validate_mapping=False,  # Already validated above
-                    gdrive_share_type=sharing_option,
-                    specific_emails=specific_emails
-                )
-                
-                # Update status based on result
-                new_status = EmailStatus.SUCCESS if success else EmailStatus.FAILED
-                current_time = datetime.now()
-                
-                # Update the database with current timestamp
-                if success:
-                    # For success, update both Email_Send_Date and Date columns
-                    from ....services.email import update_email_status as update_status
-                    update_status(
-                        email_id=email_record["Email_ID"],
-                        status=new_status.value,
-                        reason=reason or "Email sent successfully",
-                        send_date=current_time,
-                        date=current_time
-                    )
-                    automation_state["summary"]["successful"] += 1
-                else:
-                    from ....services.email import update_email_status as update_status
-                    update_status(
-                        email_id=email_record["Email_ID"],
-                        status=new_status.value,
-                        reason=reason or "Failed to send email",
-                        send_date=current_time,
-                        date=current_time
-                    )
-                    automation_state["summary"]["failed"] += 1
-                
-                # Log the transaction with process_id
-                email_logger.log_email_transaction(
-                    email_id=email_record["Email_ID"],
-                    email=email_record["Email"],
-                    subject=email_record["Subject"],
-                    status=new_status.value,
-                    reason=reason,
-                    process_id=process_id
-                )
-                
-                # Add detailed log for both success and failures with the process emoji
-                if success:
-                    email_logger.log_info(
-                        f"{process_emoji} ✅ Email ID {email_record['Email_ID']} to {email_record['Email']} SENT SUCCESSFULLY",
-                        email_id=email_record["Email_ID"],
-                        recipient=email_record["Email"],
-                        subject=email_record["Subject"],
-                        process_id=process_id
-                    )
-                else:
-                    email_logger.log_error(
-                        f"{process_emoji} ❌ Email ID {email_record['Email_ID']} to {email_record['Email']} FAILED: {reason}",
-                        email_id=email_record["Email_ID"],
-                        recipient=email_record["Email"],
-                        subject=email_record["Subject"],
-                        process_id=process_id
-                    )
-                
-                # Track this email in processed emails list with success status
-                processed_email = email_record.copy()
-                processed_email["success"] = success
-                processed_email["reason"] = reason
-                processed_email["process_time"] = datetime.now()
-                automation_state["processed_emails"].append(processed_email)
-                
-                # Mark task as done in queue
-                automation_state["email_queue"].task_done()
+        if _use_async_engine(settings):
+            # Import here to avoid circular imports
+            from .async_engine import _run_async_engine
+            
+            # Runs its own event loop in this automation thread, away from the API's loop
+            asyncio.run(_run_async_engine(
+                smtp_settings=smtp_settings,
+                compression_executor=compression_executor,
+                sender_email=sender_email,
+                template=template,
+                template_id=template_id,
+                status_writer=status_writer,
+                process_id=process_id,
+                process_emoji=process_emoji
+            ))
+        else:
+            # Create email sender (shared by all stages; it pools its SMTP sessions)
+            email_sender = EmailSender(
+                smtp_server=smtp_settings["smtp_server"],
+                port=smtp_settings["port"],
+                username=smtp_settings["username"],
+                password=smtp_settings["password"],
+                use_tls=smtp_settings["use_tls"],
+                archive_path=smtp_settings["archive_path"],
+                compression_executor=compression_executor
+            )
+            
+            # Process emails through the staged pipeline until the queue is drained or a stop is requested
+            _run_pipeline(
+                email_sender=email_sender,
+                sender_email=sender_email,
+                template=template,
+                template_id=template_id,
+                status_writer=status_writer,
+                process_id=process_id,
+                process_emoji=process_emoji
+            )
                 
-            except queue.Empty:
-                # Queue is empty, continue to next loop iteration
-                continue
-            except Exception as e:
-                # Log the error with process_id and consistent emoji
-                email_logger.log_error(
-                    f"{process_emoji} Error processing email: {str(e)}",
-                    email_id=email_record.get("Email_ID"),
-                    process_id=process_id
-                )
-                # Continue with next email
-                continue
+        # Persist any buffered outcomes before reporting (the writer's connection is then free)
+        status_writer.close()
         
         # All emails processed - update status and end the process
         automation_state["status"] = "idle"
@@ -331,7 +196,7 @@ def _process_email_queue():
             email_logger.end_process(process_id, "success", description)
         
         # Update pending count after finishing
-        _update_summary()
+        _update_summary(status_unit_of_work.connection)
     except Exception as e:
         error_msg = f"Error in email automation process: {str(e)}"
         logger.error(error_msg)
@@ -344,3 +209,334 @@ def _process_email_queue():
         automation_state["last_run"] = datetime.now()
         automation_state["is_running"] = False
         automation_state["stop_requested"] = False
+    finally:
+        # Never drop buffered outcomes, even when the run fails or is stopped
+        try:
+            status_writer.close()
+        except Exception as e:
+            logger.error(f"Error flushing email status updates: {str(e)}")
+        status_unit_of_work.close()
+        
+        # Stop renewing leases, then hand claimed emails that were never processed
+        # (stop or error) back to the table
+        automation_state["email_source"].close()
+        if lease_owner:
+            released = _release_claims(lease_owner)
+            if released:
+                logger.info(f"Released {released} claimed emails back to Pending")
+        if 'email_sender' in locals():
+            email_sender.close()
+        if compression_executor is not None:
+            compression_executor.shutdown(wait=True)
+
+
+def _use_async_engine(settings) -> bool:
+    """Check whether the asyncio send engine is selected and usable"""
+    if settings.AUTOMATION_ENGINE.lower() != "asyncio":
+        return False
+        
+    from ....services.email.core.async_email_sender import AIOSMTPLIB_AVAILABLE
+    if not AIOSMTPLIB_AVAILABLE:
+        logger.warning("AUTOMATION_ENGINE=asyncio but aiosmtplib is not installed - using the threaded engine")
+        return False
+    return True
+
+
+def _run_pipeline(email_sender: EmailSender,
+                  sender_email: str,
+                  template: Optional[dict],
+                  template_id: Optional[str],
+                  status_writer: BufferedStatusWriter,
+                  process_id: Optional[str],
+                  process_emoji: str):
+    """
+    Run the queued emails through render -> compress -> send -> persist stages.
+    
+    Each stage has its own threads and a bounded queue, so compressing one email
+    overlaps sending the previous one and persisting the one before that.
+    """
+    settings = get_settings()
+    automation_state = get_automation_state()
+    email_source = automation_state["email_source"]
+    
+    # Render-stage threads each get their own database connection
+    units = ThreadLocalUnitsOfWork()
+    
+    def render(job: dict) -> Optional[dict]:
+        email_body = _prepare_email_job(
+            job["record"], template, template_id, units.current(), status_writer, process_id, process_emoji
+        )
+        if email_body is None:
+            return None
+        job["send_arguments"] = _build_send_arguments(job["record"], email_body, sender_email)
+        return job
+        
+    def compress(job: dict) -> dict:
+        # Validation, compression or Drive upload, and message building
+        msg, context, error_message = email_sender.prepare_message(**job.pop("send_arguments"))
+        if msg is None:
+            job["outcome"] = (False, error_message)
+        else:
+            job["message"], job["context"] = msg, context
+        return job
+        
+    def send(job: dict) -> dict:
+        if "outcome" not in job:
+            job["outcome"] = email_sender.deliver_message(job.pop("message"), job.pop("context"))
+        return job
+        
+    def persist(job: dict) -> dict:
+        success, reason = job["outcome"]
+        job["recorded"] = True
+        _record_email_outcome(job["record"], success, reason, status_writer, process_id, process_emoji)
+        return job
+        
+    def on_error(job: dict, error: Exception):
+        _record_email_error(
+            job["record"], error, status_writer, process_id, process_emoji, recorded=job.get("recorded", False)
+        )
+        
+    queue_size = settings.AUTOMATION_STAGE_QUEUE_SIZE
+    pipeline = StagedPipeline(
+        [
+            PipelineStage("render", render, settings.AUTOMATION_RENDER_WORKERS, queue_size),
+            PipelineStage("compress", compress, settings.AUTOMATION_COMPRESS_WORKERS, queue_size),
+            PipelineStage("send", send, settings.AUTOMATION_WORKERS, queue_size),
+            PipelineStage("persist", persist, settings.AUTOMATION_PERSIST_WORKERS, queue_size)
+        ],
+        on_error=on_error
+    )
+    automation_state["pipeline"] = pipeline
+    
+    pipeline.start()
+    try:
+        # A stop lets in-flight emails finish; nothing new is taken from the source
+        while not automation_state["stop_requested"]:
+            # Blocks while the render stage is full, so only a few pages are ever loaded
+            email_record = email_source.next_record()
+            if email_record is None:
+                break
+            pipeline.submit({"record": email_record})
+    finally:
+        pipeline.finish()
+        units.close_all()
+
+
+def _record_email_error(email_record: dict,
+                        error: Exception,
+                        status_writer: BufferedStatusWriter,
+                        process_id: Optional[str],
+                        process_emoji: str,
+                        recorded: bool = False):
+    """
+    Record an email whose processing raised as failed.
+    
+    Without this the claimed record would stay pending until its lease expires
+    and the run summary would not count it. If the outcome was already being
+    recorded when the error was raised, the error is only logged.
+    """
+    # Log the error with process_id and consistent emoji
+    email_logger.log_error(
+        f"{process_emoji} Error processing email: {str(error)}",
+        email_id=email_record.get("Email_ID"),
+        process_id=process_id
+    )
+    if recorded:
+        return
+        
+    status_writer.add(
+        email_id=email_record["Email_ID"],
+        status=EmailStatus.FAILED.value,
+        reason=f"Error processing email: {str(error)}",
+        date=datetime.now()
+    )
+    increment_summary(failed=1)
+
+
+def _template_placeholders(email_record: dict, now: Optional[datetime] = None) -> dict:
+    """Placeholder values (name without braces -> value) for rendering a template for an email record"""
+    return {
+        "company_name": email_record.get("Company_Name", ""),
+        "recipient": email_record.get("Email", ""),
+        "subject": email_record.get("Subject", ""),
+        "date": (now or datetime.now()).strftime("%Y-%m-%d %H:%M:%S"),
+        "file_path": email_record.get("File_Path", "")
+    }
+
+
+def _prepare_email_job(email_record: dict,
+                       template: Optional[dict],
+                       template_id: Optional[str],
+                       unit_of_work: AutomationUnitOfWork,
+                       status_writer: BufferedStatusWriter,
+                       process_id: Optional[str],
+                       process_emoji: str) -> Optional[str]:
+    """
+    Run the database checks and render the body for a claimed email.
+    
+    The record was claimed for this run, so no other worker or instance can be
+    processing it and its status does not need to be re-checked.
+    
+    Returns:
+        The email body, or None if the email was already recorded as failed
+    """
+    # Log with process_id and consistent emoji
+    email_logger.log_info(
+        f"{process_emoji} Processing email ID {email_record['Email_ID']} to {email_record['Email']}",
+        email_id=email_record["Email_ID"],
+        recipient=email_record["Email"],
+        subject=email_record["Subject"],
+        process_id=process_id
+    )
+    
+    # Update processed count
+    increment_summary(processed=1)
+    
+    # Generate email body from template if available
+    email_body = None
+    
+    if template:
+        try:
+            # Parsed once per template body, then rendered with a single join
+            template_body = compile_template(template['body_template']).render(_template_placeholders(email_record))
+                
+            # Only override default template if the SQL template is valid
+            if template_body and len(template_body.strip()) > 0:
+                email_body = template_body
+                email_logger.log_info(f"Using template ID {template_id} for email ID {email_record['Email_ID']}")
+            else:
+                email_logger.log_info(f"Template ID {template_id} body was empty, using default file template")
+        except Exception as e:
+            error_msg = f"Error processing template: {str(e)}, using default file template"
+            logger.error(error_msg)
+            email_logger.log_error(error_msg)
+    else:
+        email_logger.log_info(f"Using default file template for email ID {email_record['Email_ID']}")
+        
+    # The default template file is only needed when no template body was rendered
+    if email_body is None:
+        email_body = _load_default_template()
+        
+    # Validate recipient mapping before sending
+    is_valid, error_reason = unit_of_work.validate_recipient_mapping(
+        email_record["Email_ID"],
+        email_record["Email"],
+        email_record["File_Path"]
+    )
+    
+    if not is_valid:
+        error_message = f"ERROR: {error_reason}"
+        
+        # Update status to failed
+        status_writer.add(
+            email_id=email_record["Email_ID"],
+            status=EmailStatus.FAILED.value,
+            reason=error_message,
+            date=datetime.now()
+        )
+        
+        # Log the error
+        email_logger.log_info(
+            f"Email processing failed - ID: {email_record['Email_ID']}, "
+            f"To: {email_record['Email']}, Subject: {email_record['Subject']}, "
+            f"Status: Failed, Reason: {error_message}"
+        )
+        
+        increment_summary(failed=1)
+        return None
+        
+    return email_body
+
+
+def _build_send_arguments(email_record: dict, email_body: str, sender_email: str) -> dict:
+    """Keyword arguments for send_email_with_validation, shared by both send engines"""
+    automation_state = get_automation_state()
+        
+    # Get the sharing options from the automation state
+    sharing_option = automation_state["settings"].get("sharing_option", "anyone")
+    specific_emails = automation_state["settings"].get("specific_emails", [])
+    
+    # We already validated recipient mapping in _prepare_email_job
+    # so we set validate_mapping=False to avoid duplicate validation
+    return dict(
+        recipient=email_record["Email"],
+        subject=email_record["Subject"],
+        body=email_body,
+        folder_path=email_record["File_Path"],
+        sender=sender_email,
+        email_id=email_record["Email_ID"],
+        validate_mapping=False,  # Already validated above
+        gdrive_share_type=sharing_option,
+        specific_emails=specific_emails
+    )
+
+
+def _record_email_outcome(email_record: dict,
+                          success: bool,
+                          reason: Optional[str],
+                          status_writer: BufferedStatusWriter,
+                          process_id: Optional[str],
+                          process_emoji: str):
+    """Buffer the status update, update counters and log the result of a send"""
+    automation_state = get_automation_state()
+    
+    # Update status based on result
+    new_status = EmailStatus.SUCCESS if success else EmailStatus.FAILED
+    current_time = datetime.now()
+    
+    # Update the database with current timestamp
+    if success:
+        # For success, update both Email_Send_Date and Date columns
+        status_writer.add(
+            email_id=email_record["Email_ID"],
+            status=new_status.value,
+            reason=reason or "Email sent successfully",
+            send_date=current_time,
+            date=current_time
+        )
+        increment_summary(successful=1)
+    else:
+        status_writer.add(
+            email_id=email_record["Email_ID"],
+            status=new_status.value,
+            reason=reason or "Failed to send email",
+            send_date=current_time,
+            date=current_time
+        )
+        increment_summary(failed=1)
+        
+    # Log the transaction with process_id
+    email_logger.log_email_transaction(
+        email_id=email_record["Email_ID"],
+        email=email_record["Email"],
+        subject=email_record["Subject"],
+        status=new_status.value,
+        reason=reason,
+        process_id=process_id
+    )
+    
+    # Add detailed log for both success and failures with the process emoji
+    if success:
+        email_logger.log_info(
+            f"{process_emoji} ✅ Email ID {email_record['Email_ID']} to {email_record['Email']} SENT SUCCESSFULLY",
+            email_id=email_record["Email_ID"],
+            recipient=email_record["Email"],
+            subject=email_record["Subject"],
+            process_id=process_id
+        )
+    else:
+        email_logger.log_error(
+            f"{process_emoji} ❌ Email ID {email_record['Email_ID']} to {email_record['Email']} FAILED: {reason}",
+            email_id=email_record["Email_ID"],
+            recipient=email_record["Email"],
+            subject=email_record["Subject"],
+            process_id=process_id
+        )
+        
+    # Track this email in processed emails list with success status
+    processed_email = email_record.copy()
+    processed_email["success"] = success
+    processed_email["reason"] = reason
+    processed_email["process_time"] = datetime.now()
+    with get_summary_lock():
+        automation_state["processed_emails"].append(processed_email)
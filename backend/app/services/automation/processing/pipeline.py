@@ -0,0 +1,171 @@
+"""
+Staged processing pipeline for automation runs.
+
+Each stage has its own worker threads and a bounded input queue, so different
+emails can be in different stages at the same time (e.g. one being compressed
+while another is sent) and a slow stage applies back-pressure upstream.
+"""
+
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of the input; forwarded downstream once a stage has drained
+_END = object()
+
+
+class PipelineStage:
+    """
+    One step of a StagedPipeline.
+    
+    The handler receives an item and returns it (possibly updated) for the next
+    stage, or None to drop it from the pipeline.
+    """
+    
+    def __init__(self, name: str, handler: Callable[[Any], Optional[Any]], workers: int = 1, queue_size: int = 16):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.queue = queue.Queue(maxsize=max(1, queue_size))
+        
+        self._lock = threading.Lock()
+        self._live_workers = 0
+        self.processed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.in_progress = 0
+        self.busy_seconds = 0.0
+        
+    def stats(self, elapsed: float) -> Dict[str, Any]:
+        """Get throughput and queue-depth counters for this stage"""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "processed": self.processed,
+                "failed": self.failed,
+                "dropped": self.dropped,
+                "in_progress": self.in_progress,
+                "queue_depth": self.queue.qsize(),
+                "queue_size": self.queue.maxsize,
+                "items_per_second": round(self.processed / elapsed, 2) if elapsed > 0 else 0.0,
+                "avg_seconds": round(self.busy_seconds / self.processed, 3) if self.processed else 0.0
+            }
+
+
+class StagedPipeline:
+    """
+    Runs items through a sequence of PipelineStages.
+    
+    on_done is called exactly once per submitted item, when it leaves the last
+    stage, is dropped or fails; on_error is called for handler exceptions.
+    """
+    
+    def __init__(self,
+                 stages: List[PipelineStage],
+                 on_done: Optional[Callable[[Any], None]] = None,
+                 on_error: Optional[Callable[[Any, Exception], None]] = None):
+        self.stages = stages
+        self.on_done = on_done
+        self.on_error = on_error
+        self._threads: List[threading.Thread] = []
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+        
+    def start(self):
+        """Start the worker threads of every stage"""
+        self._started_at = time.monotonic()
+        for index, stage in enumerate(self.stages):
+            stage._live_workers = stage.workers
+            for number in range(stage.workers):
+                thread = threading.Thread(
+                    target=self._run_stage,
+                    args=(index,),
+                    name=f"pipeline-{stage.name}-{number}",
+                    daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+                
+    def submit(self, item: Any):
+        """Feed an item into the first stage, blocking while it is full"""
+        self.stages[0].queue.put(item)
+        
+    def finish(self):
+        """Signal that no more items will be submitted and wait for every stage to drain"""
+        first = self.stages[0]
+        for _ in range(first.workers):
+            first.queue.put(_END)
+            
+        for thread in self._threads:
+            thread.join()
+        self._finished_at = time.monotonic()
+        
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get per-stage metrics"""
+        if self._started_at is None:
+            return {}
+            
+        elapsed = (self._finished_at or time.monotonic()) - self._started_at
+        return {stage.name: stage.stats(elapsed) for stage in self.stages}
+        
+    def _complete(self, item: Any):
+        if self.on_done:
+            try:
+                self.on_done(item)
+            except Exception as e:
+                logger.error(f"Error completing pipeline item: {str(e)}")
+                
+    def _run_stage(self, index: int):
+        stage = self.stages[index]
+        next_stage = self.stages[index + 1] if index + 1 < len(self.stages) else None
+        
+        while True:
+            item = stage.queue.get()
+            if item is _END:
+                break
+                
+            with stage._lock:
+                stage.in_progress += 1
+            started = time.monotonic()
+            result = None
+            failed = False
+            
+            try:
+                result = stage.handler(item)
+            except Exception as e:
+                failed = True
+                if self.on_error:
+                    try:
+                        self.on_error(item, e)
+                    except Exception as error:
+                        logger.error(f"Error reporting pipeline failure: {str(error)}")
+                else:
+                    logger.error(f"Pipeline stage {stage.name} failed: {str(e)}")
+                    
+            with stage._lock:
+                stage.in_progress -= 1
+                stage.processed += 1
+                stage.busy_seconds += time.monotonic() - started
+                if failed:
+                    stage.failed += 1
+                elif result is None:
+                    stage.dropped += 1
+                    
+            if failed or result is None:
+                self._complete(item)
+            elif next_stage is None:
+                self._complete(result)
+            else:
+                next_stage.queue.put(result)
+                
+        # The last worker out of a stage passes the end marker downstream
+        with stage._lock:
+            stage._live_workers -= 1
+            last = stage._live_workers == 0
+        if last and next_stage is not None:
+            for _ in range(next_stage.workers):
+                next_stage.queue.put(_END)
@@ -0,0 +1,86 @@
+"""
+Bulk mail-merge preview.
+
+Renders a template against email records without sending anything, so a
+campaign can be checked before it runs. Records are streamed from the
+database page by page and the template is compiled once, so thousands of rows
+are rendered in one call with one page of records in memory. Rendering uses
+the same template lookup, placeholders and default-template fallback as the
+automation run.
+"""
+
+import hashlib
+import logging
+from datetime import datetime
+from typing import Iterator, Optional
+
+from ....core.config import get_settings
+from ....models.email import EmailStatus
+from ....services.templates import get_template_by_id, compile_template
+from ..database.email_repository import _iter_emails_by_status
+from ..templates.template_manager import _load_default_template
+from .email_processor import _template_placeholders
+
+logger = logging.getLogger(__name__)
+
+
+def preview_emails(template_id: Optional[str] = None,
+                   status: str = EmailStatus.PENDING.value,
+                   limit: Optional[int] = None,
+                   include_body: bool = False) -> Iterator[dict]:
+    """
+    Render a template for email records with a status, without sending.
+    
+    Args:
+        template_id: Template to render; None renders the default template file, as a run does
+        status: Email_Status of the records to render
+        limit: Maximum number of records to render
+        include_body: Include the rendered bodies, not just their sizes and hashes
+        
+    Yields:
+        One dict per record with Email_ID, Email, Subject, the template used
+        ("default" for the default file), body size in bytes and SHA-256 of the body
+        
+    Raises:
+        Exception: If the records cannot be loaded, so a failed query is never
+            mistaken for an empty or short campaign
+    """
+    template = None
+    if template_id:
+        try:
+            template = get_template_by_id(template_id)
+        except Exception as e:
+            logger.warning(f"Could not find template with ID {template_id}, using default template: {str(e)}")
+            
+    compiled = compile_template(template["body_template"]) if template else None
+    default_body = None
+    
+    # One timestamp for the whole preview; a run fills {{date}} per email
+    now = datetime.now()
+    
+    # Small previews need not fetch a full page of rows
+    page_size = limit if limit is not None and 0 < limit < get_settings().AUTOMATION_LOAD_PAGE_SIZE else None
+    
+    for count, email_record in enumerate(_iter_emails_by_status(status, page_size, strict=True)):
+        if limit is not None and count >= limit:
+            return
+            
+        body = compiled.render(_template_placeholders(email_record, now)) if compiled else None
+        template_used = template["id"] if body and body.strip() else "default"
+        if template_used == "default":
+            if default_body is None:
+                default_body = _load_default_template()
+            body = default_body
+            
+        encoded = body.encode("utf-8")
+        item = {
+            "emailId": email_record["Email_ID"],
+            "email": email_record["Email"],
+            "subject": email_record["Subject"],
+            "templateId": template_used,
+            "size": len(encoded),
+            "sha256": hashlib.sha256(encoded).hexdigest()
+        }
+        if include_body:
+            item["body"] = body
+        yield item
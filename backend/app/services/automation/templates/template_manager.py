@@ -4,12 +4,13 @@ import os
 import logging
 
 from ....core.config import get_settings
+from ...templates.core.template_store import load_compiled_template_file
 
 logger = logging.getLogger(__name__)
 
 
 def _load_default_template() -> str:
-    """Load the default email template from file"""
+    """Load the default email template from file (re-read only when the file changes)"""
     try:
         settings = get_settings()
         template_path = settings.DEFAULT_EMAIL_TEMPLATE_PATH
@@ -31,11 +32,8 @@ def _load_default_template() -> str:
             logger.warning(f"Default template file not found at {template_path}")
             return ""
         
-        with open(template_path, "r", encoding="utf-8") as file:
-            template_content = file.read()
-        
-        logger.info(f"Loaded default template from {template_path}")
-        return template_content
+        compiled = load_compiled_template_file(template_path)
+        return compiled.source if compiled else ""
     
     except Exception as e:
         logger.error(f"Error loading default template: {str(e)}")
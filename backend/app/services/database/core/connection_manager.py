@@ -5,12 +5,241 @@ Handles connection pooling, validation, and retry logic.
 import logging
 import pyodbc
 import time
+from collections import deque
 from typing import Dict, Any, Optional, Tuple, List
-from threading import Lock
+from threading import Lock, Condition
+from ....core.config import get_settings
 from ....utils.db_utils import get_connection_string, test_connection
 
 logger = logging.getLogger(__name__)
 
+
+class PooledConnection:
+    """
+    Proxy around a pyodbc connection that belongs to a ConnectionPool.
+    
+    Behaves like the underlying connection, except that close() hands the
+    connection back to the pool instead of tearing down the session. As with
+    pyodbc, leaving a with block without an exception commits the transaction.
+    """
+    
+    def __init__(self, pool: "ConnectionPool", connection: pyodbc.Connection, created_at: float):
+        self._pool = pool
+        self._connection = connection
+        self.created_at = created_at
+        self.last_used = time.monotonic()
+        self._checked_out = False
+        
+    @property
+    def raw_connection(self) -> pyodbc.Connection:
+        """The underlying pyodbc connection"""
+        return self._connection
+        
+    def close(self):
+        """Return the connection to the pool (safe to call more than once)"""
+        if self._checked_out:
+            self._checked_out = False
+            self._pool.release(self)
+            
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+        
+    def __enter__(self):
+        return self
+        
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            # Released connections are rolled back, so commit first as pyodbc does
+            if exc_type is None and self._checked_out and not self._connection.autocommit:
+                self._connection.commit()
+        finally:
+            self.close()
+
+
+class ConnectionPool:
+    """
+    Thread-safe bounded pool of pyodbc connections.
+    
+    Connections are handed out most-recently-used first. Idle connections above
+    min_size are closed after idle_timeout seconds, every connection is recycled
+    after max_lifetime seconds, and connections that sat idle for longer than
+    validation_interval seconds are checked with validate_connection on checkout.
+    """
+    
+    def __init__(self,
+                 manager: "ConnectionManager",
+                 conn_str: str,
+                 min_size: int = 1,
+                 max_size: int = 10,
+                 idle_timeout: float = 300,
+                 max_lifetime: float = 1800,
+                 validation_interval: float = 30,
+                 acquire_timeout: float = 30):
+        self._manager = manager
+        self._conn_str = conn_str
+        self.min_size = max(0, min_size)
+        self.max_size = max(1, max_size, self.min_size)
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self.validation_interval = validation_interval
+        self.acquire_timeout = acquire_timeout
+        
+        self._idle = deque()
+        self._size = 0  # Connections open or being opened, checked out or idle
+        self._closed = False
+        self._condition = Condition(Lock())
+        
+    def acquire(self) -> PooledConnection:
+        """
+        Borrow a connection from the pool, opening a new one if allowed.
+        
+        Returns:
+            Pooled connection; call close() to return it
+            
+        Raises:
+            TimeoutError: If no connection became available within acquire_timeout
+        """
+        deadline = time.monotonic() + self.acquire_timeout
+        
+        while True:
+            candidate = None
+            expired = []
+            try:
+                with self._condition:
+                    if self._closed:
+                        raise RuntimeError("Connection pool has been closed")
+                        
+                    expired = self._reap_idle_locked()
+                    
+                    if self._idle:
+                        candidate = self._idle.pop()
+                    elif self._size < self.max_size:
+                        self._size += 1  # Reserve the slot before connecting outside the lock
+                    else:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise TimeoutError(
+                                f"Timed out after {self.acquire_timeout}s waiting for a database connection "
+                                f"(pool size {self.max_size})"
+                            )
+                        self._condition.wait(remaining)
+                        continue
+            finally:
+                # Close reaped connections without holding the lock
+                for pooled in expired:
+                    self._close_quietly(pooled)
+                    
+            if candidate is not None:
+                if self._is_usable(candidate):
+                    candidate._checked_out = True
+                    return candidate
+                self._discard(candidate)
+                continue
+                
+            try:
+                connection = self._manager._create_connection(self._conn_str)
+            except Exception:
+                with self._condition:
+                    self._size -= 1
+                    self._condition.notify()
+                raise
+                
+            pooled = PooledConnection(self, connection, time.monotonic())
+            pooled._checked_out = True
+            return pooled
+            
+    def release(self, pooled: PooledConnection):
+        """Return a connection to the pool, discarding it if it is no longer reusable"""
+        try:
+            # Never hand an open transaction to the next borrower
+            pooled.raw_connection.rollback()
+        except Exception as e:
+            logger.debug(f"Discarding pooled connection after failed rollback: {str(e)}")
+            self._discard(pooled)
+            return
+            
+        now = time.monotonic()
+        with self._condition:
+            if not self._closed and now - pooled.created_at < self.max_lifetime:
+                pooled.last_used = now
+                self._idle.append(pooled)
+                self._condition.notify()
+                return
+                
+        self._discard(pooled)
+        
+    def close_all(self):
+        """Close every idle connection and refuse further checkouts"""
+        with self._condition:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._condition.notify_all()
+            
+        for pooled in idle:
+            self._discard(pooled)
+            
+    def stats(self) -> Dict[str, int]:
+        """Get current pool usage counters"""
+        with self._condition:
+            idle = len(self._idle)
+            return {
+                "size": self._size,
+                "idle": idle,
+                "in_use": self._size - idle,
+                "max_size": self.max_size
+            }
+            
+    def _is_usable(self, pooled: PooledConnection) -> bool:
+        """Check lifetime and, if the connection has been idle a while, liveness"""
+        now = time.monotonic()
+        if now - pooled.created_at >= self.max_lifetime:
+            return False
+        if now - pooled.last_used >= self.validation_interval:
+            return self._manager.validate_connection(pooled.raw_connection)
+        return True
+        
+    def _reap_idle_locked(self) -> List[PooledConnection]:
+        """
+        Detach idle connections past their idle timeout or lifetime.
+        
+        The caller holds the lock and closes the returned connections after releasing it.
+        """
+        now = time.monotonic()
+        keep = deque()
+        expired = []
+        
+        # Oldest idle connections sit at the left of the deque
+        while self._idle:
+            pooled = self._idle.popleft()
+            over_min = self._size - len(expired) > self.min_size
+            if now - pooled.created_at >= self.max_lifetime or (over_min and now - pooled.last_used >= self.idle_timeout):
+                expired.append(pooled)
+            else:
+                keep.append(pooled)
+                
+        self._idle = keep
+        if expired:
+            self._size -= len(expired)
+            self._condition.notify(len(expired))
+            
+        return expired
+            
+    def _discard(self, pooled: PooledConnection):
+        """Close a connection and free its slot"""
+        self._close_quietly(pooled)
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+            
+    @staticmethod
+    def _close_quietly(pooled: PooledConnection):
+        try:
+            pooled.raw_connection.close()
+        except Exception as e:
+            logger.debug(f"Error closing pooled connection: {str(e)}")
+
+
 class ConnectionManager:
     """Manages database connections with pooling and retry logic."""
     
@@ -18,25 +247,62 @@ class ConnectionManager:
         self.max_retries = max_retries
         self.retry_delay = retry_delay
         self._connection_lock = Lock()
-        self._connection_cache = {}
+        self._pool: Optional[ConnectionPool] = None
+        
+    @property
+    def pool(self) -> ConnectionPool:
+        """Get the pool for the default connection settings, creating it on first use"""
+        if self._pool is None:
+            with self._connection_lock:
+                if self._pool is None:
+                    settings = get_settings()
+                    self._pool = ConnectionPool(
+                        self,
+                        get_connection_string(),
+                        min_size=settings.DB_POOL_MIN_SIZE,
+                        max_size=settings.DB_POOL_MAX_SIZE,
+                        idle_timeout=settings.DB_POOL_IDLE_TIMEOUT,
+                        max_lifetime=settings.DB_POOL_MAX_LIFETIME,
+                        validation_interval=settings.DB_POOL_VALIDATION_INTERVAL,
+                        acquire_timeout=settings.DB_POOL_ACQUIRE_TIMEOUT
+                    )
+        return self._pool
         
     def get_connection(self, connection_params: Optional[Dict[str, Any]] = None) -> pyodbc.Connection:
         """
         Get a database connection with retry logic.
         
+        Connections for the default settings are borrowed from the pool and go
+        back to it on close(). Connections with explicit parameters (e.g. when
+        testing credentials) are opened directly and are not pooled.
+        
         Args:
             connection_params: Optional connection parameters
             
         Returns:
             Database connection
         """
+        if not connection_params:
+            return self.pool.acquire()
+            
         conn_str = get_connection_string(
-            server=connection_params.get('server') if connection_params else None,
-            database=connection_params.get('database') if connection_params else None,
-            username=connection_params.get('username') if connection_params else None,
-            password=connection_params.get('password') if connection_params else None
+            server=connection_params.get('server'),
+            database=connection_params.get('database'),
+            username=connection_params.get('username'),
+            password=connection_params.get('password')
         )
+        return self._create_connection(conn_str)
         
+    def _create_connection(self, conn_str: str) -> pyodbc.Connection:
+        """
+        Open a new physical connection with retry logic.
+        
+        Args:
+            conn_str: ODBC connection string
+            
+        Returns:
+            Database connection
+        """
         for attempt in range(self.max_retries + 1):
             try:
                 connection = pyodbc.connect(conn_str)
@@ -121,6 +387,13 @@ class ConnectionManager:
         """
         return test_connection(connection_params)
 
+    def close(self):
+        """Close all pooled connections"""
+        with self._connection_lock:
+            pool, self._pool = self._pool, None
+        if pool:
+            pool.close_all()
+
 # Global connection manager instance
 _connection_manager = None
 _manager_lock = Lock()
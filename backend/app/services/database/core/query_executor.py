@@ -8,7 +8,7 @@ and result formatting. It serves as a simple interface for database operations.
 import logging
 import pyodbc
 from typing import Dict, Any, Optional, List
-from ....utils.db_utils import get_connection_string
+from .connection_manager import get_db_connection
 
 logger = logging.getLogger(__name__)
 
@@ -24,8 +24,7 @@ def execute_query(query: str, params: Optional[Dict[str, Any]] = None) -> List[D
         List of dictionaries representing query results
     """
     try:
-        conn_str = get_connection_string()
-        connection = pyodbc.connect(conn_str)
+        connection = get_db_connection()
         cursor = connection.cursor()
 
         if params:
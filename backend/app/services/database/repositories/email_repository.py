@@ -205,15 +205,18 @@ def update_email_status(email_id: int, status: str, reason: Optional[str] = None
             conn.close()
 
 
-def get_email_status_summary() -> Dict[str, int]:
+def get_email_status_summary(connection=None) -> Dict[str, int]:
     """
     Get a summary of email statuses.
     
+    Args:
+        connection: Optional open connection to reuse; it is left open
+        
     Returns:
         Dictionary with status counts
     """
     try:
-        conn = get_db_connection()
+        conn = connection or get_db_connection()
         cursor = conn.cursor()
         settings = get_settings()
         
@@ -251,7 +254,7 @@ def get_email_status_summary() -> Dict[str, int]:
         logger.error(f"Error getting email status summary: {str(e)}")
         raise
     finally:
-        if 'conn' in locals():
+        if 'conn' in locals() and connection is None:
             conn.close()
 
 
@@ -0,0 +1,344 @@
+"""
+asyncio email sending engine.
+
+This module provides an alternative to the threaded EmailSender for running
+large numbers of concurrent sends in a single event loop:
+- SMTP delivery over a pool of async sessions (aiosmtplib)
+- Compression, Google Drive uploads and attachment reads offloaded to threads
+- Attachments streamed to the server chunk by chunk, never built in memory
+- At most AUTOMATION_ASYNC_MAX_SENDS messages prepared or sending at once
+- The same validation, message building and logging as EmailSender
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from ....core.config import get_settings
+from .email_sender import EmailSender
+from .streaming_mime import CRLF, message_envelope, has_file_attachments, iter_message_bytes, stuff_dots
+
+try:
+    import aiosmtplib
+    AIOSMTPLIB_AVAILABLE = True
+except ImportError:
+    AIOSMTPLIB_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+def _is_throttle_error(error: Exception) -> bool:
+    """Check whether an aiosmtplib error is a transient 4xx reply (e.g. 421 or 451 rate limiting)"""
+    if isinstance(error, aiosmtplib.SMTPRecipientsRefused):
+        codes = [refused.code for refused in error.recipients]
+        return bool(codes) and all(400 <= code < 500 for code in codes)
+    if isinstance(error, aiosmtplib.SMTPResponseException):
+        return 400 <= error.code < 500
+    return False
+
+
+async def _send_streamed(client: "aiosmtplib.SMTP", msg):
+    """
+    Send a message with file attachments, streaming the DATA section.
+    
+    Async counterpart of streaming_mime.send_streamed_message: aiosmtplib only
+    accepts DATA as one bytes object, so the envelope goes through the client and
+    the message chunks are written to its protocol. Each chunk is rendered (and
+    its attachment read) on a worker thread, so the event loop never blocks on
+    file reads and only one chunk is held in memory at a time.
+    """
+    from_addr, to_addrs = message_envelope(msg)
+    bcc = msg.get_all("Bcc")
+    if bcc:
+        del msg["Bcc"]
+        
+    try:
+        await client.mail(from_addr)
+        refused = []
+        for address in to_addrs:
+            try:
+                await client.rcpt(address)
+            except aiosmtplib.SMTPRecipientRefused as e:
+                refused.append(e)
+        if len(refused) == len(to_addrs):
+            raise aiosmtplib.SMTPRecipientsRefused(refused)
+            
+        response = await client.execute_command(b"DATA")
+        if response.code != 354:
+            raise aiosmtplib.SMTPDataError(response.code, response.message)
+            
+        protocol = client.protocol
+        chunks = iter_message_bytes(msg)
+        while True:
+            chunk = await asyncio.to_thread(next, chunks, None)
+            if chunk is None:
+                break
+            protocol.write(stuff_dots(chunk))
+            await protocol._drain_helper()
+        protocol.write(b"." + CRLF)
+        
+        response = await protocol.read_response(timeout=client.timeout)
+        if response.code != 250:
+            raise aiosmtplib.SMTPDataError(response.code, response.message)
+    except (aiosmtplib.SMTPResponseException, aiosmtplib.SMTPRecipientsRefused):
+        try:
+            await client.rset()
+        except (ConnectionError, aiosmtplib.SMTPResponseException):
+            pass
+        raise
+    finally:
+        if bcc:
+            for value in bcc:
+                msg["Bcc"] = value
+
+
+async def _send_with_client(client: "aiosmtplib.SMTP", msg):
+    """Send a message, streaming file attachments from disk"""
+    if has_file_attachments(msg):
+        await _send_streamed(client, msg)
+    else:
+        await client.send_message(msg)
+
+
+class AsyncSMTPSessionPool:
+    """
+    Pool of persistent aiosmtplib sessions.
+    
+    At most pool_size messages are in flight at once. Sessions are opened lazily,
+    reused across messages, NOOP-checked when idle and recycled after
+    max_messages_per_session messages. Throttling replies pause every send on
+    this pool with exponential back-off before the message is retried.
+    """
+    
+    def __init__(self, smtp_server: str, port: int, username: str, password: str, use_tls: bool = True,
+                 pool_size: Optional[int] = None):
+        settings = get_settings()
+        
+        self.smtp_server = smtp_server
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.pool_size = max(1, pool_size or settings.SMTP_MAX_CONCURRENCY_PER_SERVER)
+        self.max_messages_per_session = settings.SMTP_MAX_MESSAGES_PER_SESSION
+        self.keepalive_interval = settings.SMTP_KEEPALIVE_SECONDS
+        self.max_retries = settings.SMTP_THROTTLE_MAX_RETRIES
+        self.backoff_base = settings.SMTP_THROTTLE_BACKOFF_SECONDS
+        self.backoff_max = settings.SMTP_THROTTLE_BACKOFF_MAX_SECONDS
+        
+        # Created on first use so the pool binds to the loop that runs the sends
+        self._idle: Optional[asyncio.LifoQueue] = None
+        self._sessions: List[dict] = []
+        self._backoff = 0.0
+        self._paused_until = 0.0
+        
+    def _ensure_started(self):
+        if self._idle is None:
+            self._idle = asyncio.LifoQueue()
+            for _ in range(self.pool_size):
+                session = {"client": None, "messages_sent": 0, "last_used": 0.0}
+                self._sessions.append(session)
+                self._idle.put_nowait(session)
+                
+    async def _connect(self) -> "aiosmtplib.SMTP":
+        """Open and authenticate a new SMTP session"""
+        client = aiosmtplib.SMTP(hostname=self.smtp_server, port=self.port, start_tls=self.use_tls)
+        await client.connect()
+        try:
+            await client.login(self.username, self.password)
+        except Exception:
+            client.close()
+            raise
+            
+        logger.debug(f"Opened async SMTP session to {self.smtp_server}:{self.port}")
+        return client
+        
+    async def _close_session(self, session: dict):
+        client, session["client"] = session["client"], None
+        if client is None:
+            return
+            
+        try:
+            await client.quit()
+        except Exception:
+            client.close()
+            
+    async def _get_client(self, session: dict) -> "aiosmtplib.SMTP":
+        """Return a live client for a session, recycling or reconnecting as needed"""
+        client = session["client"]
+        if client is not None:
+            if not client.is_connected or session["messages_sent"] >= self.max_messages_per_session:
+                await self._close_session(session)
+            elif time.monotonic() - session["last_used"] >= self.keepalive_interval:
+                try:
+                    await client.noop()
+                except aiosmtplib.SMTPException:
+                    await self._close_session(session)
+                    
+        if session["client"] is None:
+            session["client"] = await self._connect()
+            session["messages_sent"] = 0
+            
+        return session["client"]
+        
+    async def _wait_for_backoff(self):
+        delay = self._paused_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+            
+    def _record_throttle(self) -> float:
+        self._backoff = min(self.backoff_max, self._backoff * 2 if self._backoff else self.backoff_base)
+        self._paused_until = max(self._paused_until, time.monotonic() + self._backoff)
+        return self._backoff
+        
+    async def check_smtp_connection(self) -> Tuple[bool, str]:
+        """Check that an authenticated session to the SMTP server is available"""
+        self._ensure_started()
+        session = await self._idle.get()
+        try:
+            await self._get_client(session)
+            return True, ""
+        except Exception as e:
+            await self._close_session(session)
+            return False, str(e)
+        finally:
+            self._idle.put_nowait(session)
+            
+    async def send_message(self, msg):
+        """
+        Send email message via one of the pooled sessions.
+        
+        Raises:
+            aiosmtplib.SMTPException: If sending fails or the server keeps throttling
+        """
+        self._ensure_started()
+        
+        for attempt in range(self.max_retries + 1):
+            await self._wait_for_backoff()
+            session = await self._idle.get()
+            try:
+                client = await self._get_client(session)
+                try:
+                    await _send_with_client(client, msg)
+                except aiosmtplib.SMTPServerDisconnected:
+                    # Session dropped while idle - reconnect once and resend
+                    await self._close_session(session)
+                    client = await self._get_client(session)
+                    await _send_with_client(client, msg)
+            except Exception as e:
+                if not isinstance(e, aiosmtplib.SMTPRecipientsRefused):
+                    await self._close_session(session)
+                if not _is_throttle_error(e):
+                    raise
+                backoff = self._record_throttle()
+                if attempt >= self.max_retries:
+                    raise
+                logger.warning(f"SMTP server {self.smtp_server} is throttling ({str(e)}), retrying in {backoff:.1f}s")
+                continue
+            finally:
+                session["last_used"] = time.monotonic()
+                self._idle.put_nowait(session)
+                
+            session["messages_sent"] += 1
+            self._backoff = 0.0
+            return
+            
+    async def close(self):
+        """Close every pooled session"""
+        for session in self._sessions:
+            await self._close_session(session)
+
+
+class AsyncEmailSender:
+    """
+    Coroutine-based counterpart of EmailSender.
+    
+    Validation, compression, Google Drive uploads and message building reuse
+    EmailSender and run in worker threads; only SMTP delivery is native asyncio,
+    so one event loop can keep many sends in flight.
+    
+    Args:
+        smtp_server: SMTP server hostname
+        port: SMTP server port
+        username: SMTP username for authentication
+        password: SMTP password for authentication
+        use_tls: Whether to use TLS encryption (default: True)
+        archive_path: Path for storing email archives (optional)
+        compression_executor: Process pool used to zip attachments (optional)
+    """
+    
+    def __init__(self,
+                 smtp_server: str,
+                 port: int,
+                 username: str,
+                 password: str,
+                 use_tls: bool = True,
+                 archive_path: Optional[str] = None,
+                 compression_executor=None):
+        if not AIOSMTPLIB_AVAILABLE:
+            raise RuntimeError("aiosmtplib is not installed - the asyncio send engine is not available")
+            
+        self._sender = EmailSender(smtp_server, port, username, password, use_tls, archive_path, compression_executor)
+        self.smtp_pool = AsyncSMTPSessionPool(smtp_server, port, username, password, use_tls)
+        
+        # Bounds the messages being built or delivered, independently of how many
+        # emails the engine keeps in flight
+        self._send_slots = asyncio.Semaphore(max(1, get_settings().AUTOMATION_ASYNC_MAX_SENDS))
+        
+    async def send_email(self,
+                         recipient: str,
+                         subject: str,
+                         body: str,
+                         folder_path: Optional[str] = None,
+                         sender: Optional[str] = None,
+                         email_id: Optional[int] = None,
+                         gdrive_share_type: str = 'anyone',
+                         specific_emails: Optional[Any] = None) -> Tuple[bool, Optional[str]]:
+        """Send an email with optional compressed folder attachment"""
+        context = self._sender._new_send_context(recipient, subject, folder_path, email_id)
+        return await self._send(context, body, sender, gdrive_share_type, specific_emails)
+        
+    async def _send(self,
+                    context: Dict[str, Any],
+                    body: str,
+                    sender: Optional[str],
+                    gdrive_share_type: str,
+                    specific_emails: Optional[Any]) -> Tuple[bool, Optional[str]]:
+        """Prepare the message on a thread and deliver it over the async pool"""
+        async with self._send_slots:
+            msg, error_message = await asyncio.to_thread(
+                self._sender._prepare_email, context, body, sender, gdrive_share_type, specific_emails
+            )
+            if msg is None:
+                return False, error_message
+            
+            try:
+                await self.smtp_pool.send_message(msg)
+            except Exception as e:
+                return False, self._sender._record_send_failure(context, e)
+            
+        return True, self._sender._record_sent(context)
+        
+    async def send_email_with_validation(self, recipient: str, subject: str, body: str,
+                                         folder_path: Optional[str] = None,
+                                         sender: Optional[str] = None,
+                                         email_id: Optional[int] = None,
+                                         validate_mapping: bool = True,
+                                         gdrive_share_type: str = 'anyone',
+                                         specific_emails: Optional[Union[List[str], str]] = None) -> Tuple[bool, Optional[str]]:
+        """Send an email with full validation before compression and sending"""
+        # The blocking SMTP pre-flight is skipped; connection problems surface as delivery failures
+        context = self._sender._new_send_context(recipient, subject, folder_path, email_id)
+        error_message = await asyncio.to_thread(
+            self._sender._validate_before_send, recipient, subject, folder_path, email_id, validate_mapping, False, context
+        )
+        if error_message:
+            return False, error_message
+            
+        return await self._send(context, body, sender, gdrive_share_type, specific_emails)
+        
+    async def close(self):
+        """Close the pooled SMTP sessions"""
+        await self.smtp_pool.close()
+        self._sender.close()
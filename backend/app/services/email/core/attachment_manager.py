@@ -1,15 +1,20 @@
+import io
 import os
+import uuid
 import zipfile
 import logging
-import tempfile
-import shutil
+from concurrent.futures import Executor
 from datetime import datetime
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 from pathlib import Path
 
 from ....core.config import get_settings
 from ....utils.email_logger import email_logger
 from ....utils.file_utils import format_file_size
+from .compression_cache import get_compression_cache
+from .folder_scanner import FolderScan, get_folder_scanner, scan_folder
+from .parallel_zip import member_compression, supports_parallel_zip, write_parallel_zip
+from .size_estimator import get_compression_estimator
 
 logger = logging.getLogger(__name__)
 
@@ -39,8 +44,122 @@ def get_archive_path() -> str:
     
     return archive_path
 
+def _list_archive_members(folder_path: str, scan: FolderScan) -> List[Tuple[str, str]]:
+    """(file path, archive name) pairs for a scanned folder or single file"""
+    if not scan.directories:
+        return [(folder_path, os.path.basename(folder_path))]
+        
+    base_path = os.path.dirname(folder_path)
+    return [(file_path, os.path.relpath(file_path, base_path)) for file_path, _, _ in sorted(scan.files)]
+
+def _scan_attachment_folder(folder_path: str) -> Optional[FolderScan]:
+    """Memoised scan of a folder, or None if it cannot be read (compression then reports it)"""
+    try:
+        return get_folder_scanner().get(folder_path)
+    except OSError:
+        return None
+
+def _write_zip(target, members: List[Tuple[str, str]], compression_level: int):
+    """Write members to a zip file path or binary file object on the calling thread"""
+    with zipfile.ZipFile(target, 'w', zipfile.ZIP_DEFLATED, compresslevel=compression_level) as zipf:
+        for file_path, arcname in members:
+            zipf.write(file_path, arcname, compress_type=member_compression(file_path))
+
+def compress_folder_to_archive(folder_path: str,
+                               archive_path: str,
+                               zip_filename: Optional[str] = None,
+                               member_executor: Optional[Executor] = None,
+                               compression_level: Optional[int] = None,
+                               scan: Optional[FolderScan] = None) -> Tuple[Optional[str], Optional[int]]:
+    """
+    Compress a folder and move it to the archive directory.
+    
+    Module-level so it can also run in a worker process. Without a zip_filename
+    the archive gets a timestamped name. With a member_executor the member files
+    are deflated in parallel; already-compressed formats are always stored.
+    Members and sizes come from scan (the caller's memoised FolderScan), so the
+    folder is only walked here when no scan is passed.
+    """
+    try:
+        if not os.path.exists(folder_path):
+            error_msg = f"Folder path does not exist for compression: {folder_path}"
+            logger.error(error_msg)
+            email_logger.log_error(error_msg)
+            return None, None
+            
+        if not zip_filename:
+            folder_name = os.path.basename(folder_path)
+            # Microseconds keep names unique when several workers zip same-named folders
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+            zip_filename = f"{folder_name}_{timestamp}.zip"
+        archive_file_path = os.path.join(archive_path, zip_filename)
+        
+        # Written next to its final name and renamed into place, so the archive is never
+        # copied between filesystems and nobody sees a half-written zip under the real name
+        partial_path = f"{archive_file_path}.{uuid.uuid4().hex[:8]}.partial"
+        
+        try:
+            if scan is None:
+                scan = scan_folder(folder_path)
+            members = _list_archive_members(folder_path, scan)
+            if not members:
+                error_msg = f"No files found in folder for compression: {folder_path}"
+                logger.error(error_msg)
+                email_logger.log_error(error_msg)
+                return None, None
+                
+            if compression_level is None:
+                compression_level = get_settings().ATTACHMENT_COMPRESSION_LEVEL
+                
+            if member_executor is not None and supports_parallel_zip(members, scan.total_size):
+                sizes = {file_path: size for file_path, size, _ in scan.files}
+                write_parallel_zip(partial_path, members, member_executor, compression_level, sizes)
+            else:
+                _write_zip(partial_path, members, compression_level)
+                
+            os.replace(partial_path, archive_file_path)
+        except Exception as zip_error:
+            error_msg = f"Error creating zip file for {folder_path}: {str(zip_error)}"
+            logger.error(error_msg)
+            email_logger.log_error(error_msg)
+            
+            try:
+                if os.path.exists(partial_path):
+                    os.remove(partial_path)
+            except OSError:
+                pass
+            return None, None
+            
+        try:
+            compressed_size = os.path.getsize(archive_file_path)
+            
+            if compressed_size == 0:
+                error_msg = f"Compressed file is empty: {archive_file_path}"
+                logger.error(error_msg)
+                email_logger.log_error(error_msg)
+                
+                os.remove(archive_file_path)
+                return None, None
+                
+            formatted_size = format_file_size(compressed_size)
+        except Exception as size_error:
+            error_msg = f"Error getting compressed file size: {str(size_error)}"
+            logger.error(error_msg)
+            email_logger.log_error(error_msg)
+            return None, None
+            
+        return archive_file_path, compressed_size
+    except Exception as compression_error:
+        error_msg = f"Error compressing folder: {str(compression_error)}"
+        logger.error(error_msg)
+        email_logger.log_error(error_msg)
+        return None, None
+
 class AttachmentManager:
-    def __init__(self, archive_path: Optional[str] = None):
+    def __init__(self, archive_path: Optional[str] = None, compression_executor: Optional[Executor] = None):
+        # Optional process pool so CPU-bound zipping does not contend for the GIL
+        self.compression_executor = compression_executor
+        
         if not archive_path:
             archive_path = get_archive_path()
         
@@ -51,91 +170,95 @@ class AttachmentManager:
             
         os.makedirs(self.archive_path, exist_ok=True)
     
+        # Shared by every manager using this archive directory
+        self.compression_cache = None
+        if get_settings().ATTACHMENT_CACHE_ENABLED:
+            self.compression_cache = get_compression_cache(self.archive_path)
+            
     def get_folder_size(self, folder_path: str) -> int:
-        """Calculate the total size of a folder in bytes"""
-        total_size = 0
+        """Calculate the total size of a folder in bytes (memoised while the folder is unchanged)"""
+        try:
+            return get_folder_scanner().get_size(folder_path)
+        except OSError:
+            return 0
+    
+    def estimate_compressed_size(self, folder_path: str) -> int:
+        """Predict the archive size of a folder without compressing it"""
+        files = [(file_path, size) for file_path, size, _ in get_folder_scanner().get(folder_path).files]
+        return get_compression_estimator().estimate_files(files)
         
-        if os.path.isfile(folder_path):
-            return os.path.getsize(folder_path)
+    def compress_folder_in_memory(self, folder_path: str, original_size: int) -> Tuple[Optional[bytes], Optional[int]]:
+        """
+        Compress a small folder into memory, without writing an archive file.
+        
+        Only used for folders up to ATTACHMENT_IN_MEMORY_MAX_MB, which always stay
+        below the Google Drive threshold so the bytes can go straight into the MIME part.
+        Like archives, the bytes are reused through the compression cache while the
+        folder is unchanged, so later recipients and retries do not zip it again.
+        
+        Returns:
+            Tuple of (zip bytes, size), or (None, None) if the folder should be compressed to disk
+        """
+        settings = get_settings()
+        limit = min(settings.ATTACHMENT_IN_MEMORY_MAX_MB, settings.GDRIVE_UPLOAD_THRESHOLD_MB) * 1024 * 1024
+        if not original_size or original_size > limit:
+            return None, None
             
-        for dirpath, _, filenames in os.walk(folder_path):
-            for filename in filenames:
-                file_path = os.path.join(dirpath, filename)
-                if os.path.isfile(file_path):
-                    total_size += os.path.getsize(file_path)
-                    
-        return total_size
-    
-    def compress_folder(self, folder_path: str) -> Tuple[Optional[str], Optional[int]]:
-        """Compress a folder and move it to the archive directory"""
+        if self.compression_cache is not None:
+            data = self.compression_cache.get_or_create_in_memory(folder_path, self._zip_in_memory)
+        else:
+            data = self._zip_in_memory(folder_path)
+            
+        # Stored members can make the zip slightly larger than its contents
+        if not data or len(data) > limit:
+            return None, None
+        return data, len(data)
+        
+    def _zip_in_memory(self, folder_path: str) -> Optional[bytes]:
         try:
-            if not os.path.exists(folder_path):
-                error_msg = f"Folder path does not exist for compression: {folder_path}"
-                logger.error(error_msg)
-                email_logger.log_error(error_msg)
-                return None, None
+            members = _list_archive_members(folder_path, get_folder_scanner().get(folder_path))
+            if not members:
+                return None
                 
-            folder_name = os.path.basename(folder_path)
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            zip_filename = f"{folder_name}_{timestamp}.zip"
-            archive_file_path = os.path.join(self.archive_path, zip_filename)
+            buffer = io.BytesIO()
+            _write_zip(buffer, members, get_settings().ATTACHMENT_COMPRESSION_LEVEL)
+            return buffer.getvalue()
+        except Exception as e:
+            logger.warning(f"In-memory compression failed for {folder_path}, using the archive: {str(e)}")
+            return None
+        
+    def compress_folder(self, folder_path: str) -> Tuple[Optional[str], Optional[int]]:
+        """Compress a folder into the archive directory, reusing the cached archive if the folder is unchanged"""
+        if self.compression_cache is not None:
+            return self.compression_cache.get_or_create(folder_path, self._compress)
+        return self._compress(folder_path)
+        
+    def _compress(self, folder_path: str, zip_filename: Optional[str] = None) -> Tuple[Optional[str], Optional[int]]:
+        archive_file_path, compressed_size = self._build_archive(folder_path, zip_filename)
+        if archive_file_path:
+            # Every fresh archive sharpens the size predictions used for routing
+            get_compression_estimator().learn_from_archive(archive_file_path)
+        return archive_file_path, compressed_size
+        
+    def _build_archive(self, folder_path: str, zip_filename: Optional[str] = None) -> Tuple[Optional[str], Optional[int]]:
+        # The memoised scan (usually already taken for sizing and the cache key) lists the members
+        scan = _scan_attachment_folder(folder_path)
+        if self.compression_executor is None:
+            return compress_folder_to_archive(folder_path, self.archive_path, zip_filename, scan=scan)
             
-            with tempfile.TemporaryDirectory() as temp_dir:
-                temp_zip_path = os.path.join(temp_dir, zip_filename)
-                
-                try:
-                    with zipfile.ZipFile(temp_zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                        if os.path.isfile(folder_path):
-                            zipf.write(folder_path, os.path.basename(folder_path))
-                        else:
-                            files_found = False
-                            for root, _, files in os.walk(folder_path):
-                                for file in files:
-                                    files_found = True
-                                    file_path = os.path.join(root, file)
-                                    arcname = os.path.relpath(file_path, os.path.dirname(folder_path))
-                                    zipf.write(file_path, arcname)
-                            
-                            if not files_found:
-                                error_msg = f"No files found in folder for compression: {folder_path}"
-                                logger.error(error_msg)
-                                email_logger.log_error(error_msg)
-                                return None, None
-                except Exception as zip_error:
-                    error_msg = f"Error creating zip file for {folder_path}: {str(zip_error)}"
-                    logger.error(error_msg)
-                    email_logger.log_error(error_msg)
-                    return None, None
-                
-                try:
-                    shutil.move(temp_zip_path, archive_file_path)
-                except Exception as move_error:
-                    error_msg = f"Error moving zip file to archive path: {str(move_error)}"
-                    logger.error(error_msg)
-                    email_logger.log_error(error_msg)
-                    return None, None
-                
-                try:
-                    compressed_size = os.path.getsize(archive_file_path)
-                    
-                    if compressed_size == 0:
-                        error_msg = f"Compressed file is empty: {archive_file_path}"
-                        logger.error(error_msg)
-                        email_logger.log_error(error_msg)
-                        
-                        os.remove(archive_file_path)
-                        return None, None
-                        
-                    formatted_size = format_file_size(compressed_size)
-                except Exception as size_error:
-                    error_msg = f"Error getting compressed file size: {str(size_error)}"
-                    logger.error(error_msg)
-                    email_logger.log_error(error_msg)
-                    return None, None
-                
-                return archive_file_path, compressed_size
-        except Exception as compression_error:
-            error_msg = f"Error compressing folder: {str(compression_error)}"
+        # Large folders are spread over the whole pool, one member per task
+        settings = get_settings()
+        if scan is not None and scan.total_size >= settings.ATTACHMENT_PARALLEL_ZIP_MIN_MB * 1024 * 1024:
+            return compress_folder_to_archive(
+                folder_path, self.archive_path, zip_filename, member_executor=self.compression_executor, scan=scan
+            )
+            
+        try:
+            return self.compression_executor.submit(
+                compress_folder_to_archive, folder_path, self.archive_path, zip_filename, scan=scan
+            ).result()
+        except Exception as e:
+            error_msg = f"Error compressing folder in worker process: {str(e)}"
             logger.error(error_msg)
             email_logger.log_error(error_msg)
             return None, None
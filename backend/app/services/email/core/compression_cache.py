@@ -0,0 +1,323 @@
+"""
+Content-addressed cache of compressed attachment archives.
+
+The archive zip for a folder is named after a hash of the folder's path and
+manifest (relative paths, sizes and modification times, optionally file
+contents), so the same File_Path sent to several recipients or retried is
+compressed once. The path is part of the hash so two folders with identical
+layouts (e.g. copies that kept their mtimes) never share an archive.
+Cached archives live in EMAIL_ARCHIVE_PATH and are evicted least recently used
+first once the cache grows past ATTACHMENT_CACHE_MAX_MB. Small folders zipped in
+memory (ATTACHMENT_IN_MEMORY_MAX_MB) are kept under the same key in a bounded
+in-memory LRU of ATTACHMENT_MEMORY_CACHE_MB.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from ....core.config import get_settings
+from .folder_scanner import get_folder_scanner
+
+logger = logging.getLogger(__name__)
+
+# Cached archives are named <folder>_<16 hex digits of the manifest hash>.zip
+_CACHE_FILE_PATTERN = re.compile(r"_([0-9a-f]{16})\.zip$")
+
+# Archives used this recently are never evicted, so an email about to attach one keeps it
+_MIN_EVICTION_AGE_SECONDS = 300
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def _hash_file(file_path: str, digest) -> None:
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+
+
+def build_manifest_hash(folder_path: str, hash_contents: bool = False) -> Optional[str]:
+    """
+    Hash a folder's normalized absolute path and manifest (relative path, size and mtime of every file).
+    
+    The manifest comes from the shared folder scan, reused while the folder's
+    directory mtimes are unchanged (and for at most FOLDER_SCAN_CACHE_SECONDS),
+    so sizing, hashing and compressing a folder share one walk.
+    
+    Args:
+        folder_path: Folder (or single file) to describe
+        hash_contents: Also hash file contents, for shares where mtimes are unreliable
+        
+    Returns:
+        Hex digest, or None if the folder has no files or cannot be read
+    """
+    digest = hashlib.sha256()
+    
+    try:
+        files = get_folder_scanner().get(folder_path).files
+        if not files:
+            return None
+            
+        base_path = os.path.dirname(folder_path) if os.path.isfile(folder_path) else folder_path
+        digest.update(os.path.normcase(os.path.abspath(folder_path)).encode("utf-8") + b"\0")
+        
+        # Sorted so the hash does not depend on directory listing order
+        for file_path, size, mtime_ns in sorted(files):
+            relative_path = os.path.relpath(file_path, base_path)
+            digest.update(f"{relative_path.replace(os.sep, '/')}\0{size}\0{mtime_ns}\0".encode("utf-8"))
+            if hash_contents:
+                _hash_file(file_path, digest)
+                
+        return digest.hexdigest()
+    except OSError as e:
+        logger.warning(f"Could not build manifest for {folder_path}: {str(e)}")
+        return None
+
+
+class CompressionCache:
+    """
+    LRU index of the cached archives in one archive directory.
+    
+    The index is rebuilt from the directory on first use, so cached archives
+    survive restarts; last use is kept in each file's mtime, which also lets the
+    age-based archive cleanup treat recently reused archives as recent.
+    """
+    
+    def __init__(self, archive_path: str, max_bytes: Optional[int] = None, hash_contents: Optional[bool] = None,
+                 memory_max_bytes: Optional[int] = None):
+        settings = get_settings()
+        
+        self.archive_path = archive_path
+        self.max_bytes = max_bytes if max_bytes is not None else settings.ATTACHMENT_CACHE_MAX_MB * 1024 * 1024
+        self.hash_contents = hash_contents if hash_contents is not None else settings.ATTACHMENT_CACHE_HASH_CONTENTS
+        self.memory_max_bytes = (memory_max_bytes if memory_max_bytes is not None
+                                 else settings.ATTACHMENT_MEMORY_CACHE_MB * 1024 * 1024)
+        
+        self._entries: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()
+        self._total_bytes = 0
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+        # key -> [lock, threads holding or waiting for it]; dropped when the count reaches 0
+        self._key_locks: Dict[str, List] = {}
+        self.hits = 0
+        self.misses = 0
+        
+    def _load_locked(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        
+        try:
+            files = []
+            for entry in os.scandir(self.archive_path):
+                match = _CACHE_FILE_PATTERN.search(entry.name)
+                if match and entry.is_file():
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, match.group(1), entry.path, stat.st_size))
+        except OSError as e:
+            logger.warning(f"Could not scan archive for cached attachments: {str(e)}")
+            return
+            
+        # Oldest first, matching LRU order
+        for _, key, path, size in sorted(files):
+            self._entries[key] = (path, size)
+            self._total_bytes += size
+            
+    def _lookup(self, key: str) -> Optional[Tuple[str, int]]:
+        with self._lock:
+            self._load_locked()
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+                
+            path, size = entry
+            if not os.path.exists(path):
+                # Removed behind our back, e.g. by the archive cleanup
+                del self._entries[key]
+                self._total_bytes -= size
+                return None
+                
+            self._entries.move_to_end(key)
+            
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path, size
+        
+    def _add(self, key: str, path: str, size: int):
+        with self._lock:
+            self._load_locked()
+            previous = self._entries.pop(key, None)
+            if previous:
+                self._total_bytes -= previous[1]
+            self._entries[key] = (path, size)
+            self._total_bytes += size
+            
+        self.evict()
+        
+    @contextmanager
+    def _key_lock(self, key: str) -> Iterator[None]:
+        """Hold the per-key lock, dropping it from _key_locks once nobody holds or waits for it"""
+        with self._lock:
+            entry = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._key_locks[key]
+                    
+    def get_or_create(self,
+                      folder_path: str,
+                      create: Callable[[str, str], Tuple[Optional[str], Optional[int]]]) -> Tuple[Optional[str], Optional[int]]:
+        """
+        Return the cached archive for a folder, compressing it on a miss.
+        
+        Args:
+            folder_path: Folder to compress
+            create: Called as create(folder_path, zip_filename) on a miss; returns (archive path, size)
+            
+        Returns:
+            Tuple of (archive path, compressed size), or (None, None) on failure
+        """
+        key = build_manifest_hash(folder_path, self.hash_contents)
+        if key is None:
+            # Let the compressor report the missing or empty folder
+            return create(folder_path, None)
+        key = key[:16]
+        
+        # Workers asking for the same folder at once wait for one compression
+        with self._key_lock(key):
+            cached = self._lookup(key)
+            if cached:
+                self.hits += 1
+                logger.debug(f"Reusing cached archive {cached[0]} for {folder_path}")
+                return cached
+                
+            self.misses += 1
+            folder_name = os.path.basename(os.path.normpath(folder_path))
+            archive_file_path, compressed_size = create(folder_path, f"{folder_name}_{key}.zip")
+            if archive_file_path and compressed_size:
+                self._add(key, archive_file_path, compressed_size)
+            return archive_file_path, compressed_size
+            
+    def get_or_create_in_memory(self,
+                                folder_path: str,
+                                create: Callable[[str], Optional[bytes]]) -> Optional[bytes]:
+        """
+        Return the cached in-memory zip of a folder, compressing it on a miss.
+        
+        Args:
+            folder_path: Folder to compress
+            create: Called as create(folder_path) on a miss; returns the zip bytes or None
+            
+        Returns:
+            Zip bytes, or None if the folder should be compressed to disk
+        """
+        key = build_manifest_hash(folder_path, self.hash_contents)
+        if key is None or self.memory_max_bytes <= 0:
+            return create(folder_path)
+        key = key[:16]
+        
+        with self._key_lock(key):
+            with self._lock:
+                data = self._memory.get(key)
+                if data is not None:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return data
+                    
+            self.misses += 1
+            data = create(folder_path)
+            if data is None or len(data) > self.memory_max_bytes:
+                return data
+                
+            with self._lock:
+                self._memory[key] = data
+                self._memory_bytes += len(data)
+                while self._memory_bytes > self.memory_max_bytes:
+                    _, evicted = self._memory.popitem(last=False)
+                    self._memory_bytes -= len(evicted)
+            return data
+            
+    def evict(self, max_bytes: Optional[int] = None) -> int:
+        """
+        Remove least recently used archives until the cache fits in max_bytes.
+        
+        Returns:
+            Number of archives removed
+        """
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        cutoff = time.time() - _MIN_EVICTION_AGE_SECONDS
+        removed = 0
+        
+        with self._lock:
+            self._load_locked()
+            for key in list(self._entries):
+                if self._total_bytes <= limit:
+                    break
+                    
+                path, size = self._entries[key]
+                try:
+                    if os.path.exists(path):
+                        if os.path.getmtime(path) > cutoff:
+                            continue
+                        os.remove(path)
+                        removed += 1
+                except OSError as e:
+                    logger.warning(f"Could not evict cached archive {path}: {str(e)}")
+                    continue
+                    
+                del self._entries[key]
+                self._total_bytes -= size
+                
+        if removed:
+            logger.info(f"Evicted {removed} cached attachment archives")
+        return removed
+        
+    def forget_missing(self) -> int:
+        """Drop index entries whose archive was deleted (e.g. by the age-based cleanup)"""
+        with self._lock:
+            missing = [key for key, (path, _) in self._entries.items() if not os.path.exists(path)]
+            for key in missing:
+                self._total_bytes -= self._entries.pop(key)[1]
+            return len(missing)
+            
+    def stats(self) -> Dict[str, int]:
+        """Get cache size and hit counters"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "total_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+_caches: Dict[str, CompressionCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_compression_cache(archive_path: str) -> CompressionCache:
+    """Get the shared cache for an archive directory"""
+    key = os.path.normcase(os.path.abspath(archive_path))
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = _caches[key] = CompressionCache(archive_path)
+        return cache
@@ -11,6 +11,7 @@ This module provides comprehensive email sending capabilities including:
 
 import os
 import logging
+from concurrent.futures import Executor
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.application import MIMEApplication
@@ -21,17 +22,23 @@ from ....utils.email_logger import email_logger
 from ....utils.file_utils import format_file_size
 from .validation_utils import ValidationUtils
 from .attachment_manager import AttachmentManager, format_size
-from .smtp_manager import SMTPManager
+from .smtp_pool import SMTPSessionPool
+from .streaming_mime import FileAttachment
 from ..gdrive.gdrive_integration import GDriveIntegration, GDRIVE_UPLOAD_THRESHOLD, SAFE_MAX_SIZE
 
 logger = logging.getLogger(__name__)
 
+# How an attachment folder is delivered, decided before compression
+ATTACHMENT_ROUTE_ATTACH = "attach"
+ATTACHMENT_ROUTE_GDRIVE = "gdrive"
+ATTACHMENT_ROUTE_REJECT = "reject"
+
 class EmailSender:
     """
     Comprehensive email sending service with attachment and Google Drive integration.
     
     This class provides a complete email sending solution that includes:
-    - SMTP configuration and connection management
+    - SMTP configuration and pooled connection management (safe to share between threads)
     - File attachment handling with compression
     - Google Drive integration for large files
     - Email validation and delivery tracking
@@ -44,6 +51,7 @@ class EmailSender:
         password: SMTP password for authentication
         use_tls: Whether to use TLS encryption (default: True)
         archive_path: Path for storing email archives (optional)
+        compression_executor: Process pool used to zip attachments (optional)
     """
     
     def __init__(self, 
@@ -52,9 +60,10 @@ class EmailSender:
                  username: str, 
                  password: str, 
                  use_tls: bool = True,
-                 archive_path: Optional[str] = None):
-        self.smtp_manager = SMTPManager(smtp_server, port, username, password, use_tls)
-        self.attachment_manager = AttachmentManager(archive_path)
+                 archive_path: Optional[str] = None,
+                 compression_executor: Optional[Executor] = None):
+        self.smtp_manager = SMTPSessionPool(smtp_server, port, username, password, use_tls)
+        self.attachment_manager = AttachmentManager(archive_path, compression_executor)
         self.validation_utils = ValidationUtils()
         self.gdrive_integration = GDriveIntegration()
         
@@ -80,6 +89,95 @@ class EmailSender:
                   gdrive_share_type: str = 'anyone',
                   specific_emails: Optional[Any] = None) -> Tuple[bool, Optional[str]]:
         """Send an email with optional compressed folder attachment"""
+        context = self._new_send_context(recipient, subject, folder_path, email_id)
+        return self._send(context, body, sender, gdrive_share_type, specific_emails)
+        
+    def _send(self,
+              context: Dict[str, Any],
+              body: str,
+              sender: Optional[str],
+              gdrive_share_type: str,
+              specific_emails: Optional[Any]) -> Tuple[bool, Optional[str]]:
+        """Prepare and deliver the message for a send context"""
+        msg, error_message = self._prepare_email(context, body, sender, gdrive_share_type, specific_emails)
+        if msg is None:
+            return False, error_message
+            
+        return self.deliver_message(msg, context)
+        
+    def prepare_message(self,
+                        recipient: str,
+                        subject: str,
+                        body: str,
+                        folder_path: Optional[str] = None,
+                        sender: Optional[str] = None,
+                        email_id: Optional[int] = None,
+                        validate_mapping: bool = True,
+                        gdrive_share_type: str = 'anyone',
+                        specific_emails: Optional[Union[List[str], str]] = None) -> Tuple[Optional[MIMEMultipart], Dict[str, Any], Optional[str]]:
+        """
+        Validate, compress or upload the attachment and build a message without sending it.
+        
+        Used by staged delivery, where preparing one email overlaps sending another.
+        
+        Returns:
+            Tuple of (message or None, send context for deliver_message, failure reason)
+        """
+        context = self._new_send_context(recipient, subject, folder_path, email_id)
+        error_message = self._validate_before_send(recipient, subject, folder_path, email_id, validate_mapping, False, context)
+        if error_message:
+            return None, context, error_message
+            
+        msg, error_message = self._prepare_email(context, body, sender, gdrive_share_type, specific_emails)
+        return msg, context, error_message
+        
+    def deliver_message(self, msg: MIMEMultipart, context: Dict[str, Any]) -> Tuple[bool, str]:
+        """Send a prepared message and log the outcome"""
+        try:
+            self.smtp_manager.send_message(msg)
+        except Exception as e:
+            return False, self._record_send_failure(context, e)
+            
+        return True, self._record_sent(context)
+        
+    def _new_send_context(self, recipient: str, subject: str, folder_path: Optional[str], email_id: Optional[int]) -> Dict[str, Any]:
+        """Create the per-message record shared by preparation, delivery and logging"""
+        return {
+            "recipient": recipient,
+            "subject": subject,
+            "folder_path": folder_path,
+            "email_id": email_id,
+            "attachment_path": None,
+            "original_size": None,
+            "compressed_size": None,
+            "used_gdrive": False,
+            # Attachment route and archive size estimate chosen by _validate_before_send,
+            # acted on by _prepare_email
+            "route": None,
+            "estimated_size": None
+        }
+        
+    def _prepare_email(self,
+                       context: Dict[str, Any],
+                       body: str,
+                       sender: Optional[str] = None,
+                       gdrive_share_type: str = 'anyone',
+                       specific_emails: Optional[Any] = None) -> Tuple[Optional[MIMEMultipart], Optional[str]]:
+        """
+        Validate the recipient, compress or upload the attachment and build the message.
+        
+        Only the blocking preparation happens here; delivery is left to the caller so
+        the threaded and the asyncio engines share it. Attachment details are recorded
+        in context as they become known.
+        
+        Returns:
+            Tuple of (message, None), or (None, failure reason) if it must not be sent
+        """
+        recipient = context["recipient"]
+        subject = context["subject"]
+        folder_path = context["folder_path"]
+        email_id = context["email_id"]
+        
         try:
             is_valid, error_reason = self.validation_utils.validate_email(recipient)
             if not is_valid:
@@ -92,21 +190,10 @@ class EmailSender:
                     status="Failed",
                     reason=error_message
                 )
-                return False, error_message
-                
-            is_connected, error_reason = self.smtp_manager.check_smtp_connection()
-            if not is_connected:
-                error_message = f"ERROR: {error_reason}"
-                email_logger.log_email_transaction(
-                    email_id=email_id,
-                    email=recipient,
-                    subject=subject,
-                    file_path=folder_path,
-                    status="Failed",
-                    reason=error_message
-                )
-                return False, error_message
+                return None, error_message
                 
+            # No per-message SMTP pre-flight: the session pool reconnects on its own
+            # and delivery failures are reported by the caller
             msg = MIMEMultipart()
             msg['From'] = sender or self.smtp_manager.username
             msg['To'] = recipient
@@ -115,6 +202,7 @@ class EmailSender:
             email_body = body
             
             attachment_path = None
+            attachment_data = None
             original_size = None
             compressed_size = None
             used_gdrive = False
@@ -132,10 +220,34 @@ class EmailSender:
                         status="Failed",
                         reason=error_message
                     )
-                    return False, error_message
+                    return None, error_message
                 
-                original_size = self.attachment_manager.get_folder_size(folder_path)
-                attachment_path, compressed_size = self.attachment_manager.compress_folder(folder_path)
+                # Validation normally chose the route already; only unvalidated sends decide here
+                original_size = context["original_size"]
+                route = context["route"]
+                estimated_size = context["estimated_size"]
+                if route is None:
+                    original_size = self.attachment_manager.get_folder_size(folder_path)
+                    route, reason, estimated_size = self._route_attachment(folder_path, original_size)
+                    if route == ATTACHMENT_ROUTE_REJECT:
+                        email_logger.log_email_transaction(
+                            email_id=email_id,
+                            email=recipient,
+                            subject=subject,
+                            file_path=folder_path,
+                            status="Failed",
+                            reason=reason,
+                            original_size=original_size
+                        )
+                        return None, reason
+                
+                # Small folders are zipped straight into memory and never touch the archive
+                attachment_data, compressed_size = self.attachment_manager.compress_folder_in_memory(folder_path, original_size)
+                if attachment_data is not None:
+                    attachment_path = f"{os.path.basename(os.path.normpath(folder_path))}.zip"
+                else:
+                    attachment_path, compressed_size = self.attachment_manager.compress_folder(folder_path)
+                context.update(original_size=original_size, attachment_path=attachment_path, compressed_size=compressed_size)
                 
                 if not attachment_path or not compressed_size:
                     error_message = "ERROR: Failed to compress attachment folder"
@@ -147,70 +259,42 @@ class EmailSender:
                         status="Failed",
                         reason=error_message
                     )
-                    return False, error_message
+                    return None, error_message
                 
-                if attachment_path and compressed_size > GDRIVE_UPLOAD_THRESHOLD:
+                # The route came from an estimate; the real archive size only corrects a wrong one
+                if route == ATTACHMENT_ROUTE_GDRIVE and compressed_size <= GDRIVE_UPLOAD_THRESHOLD:
+                    route = ATTACHMENT_ROUTE_ATTACH
+                elif (route == ATTACHMENT_ROUTE_ATTACH and compressed_size > GDRIVE_UPLOAD_THRESHOLD and
+                        (estimated_size is None or estimated_size <= GDRIVE_UPLOAD_THRESHOLD)):
+                    # Estimated small enough to attach, so Drive was never checked
                     is_available, gdrive_error = self.gdrive_integration.check_gdrive_availability()
+                    if is_available:
+                        route = ATTACHMENT_ROUTE_GDRIVE
+                    else:
+                        email_logger.log_warning(f"Google Drive not available: {gdrive_error}. Will try regular attachment ({format_size(compressed_size)}).")
                     
-                    if not is_available:
-                        formatted_size = format_size(compressed_size)
+                # Without Drive, archives over the limit are rejected by the direct attachment check below
+                if route == ATTACHMENT_ROUTE_GDRIVE:
+                    try:
+                        upload_success, drive_link, success_msg = self.gdrive_integration.handle_large_file_upload(
+                            attachment_path, gdrive_share_type, specific_emails, recipient
+                        )
                         
-                        # For very large files that exceed safe limits, fail immediately if GDrive is not available
-                        if compressed_size > SAFE_MAX_SIZE:
-                            reason = f"ERROR: Attachment too large ({formatted_size}) - exceeds limit of {format_size(SAFE_MAX_SIZE)} and Google Drive is not available"
-                            email_logger.log_error(f"Cannot send email: {reason}")
-                            email_logger.log_email_transaction(
-                                email_id=email_id,
-                                email=recipient,
-                                subject=subject,
-                                file_path=folder_path,
-                                status="Failed",
-                                reason=reason,
-                                original_size=original_size,
-                                compressed_size=compressed_size
-                            )
-                            return False, reason
-                            
-                        # For files that are large but within safe limits, we can try direct attachment
-                        warning_msg = f"Google Drive not available: {gdrive_error}. Will try regular attachment ({formatted_size})."
-                        email_logger.log_warning(warning_msg)
-                    else:
-                        try:
-                            upload_success, drive_link, success_msg = self.gdrive_integration.handle_large_file_upload(
-                                attachment_path, gdrive_share_type, specific_emails, recipient
-                            )
+                        if upload_success and drive_link:
+                            gdrive_link = drive_link
+                            used_gdrive = True
+                            context["used_gdrive"] = True
                             
-                            if upload_success and drive_link:
-                                gdrive_link = drive_link
-                                used_gdrive = True
-                                
-                                link_html = self.gdrive_integration.create_drive_link_html(gdrive_link, attachment_path)
-                                email_body += link_html
-                                
-                                formatted_size = format_size(compressed_size)
-                                success_reason = f"Large attachment handled via Google Drive sharing ({formatted_size})"
-                                email_logger.log_info(success_reason)
-                            else:
-                                email_logger.log_warning(f"Google Drive upload failed: {success_msg}. Attempting regular attachment.")
-                                if compressed_size > SAFE_MAX_SIZE:
-                                    reason = f"ERROR: File too large ({format_size(compressed_size)}) - GDrive upload failed: {success_msg}"
-                                    email_logger.log_email_transaction(
-                                        email_id=email_id,
-                                        email=recipient,
-                                        subject=subject,
-                                        file_path=folder_path,
-                                        status="Failed",
-                                        reason=reason,
-                                        original_size=original_size,
-                                        compressed_size=compressed_size
-                                    )
-                                    return False, reason
-                        except Exception as e:
-                            error_message = f"Error using Google Drive for large file: {str(e)}"
-                            email_logger.log_error(error_message)
+                            link_html = self.gdrive_integration.create_drive_link_html(gdrive_link, attachment_path)
+                            email_body += link_html
                             
+                            formatted_size = format_size(compressed_size)
+                            success_reason = f"Large attachment handled via Google Drive sharing ({formatted_size})"
+                            email_logger.log_info(success_reason)
+                        else:
+                            email_logger.log_warning(f"Google Drive upload failed: {success_msg}. Attempting regular attachment.")
                             if compressed_size > SAFE_MAX_SIZE:
-                                reason = f"Attachment too large: {compressed_size} bytes exceeds safe limit of {SAFE_MAX_SIZE} bytes and Google Drive integration failed"
+                                reason = f"ERROR: File too large ({format_size(compressed_size)}) - GDrive upload failed: {success_msg}"
                                 email_logger.log_email_transaction(
                                     email_id=email_id,
                                     email=recipient,
@@ -221,7 +305,24 @@ class EmailSender:
                                     original_size=original_size,
                                     compressed_size=compressed_size
                                 )
-                                return False, reason
+                                return None, reason
+                    except Exception as e:
+                        error_message = f"Error using Google Drive for large file: {str(e)}"
+                        email_logger.log_error(error_message)
+                        
+                        if compressed_size > SAFE_MAX_SIZE:
+                            reason = f"Attachment too large: {compressed_size} bytes exceeds safe limit of {SAFE_MAX_SIZE} bytes and Google Drive integration failed"
+                            email_logger.log_email_transaction(
+                                email_id=email_id,
+                                email=recipient,
+                                subject=subject,
+                                file_path=folder_path,
+                                status="Failed",
+                                reason=reason,
+                                original_size=original_size,
+                                compressed_size=compressed_size
+                            )
+                            return None, reason
                 
                 if attachment_path and not used_gdrive:
                     if compressed_size > SAFE_MAX_SIZE:
@@ -245,7 +346,7 @@ class EmailSender:
                             original_size=original_size,
                             compressed_size=compressed_size
                         )
-                        return False, reason
+                        return None, reason
                     
                     filename = os.path.basename(attachment_path)
                     formatted_size = format_size(compressed_size)
@@ -255,62 +356,74 @@ class EmailSender:
                     email_logger.log_info(direct_attach_msg, email_id=email_id)
                     logger.info(direct_attach_msg)
                     
-                    with open(attachment_path, 'rb') as file:
-                        attach = MIMEApplication(file.read(), _subtype='zip')
+                    if attachment_data is None:
+                        # Base64-encoded from disk in chunks while the message is sent
+                        attach = FileAttachment(attachment_path, filename)
+                    else:
+                        attach = MIMEApplication(attachment_data, _subtype='zip')
                         attach.add_header('Content-Disposition', f'attachment; filename="{filename}"')
-                        msg.attach(attach)
+                    msg.attach(attach)
             
             html_part = MIMEText(email_body, 'html')
             html_part.add_header('Content-Type', 'text/html; charset=utf-8')
             msg.attach(html_part)
             
-            self.smtp_manager.send_message(msg)
-                
-            if used_gdrive:
-                file_name = os.path.basename(attachment_path)
-                formatted_size = format_file_size(compressed_size)
-                success_reason = f"SUCCESS: Email sent with Google Drive link - {file_name} ({formatted_size})"
-            elif attachment_path:
-                file_name = os.path.basename(attachment_path)
-                formatted_size = format_file_size(compressed_size) if compressed_size else "N/A"
-                success_reason = f"SUCCESS: Email sent with direct attachment - {file_name} ({formatted_size})"
-            else:
-                success_reason = f"SUCCESS: Email sent without attachments"
-                
-            email_logger.log_email_transaction(
-                email_id=email_id,
-                email=recipient,
-                subject=subject,
-                file_path=folder_path,
-                status="Success",
-                reason=success_reason,
-                original_size=original_size,
-                compressed_size=compressed_size
-            )
-            
-            logger.info(f"Email sent successfully to {recipient}")
-            return True, success_reason
+            return msg, None
             
         except Exception as e:
-            error_message = f"Failed to send email to {recipient}: {str(e)}"
-            logger.error(error_message)
+            return None, self._record_send_failure(context, e)
             
-            error_type = e.__class__.__name__
-            error_details = str(e)
-            formatted_reason = f"ERROR: {error_type} - {error_details}"
+    def _record_sent(self, context: Dict[str, Any]) -> str:
+        """Log a delivered message and return its success reason"""
+        attachment_path = context["attachment_path"]
+        compressed_size = context["compressed_size"]
             
-            email_logger.log_email_transaction(
-                email_id=email_id,
-                email=recipient,
-                subject=subject,
-                file_path=folder_path,
-                status="Failed",
-                reason=formatted_reason,
-                original_size=original_size,
-                compressed_size=compressed_size
-            )
+        if context["used_gdrive"]:
+            file_name = os.path.basename(attachment_path)
+            formatted_size = format_file_size(compressed_size)
+            success_reason = f"SUCCESS: Email sent with Google Drive link - {file_name} ({formatted_size})"
+        elif attachment_path:
+            file_name = os.path.basename(attachment_path)
+            formatted_size = format_file_size(compressed_size) if compressed_size else "N/A"
+            success_reason = f"SUCCESS: Email sent with direct attachment - {file_name} ({formatted_size})"
+        else:
+            success_reason = f"SUCCESS: Email sent without attachments"
             
-            return False, formatted_reason
+        email_logger.log_email_transaction(
+            email_id=context["email_id"],
+            email=context["recipient"],
+            subject=context["subject"],
+            file_path=context["folder_path"],
+            status="Success",
+            reason=success_reason,
+            original_size=context["original_size"],
+            compressed_size=compressed_size
+        )
+        
+        logger.info(f"Email sent successfully to {context['recipient']}")
+        return success_reason
+        
+    def _record_send_failure(self, context: Dict[str, Any], error: Exception) -> str:
+        """Log a message that could not be prepared or delivered and return its failure reason"""
+        error_message = f"Failed to send email to {context['recipient']}: {str(error)}"
+        logger.error(error_message)
+        
+        error_type = error.__class__.__name__
+        error_details = str(error)
+        formatted_reason = f"ERROR: {error_type} - {error_details}"
+        
+        email_logger.log_email_transaction(
+            email_id=context["email_id"],
+            email=context["recipient"],
+            subject=context["subject"],
+            file_path=context["folder_path"],
+            status="Failed",
+            reason=formatted_reason,
+            original_size=context["original_size"],
+            compressed_size=context["compressed_size"]
+        )
+        
+        return formatted_reason
 
     def send_email_with_validation(self, recipient: str, subject: str, body: str, 
                                    folder_path: Optional[str] = None,
@@ -320,6 +433,28 @@ class EmailSender:
                                    gdrive_share_type: str = 'anyone',
                                    specific_emails: Optional[Union[List[str], str]] = None) -> Tuple[bool, Optional[str]]:
         """Send an email with full validation before compression and sending"""
+        context = self._new_send_context(recipient, subject, folder_path, email_id)
+        error_message = self._validate_before_send(recipient, subject, folder_path, email_id, validate_mapping, True, context)
+        if error_message:
+            return False, error_message
+            
+        return self._send(context, body, sender, gdrive_share_type, specific_emails)
+        
+    def _validate_before_send(self, recipient: str, subject: str,
+                              folder_path: Optional[str] = None,
+                              email_id: Optional[int] = None,
+                              validate_mapping: bool = True,
+                              check_connection: bool = True,
+                              context: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """
+        Run the checks that can reject an email before any compression or upload.
+        
+        The attachment route, folder size and archive size estimate are recorded
+        in context (if given), so _prepare_email acts on them instead of deciding again.
+        
+        Returns:
+            Failure reason (already logged), or None if the email can be sent
+        """
         try:
             is_valid, error_reason = self.validation_utils.validate_email(recipient)
             if not is_valid:
@@ -332,9 +467,9 @@ class EmailSender:
                     status="Failed",
                     reason=error_message
                 )
-                return False, error_message
+                return error_message
                 
-            is_connected, error_reason = self.smtp_manager.check_smtp_connection()
+            is_connected, error_reason = self.smtp_manager.check_smtp_connection() if check_connection else (True, "")
             if not is_connected:
                 error_message = f"ERROR: {error_reason}"
                 email_logger.log_email_transaction(
@@ -345,7 +480,7 @@ class EmailSender:
                     status="Failed",
                     reason=error_message
                 )
-                return False, error_message
+                return error_message
                 
             if folder_path:
                 is_valid, error_reason = self.attachment_manager.validate_attachment_path(folder_path)
@@ -359,7 +494,7 @@ class EmailSender:
                         status="Failed",
                         reason=error_message
                     )
-                    return False, error_message
+                    return error_message
                     
             if validate_mapping and email_id is not None:
                 from ....services.automation.validation.mapping_validator import _validate_recipient_mapping
@@ -374,35 +509,28 @@ class EmailSender:
                         status="Failed",
                         reason=error_message
                     )
-                    return False, error_message
+                    return error_message
                 
             if folder_path:
+                # Decide how the attachment will travel before spending time compressing it
                 original_size = self.attachment_manager.get_folder_size(folder_path)
-                if original_size > GDRIVE_UPLOAD_THRESHOLD:
-                    is_available, gdrive_error = self.gdrive_integration.check_gdrive_availability()
-                    if not is_available:
-                        # Predict if the compressed size will exceed safe limits
-                        # Compression typically reduces size by ~30-50% for most files
-                        # Using conservative estimate of 10% reduction to be safe
-                        estimated_compressed_size = int(original_size * 0.9)  # Conservative estimate
-                        
-                        if estimated_compressed_size > SAFE_MAX_SIZE:
-                            reason = f"ERROR: Attachment likely too large (est. {format_size(estimated_compressed_size)}) - exceeds limit of {format_size(SAFE_MAX_SIZE)} and Google Drive is not available"
-                            email_logger.log_error(f"Pre-validation failed: {reason}")
-                            email_logger.log_email_transaction(
-                                email_id=email_id,
-                                email=recipient,
-                                subject=subject,
-                                file_path=folder_path,
-                                status="Failed",
-                                reason=reason,
-                                original_size=original_size
-                            )
-                            return False, reason
-                            
-                        email_logger.log_warning(f"Google Drive not available: {gdrive_error}. Will try regular attachment.")
+                route, reason, estimated_size = self._route_attachment(folder_path, original_size)
+                if context is not None:
+                    context.update(original_size=original_size, route=route, estimated_size=estimated_size)
+                if route == ATTACHMENT_ROUTE_REJECT:
+                    email_logger.log_error(f"Pre-validation failed: {reason}")
+                    email_logger.log_email_transaction(
+                        email_id=email_id,
+                        email=recipient,
+                        subject=subject,
+                        file_path=folder_path,
+                        status="Failed",
+                        reason=reason,
+                        original_size=original_size
+                    )
+                    return reason
             
-            return self.send_email(recipient, subject, body, folder_path, sender, email_id, gdrive_share_type, specific_emails)
+            return None
                 
         except Exception as e:
             error_message = f"Failed to validate email: {str(e)}"
@@ -421,8 +549,41 @@ class EmailSender:
                 reason=formatted_reason
             )
             
-            return False, formatted_reason
+            return formatted_reason
+            
+    def _route_attachment(self, folder_path: str, original_size: int) -> Tuple[str, Optional[str], Optional[int]]:
+        """
+        Choose direct attachment, Google Drive or rejection from the predicted archive size.
+        
+        Returns:
+            Tuple of (route, rejection reason, estimated archive size or None if not estimated)
+        """
+        # Zipping cannot meaningfully grow a folder, so small ones always attach directly
+        if original_size <= GDRIVE_UPLOAD_THRESHOLD:
+            return ATTACHMENT_ROUTE_ATTACH, None, None
+            
+        estimated_size = self.attachment_manager.estimate_compressed_size(folder_path)
+        logger.debug(f"Estimated archive size for {folder_path}: {format_size(estimated_size)} (original {format_size(original_size)})")
+        if estimated_size <= GDRIVE_UPLOAD_THRESHOLD:
+            return ATTACHMENT_ROUTE_ATTACH, None, estimated_size
+            
+        is_available, gdrive_error = self.gdrive_integration.check_gdrive_availability()
+        if is_available:
+            return ATTACHMENT_ROUTE_GDRIVE, None, estimated_size
+            
+        # Only reject when even the low end of the estimate is over the limit
+        margin = get_settings().ATTACHMENT_ESTIMATE_MARGIN
+        if estimated_size * (1 - margin) > SAFE_MAX_SIZE:
+            reason = f"ERROR: Attachment likely too large (est. {format_size(estimated_size)}) - exceeds limit of {format_size(SAFE_MAX_SIZE)} and Google Drive is not available"
+            return ATTACHMENT_ROUTE_REJECT, reason, estimated_size
+            
+        email_logger.log_warning(f"Google Drive not available: {gdrive_error}. Will try regular attachment.")
+        return ATTACHMENT_ROUTE_ATTACH, None, estimated_size
 
+    def close(self):
+        """Close the pooled SMTP sessions"""
+        self.smtp_manager.close()
+        
     def _get_folder_size(self, folder_path: str) -> int:
         """Calculate the total size of a folder in bytes"""
         return self.attachment_manager.get_folder_size(folder_path)
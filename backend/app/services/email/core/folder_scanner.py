@@ -0,0 +1,194 @@
+"""
+Folder scanning for attachment folders.
+
+Folders are walked with os.scandir so each file is stat-ed once, through its
+DirEntry. Results are memoised per folder and reused while none of the
+folder's directories has changed, so validation, size estimation, compression
+and logging share one walk per folder. Folders for a batch of emails can be
+prefetched on a thread pool while earlier emails are still being processed.
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from ....core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class FolderScan(NamedTuple):
+    """Files of a folder (path, size, mtime in ns) and the mtimes of its directories"""
+    files: List[Tuple[str, int, int]]
+    directories: Dict[str, int]
+    total_size: int
+    scanned_at: float
+
+
+def scan_folder(folder_path: str) -> FolderScan:
+    """
+    Walk a folder (or stat a single file) with os.scandir.
+    
+    Raises:
+        OSError: If the folder cannot be read
+    """
+    files: List[Tuple[str, int, int]] = []
+    directories: Dict[str, int] = {}
+    total_size = 0
+    
+    if os.path.isfile(folder_path):
+        stat = os.stat(folder_path)
+        return FolderScan([(folder_path, stat.st_size, stat.st_mtime_ns)], {}, stat.st_size, time.monotonic())
+        
+    pending = [folder_path]
+    while pending:
+        directory = pending.pop()
+        directories[directory] = os.stat(directory).st_mtime_ns
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+                elif entry.is_file(follow_symlinks=True):
+                    stat = entry.stat()
+                    files.append((entry.path, stat.st_size, stat.st_mtime_ns))
+                    total_size += stat.st_size
+                    
+    return FolderScan(files, directories, total_size, time.monotonic())
+
+
+def _directories_unchanged(scan: FolderScan) -> bool:
+    try:
+        return all(os.stat(directory).st_mtime_ns == mtime for directory, mtime in scan.directories.items())
+    except OSError:
+        return False
+
+
+class FolderScanner:
+    """
+    Memo of folder scans keyed on the folder path and its directory mtimes.
+    
+    Adding, removing or renaming a file changes a directory mtime and invalidates
+    the entry. Rewriting a file in place does not, so entries also expire after
+    max_age seconds.
+    """
+    
+    def __init__(self, max_age: Optional[float] = None, max_entries: int = 1024, workers: Optional[int] = None):
+        settings = get_settings()
+        
+        self.max_age = max_age if max_age is not None else settings.FOLDER_SCAN_CACHE_SECONDS
+        self.max_entries = max_entries
+        self.workers = max(1, workers or settings.FOLDER_SCAN_WORKERS)
+        
+        self._scans: Dict[str, FolderScan] = {}
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        
+    def _key(self, folder_path: str) -> str:
+        return os.path.normcase(os.path.abspath(folder_path))
+        
+    def _fresh(self, scan: Optional[FolderScan]) -> bool:
+        if scan is None or time.monotonic() - scan.scanned_at > self.max_age:
+            return False
+        return _directories_unchanged(scan)
+        
+    def _scan_and_store(self, key: str, folder_path: str) -> FolderScan:
+        try:
+            scan = scan_folder(folder_path)
+            with self._lock:
+                if len(self._scans) >= self.max_entries:
+                    # Drop the oldest scan
+                    oldest = min(self._scans, key=lambda path: self._scans[path].scanned_at)
+                    del self._scans[oldest]
+                self._scans[key] = scan
+            return scan
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+                
+    def get(self, folder_path: str) -> FolderScan:
+        """
+        Get the scan of a folder, reusing a memoised or prefetched one.
+        
+        Raises:
+            OSError: If the folder cannot be read
+        """
+        key = self._key(folder_path)
+        with self._lock:
+            scan = self._scans.get(key)
+            future = self._inflight.get(key)
+            
+        if future is not None:
+            try:
+                return future.result()
+            except OSError:
+                pass
+        elif self._fresh(scan):
+            return scan
+            
+        return self._scan_and_store(key, folder_path)
+        
+    def get_size(self, folder_path: str) -> int:
+        """Total size of the files in a folder, in bytes"""
+        return self.get(folder_path).total_size
+        
+    def prefetch(self, folder_paths: Iterable[Optional[str]]):
+        """Start scanning folders in the background; does not wait for the results"""
+        for folder_path in folder_paths:
+            if not folder_path:
+                continue
+                
+            key = self._key(folder_path)
+            with self._lock:
+                if key in self._inflight:
+                    continue
+                scan = self._scans.get(key)
+            if self._fresh(scan):
+                continue
+                
+            with self._lock:
+                if key in self._inflight:
+                    continue
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="folder-scan")
+                self._inflight[key] = self._executor.submit(self._prefetch_one, key, folder_path)
+                
+    def _prefetch_one(self, key: str, folder_path: str) -> FolderScan:
+        try:
+            return self._scan_and_store(key, folder_path)
+        except OSError as e:
+            logger.debug(f"Could not prefetch folder {folder_path}: {str(e)}")
+            raise
+            
+    def rescan(self, folder_path: str) -> FolderScan:
+        """
+        Scan a folder now, ignoring any memoised result, and memoise the new scan.
+        
+        Raises:
+            OSError: If the folder cannot be read
+        """
+        return self._scan_and_store(self._key(folder_path), folder_path)
+        
+    def invalidate(self, folder_path: Optional[str] = None):
+        """Forget one folder, or every folder"""
+        with self._lock:
+            if folder_path is None:
+                self._scans.clear()
+            else:
+                self._scans.pop(self._key(folder_path), None)
+
+
+_scanner: Optional[FolderScanner] = None
+_scanner_lock = threading.Lock()
+
+
+def get_folder_scanner() -> FolderScanner:
+    """Get the shared folder scanner"""
+    global _scanner
+    with _scanner_lock:
+        if _scanner is None:
+            _scanner = FolderScanner()
+        return _scanner
@@ -0,0 +1,269 @@
+"""
+Multi-core zip builder for attachment folders.
+
+Member files are deflated independently in worker processes and the archive is
+assembled in the calling thread from the pre-compressed streams, so large
+folders use every core instead of one. Files that are already compressed
+(images, PDFs, Office documents, archives) are stored as-is. Large files are
+deflated by the calling thread straight into the archive, so no worker result
+ever holds a whole large file in memory.
+"""
+
+import os
+import struct
+import sys
+import time
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import Executor
+from typing import Dict, List, Optional, Tuple
+
+# Formats that are already compressed; deflating them again costs CPU for no gain
+PRECOMPRESSED_EXTENSIONS = frozenset({
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic",
+    ".pdf",
+    ".zip", ".gz", ".tgz", ".bz2", ".xz", ".7z", ".rar",
+    ".docx", ".xlsx", ".pptx", ".odt", ".ods", ".odp",
+    ".mp3", ".mp4", ".m4a", ".mov", ".avi", ".mkv"
+})
+
+_CHUNK_SIZE = 1024 * 1024
+
+# Members at least this big are deflated serially, streaming into the archive
+_MAX_PARALLEL_MEMBER_BYTES = 16 * 1024 * 1024
+
+# Uncompressed bytes of members being deflated by workers or waiting to be written
+_MAX_BYTES_IN_FLIGHT = 64 * 1024 * 1024
+
+# Above these the archive needs zip64 records, which this builder does not write
+_MAX_MEMBERS = 0xFFFF
+_MAX_ARCHIVE_BYTES = 0xFFFFFFFF - 0xFFFF
+
+_CREATE_SYSTEM = 0 if sys.platform == "win32" else 3
+
+
+def is_precompressed(file_name: str) -> bool:
+    """Check whether a file is in a format that should be stored rather than deflated"""
+    return os.path.splitext(file_name)[1].lower() in PRECOMPRESSED_EXTENSIONS
+
+
+def member_compression(file_name: str) -> int:
+    """Zip compression method to use for a member file"""
+    return zipfile.ZIP_STORED if is_precompressed(file_name) else zipfile.ZIP_DEFLATED
+
+
+def supports_parallel_zip(members: List[Tuple[str, str]], total_size: int) -> bool:
+    """Check whether an archive fits without zip64 records"""
+    return len(members) < _MAX_MEMBERS and total_size < _MAX_ARCHIVE_BYTES
+
+
+def deflate_member(file_path: str, level: int) -> Tuple[int, int, bytes]:
+    """
+    Deflate one file into a raw zip member stream.
+    
+    Module-level so it can run in a worker process.
+    
+    Returns:
+        Tuple of (CRC-32, uncompressed size, compressed bytes)
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    crc = 0
+    size = 0
+    chunks = []
+    
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+            chunks.append(compressor.compress(chunk))
+    chunks.append(compressor.flush())
+    
+    return crc, size, b"".join(chunks)
+
+
+def _dos_date_time(mtime: float) -> Tuple[int, int]:
+    year, month, day, hour, minute, second = time.localtime(mtime)[:6]
+    if year < 1980:
+        year, month, day, hour, minute, second = 1980, 1, 1, 0, 0, 0
+    return (year - 1980) << 9 | month << 5 | day, hour << 11 | minute << 5 | second // 2
+
+
+class _ZipAssembler:
+    """Writes local headers, member data and the central directory of a zip file"""
+    
+    def __init__(self, out):
+        self.out = out
+        self.entries = []
+        
+    def _local_header(self, name: bytes, flags: int, method: int, dos_time: int, dos_date: int,
+                      crc: int, compressed_size: int, size: int) -> bytes:
+        return struct.pack(
+            zipfile.structFileHeader, zipfile.stringFileHeader, 20, 0, flags, method,
+            dos_time, dos_date, crc, compressed_size, size, len(name), 0
+        ) + name
+        
+    def _stream(self, file_path: str, compressor=None) -> Tuple[int, int, int]:
+        """Copy a file into the archive, deflating it with compressor if given"""
+        crc = 0
+        size = 0
+        compressed_size = 0
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+                crc = zlib.crc32(chunk, crc)
+                size += len(chunk)
+                if compressor is not None:
+                    chunk = compressor.compress(chunk)
+                self.out.write(chunk)
+                compressed_size += len(chunk)
+        if compressor is not None:
+            tail = compressor.flush()
+            self.out.write(tail)
+            compressed_size += len(tail)
+        return crc, size, compressed_size
+        
+    def add(self, file_path: str, arcname: str, method: int, deflated=None, level: int = 6):
+        """
+        Append a member; deflated is the (crc, size, data) result for ZIP_DEFLATED members
+        compressed by a worker. Other members are streamed from disk (deflated here when
+        no result is given) and their header is patched afterwards.
+        """
+        stat = os.stat(file_path)
+        dos_date, dos_time = _dos_date_time(stat.st_mtime)
+        name = arcname.replace(os.sep, "/")
+        try:
+            encoded_name, flags = name.encode("ascii"), 0
+        except UnicodeEncodeError:
+            encoded_name, flags = name.encode("utf-8"), 0x800
+            
+        offset = self.out.tell()
+        
+        if method == zipfile.ZIP_DEFLATED and deflated is not None:
+            crc, size, data = deflated
+            self.out.write(self._local_header(encoded_name, flags, method, dos_time, dos_date, crc, len(data), size))
+            self.out.write(data)
+            compressed_size = len(data)
+        else:
+            header = self._local_header(encoded_name, flags, method, dos_time, dos_date, 0, 0, 0)
+            self.out.write(header)
+            if method == zipfile.ZIP_DEFLATED:
+                crc, size, compressed_size = self._stream(
+                    file_path, zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+                )
+                
+                # Incompressible content is rewritten as stored so the archive never grows
+                if compressed_size >= size:
+                    self.out.seek(offset)
+                    self.out.truncate()
+                    method = zipfile.ZIP_STORED
+                    header = self._local_header(encoded_name, flags, method, dos_time, dos_date, 0, 0, 0)
+                    self.out.write(header)
+                    crc, size, compressed_size = self._stream(file_path)
+            else:
+                crc, size, compressed_size = self._stream(file_path)
+            
+            # CRC and sizes sit 14 bytes into the local header
+            end = self.out.tell()
+            self.out.seek(offset + 14)
+            self.out.write(struct.pack("<3L", crc, compressed_size, size))
+            self.out.seek(end)
+            
+        self.entries.append((encoded_name, flags, method, dos_time, dos_date, crc, compressed_size, size,
+                             (stat.st_mode & 0xFFFF) << 16, offset))
+        
+    def finish(self):
+        """Write the central directory and end record"""
+        directory_offset = self.out.tell()
+        
+        for name, flags, method, dos_time, dos_date, crc, compressed_size, size, external_attr, offset in self.entries:
+            self.out.write(struct.pack(
+                zipfile.structCentralDir, zipfile.stringCentralDir, 20, _CREATE_SYSTEM, 20, 0, flags, method,
+                dos_time, dos_date, crc, compressed_size, size, len(name), 0, 0, 0, 0, external_attr, offset
+            ))
+            self.out.write(name)
+            
+        directory_size = self.out.tell() - directory_offset
+        self.out.write(struct.pack(
+            zipfile.structEndArchive, zipfile.stringEndArchive, 0, 0,
+            len(self.entries), len(self.entries), directory_size, directory_offset, 0
+        ))
+
+
+def write_parallel_zip(zip_path: str, members: List[Tuple[str, str]], executor: Executor, level: int = 6,
+                       sizes: Optional[Dict[str, int]] = None):
+    """
+    Build a zip archive, deflating members in an executor.
+    
+    Members are submitted while their uncompressed bytes in flight stay within
+    _MAX_BYTES_IN_FLIGHT (and a few per worker), and written in the order given
+    as soon as the earlier members are done. Members of _MAX_PARALLEL_MEMBER_BYTES
+    or more are deflated by the calling thread while the workers carry on with
+    the following ones.
+    
+    Args:
+        zip_path: Archive file to create
+        members: (file path, archive name) pairs
+        executor: Process pool that runs deflate_member
+        level: zlib compression level (0-9)
+        sizes: Known file sizes by path, e.g. from a folder scan; others are stat-ed
+    """
+    window = max(2, getattr(executor, "_max_workers", 2) * 2)
+    pending = deque()
+    remaining = iter(members)
+    next_member = None
+    in_flight_count = 0
+    in_flight_bytes = 0
+    
+    def member_size(file_path: str) -> int:
+        if sizes is not None and file_path in sizes:
+            return sizes[file_path]
+        return os.path.getsize(file_path)
+    
+    def fill():
+        nonlocal next_member, in_flight_count, in_flight_bytes
+        while in_flight_count < window:
+            if next_member is None:
+                member = next(remaining, None)
+                if member is None:
+                    return
+                file_path, arcname = member
+                method = member_compression(file_path)
+                size = member_size(file_path) if method == zipfile.ZIP_DEFLATED else 0
+                next_member = (file_path, arcname, method, size)
+                
+            file_path, arcname, method, size = next_member
+            if method != zipfile.ZIP_DEFLATED or size >= _MAX_PARALLEL_MEMBER_BYTES:
+                pending.append((file_path, arcname, method, None, 0))
+            elif in_flight_count and in_flight_bytes + size > _MAX_BYTES_IN_FLIGHT:
+                return
+            else:
+                pending.append((file_path, arcname, method, executor.submit(deflate_member, file_path, level), size))
+                in_flight_count += 1
+                in_flight_bytes += size
+            next_member = None
+            
+    with open(zip_path, "wb") as out:
+        assembler = _ZipAssembler(out)
+        try:
+            fill()
+            while pending:
+                file_path, arcname, method, future, size = pending.popleft()
+                deflated = None
+                if future is not None:
+                    deflated = future.result()
+                    in_flight_count -= 1
+                    in_flight_bytes -= size
+                    fill()
+                
+                    # Incompressible content is stored so the archive never grows
+                    if len(deflated[2]) >= deflated[1]:
+                        method, deflated = zipfile.ZIP_STORED, None
+                    
+                assembler.add(file_path, arcname, method, deflated, level)
+                fill()
+        finally:
+            for _, _, _, future, _ in pending:
+                if future is not None:
+                    future.cancel()
+                    
+        assembler.finish()
@@ -0,0 +1,231 @@
+"""
+Compressed-size prediction for attachment folders.
+
+Lets an email be routed (direct attachment, Google Drive or rejection) before
+any compression work is done. Each file's compressed size is predicted from a
+per-extension ratio table learned from archives built in earlier sends,
+falling back to compressing a few samples of the file and then to built-in
+defaults. The learned table is kept in LOG_DIR_PATH so it survives restarts.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import zipfile
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from ....core.config import get_settings
+from .parallel_zip import PRECOMPRESSED_EXTENSIONS
+
+logger = logging.getLogger(__name__)
+
+# Typical compressed/original ratios, used until enough has been learned
+DEFAULT_RATIOS = {
+    ".txt": 0.35, ".csv": 0.25, ".log": 0.2, ".tsv": 0.25,
+    ".htm": 0.3, ".html": 0.3, ".xml": 0.2, ".json": 0.25, ".md": 0.4,
+    ".doc": 0.45, ".xls": 0.35, ".ppt": 0.6, ".rtf": 0.3,
+    ".bmp": 0.3, ".tif": 0.7, ".tiff": 0.7, ".wav": 0.9,
+    ".exe": 0.6, ".dll": 0.5, ".bin": 1.0
+}
+
+# Learned ratios are trusted once this many bytes of an extension have been seen
+_MIN_LEARNED_BYTES = 1024 * 1024
+
+# Totals are halved past this so the table follows recent files
+_MAX_LEARNED_BYTES = 1024 * 1024 * 1024
+
+_SAMPLE_BYTES = 64 * 1024
+_MAX_SAMPLED_FILES = 8
+_SAVE_INTERVAL_SECONDS = 30.0
+
+# Local header and central directory entry per member, plus the name stored in each
+_MEMBER_OVERHEAD_BYTES = 100
+
+
+def _extension(file_name: str) -> str:
+    return os.path.splitext(file_name)[1].lower()
+
+
+class CompressionEstimator:
+    """
+    Predicts the zip size of a folder without compressing it.
+    
+    Thread-safe; share one instance through get_compression_estimator().
+    """
+    
+    def __init__(self, state_path: Optional[str] = None, compression_level: Optional[int] = None):
+        settings = get_settings()
+        
+        self.state_path = state_path
+        self.compression_level = compression_level if compression_level is not None else settings.ATTACHMENT_COMPRESSION_LEVEL
+        
+        # extension -> [original bytes, compressed bytes]
+        self._learned: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._last_saved = 0.0
+        
+        self._load()
+        
+    def _load(self):
+        if not self.state_path or not os.path.exists(self.state_path):
+            return
+            
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._learned = {ext: [float(totals[0]), float(totals[1])] for ext, totals in data.items()}
+        except Exception as e:
+            logger.warning(f"Could not load learned compression ratios: {str(e)}")
+            
+    def _save_locked(self, force: bool = False):
+        if not self.state_path or not self._dirty:
+            return
+        if not force and time.monotonic() - self._last_saved < _SAVE_INTERVAL_SECONDS:
+            return
+            
+        try:
+            temp_path = f"{self.state_path}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(self._learned, f)
+            os.replace(temp_path, self.state_path)
+            self._dirty = False
+            self._last_saved = time.monotonic()
+        except Exception as e:
+            logger.warning(f"Could not save learned compression ratios: {str(e)}")
+            
+    def learned_ratio(self, extension: str) -> Optional[float]:
+        """Learned compressed/original ratio for an extension, if enough data has been seen"""
+        with self._lock:
+            totals = self._learned.get(extension)
+        if not totals or totals[0] < _MIN_LEARNED_BYTES:
+            return None
+        return totals[1] / totals[0]
+        
+    def learn(self, extension: str, original_size: int, compressed_size: int):
+        """Record one compressed file"""
+        if original_size <= 0:
+            return
+            
+        with self._lock:
+            totals = self._learned.setdefault(extension, [0.0, 0.0])
+            totals[0] += original_size
+            totals[1] += compressed_size
+            if totals[0] > _MAX_LEARNED_BYTES:
+                totals[0] /= 2
+                totals[1] /= 2
+            self._dirty = True
+            self._save_locked()
+            
+    def learn_from_archive(self, zip_path: str):
+        """Learn per-extension ratios from the members of a freshly built archive"""
+        try:
+            with zipfile.ZipFile(zip_path) as archive:
+                for info in archive.infolist():
+                    # Stored members say nothing about how well their type deflates
+                    if info.compress_type != zipfile.ZIP_DEFLATED or info.is_dir():
+                        continue
+                    self.learn(_extension(info.filename), info.file_size, info.compress_size)
+        except Exception as e:
+            logger.debug(f"Could not learn compression ratios from {zip_path}: {str(e)}")
+            
+    def sample_ratio(self, file_path: str, size: int) -> float:
+        """Estimate a file's ratio by deflating its start, middle and end"""
+        try:
+            with open(file_path, "rb") as f:
+                if size <= 3 * _SAMPLE_BYTES:
+                    samples = [f.read()]
+                else:
+                    samples = []
+                    for offset in (0, size // 2, size - _SAMPLE_BYTES):
+                        f.seek(offset)
+                        samples.append(f.read(_SAMPLE_BYTES))
+        except OSError:
+            return 1.0
+            
+        read = sum(len(sample) for sample in samples)
+        if not read:
+            return 1.0
+            
+        compressed = sum(len(zlib.compress(sample, self.compression_level)) for sample in samples)
+        # Deflate never makes a member bigger than storing it
+        return min(1.0, compressed / read)
+        
+    def estimate_files(self, files: List[Tuple[str, int]]) -> int:
+        """
+        Predict the zip size of (file path, size) pairs.
+        
+        Returns:
+            Estimated archive size in bytes
+        """
+        ratios: Dict[str, Optional[float]] = {}
+        unknown: Dict[str, List[Tuple[str, int]]] = {}
+        
+        for file_path, size in files:
+            extension = _extension(file_path)
+            if extension in ratios or extension in unknown:
+                continue
+            if extension in PRECOMPRESSED_EXTENSIONS:
+                ratios[extension] = 1.0
+                continue
+                
+            ratio = self.learned_ratio(extension)
+            if ratio is not None:
+                ratios[extension] = ratio
+            else:
+                unknown[extension] = []
+                
+        # Sample the largest files of extensions nothing has been learned about yet
+        for file_path, size in files:
+            extension = _extension(file_path)
+            if extension in unknown:
+                unknown[extension].append((file_path, size))
+                
+        candidates = sorted(
+            (entry for entries in unknown.values() for entry in entries),
+            key=lambda entry: entry[1],
+            reverse=True
+        )[:_MAX_SAMPLED_FILES]
+        sampled: Dict[str, List[float]] = {}
+        for file_path, size in candidates:
+            sampled.setdefault(_extension(file_path), []).append(self.sample_ratio(file_path, size))
+            
+        for extension in unknown:
+            if extension in sampled:
+                ratios[extension] = sum(sampled[extension]) / len(sampled[extension])
+            else:
+                ratios[extension] = DEFAULT_RATIOS.get(extension, 1.0)
+                
+        estimate = 0
+        for file_path, size in files:
+            estimate += int(size * ratios[_extension(file_path)]) + _MEMBER_OVERHEAD_BYTES + 2 * len(file_path)
+        return estimate
+        
+    def flush(self):
+        """Write the learned table now"""
+        with self._lock:
+            self._save_locked(force=True)
+
+
+_estimator: Optional[CompressionEstimator] = None
+_estimator_lock = threading.Lock()
+
+
+def get_compression_estimator() -> CompressionEstimator:
+    """Get the shared estimator, keeping its learned table in LOG_DIR_PATH"""
+    global _estimator
+    with _estimator_lock:
+        if _estimator is None:
+            state_path = None
+            log_dir = get_settings().LOG_DIR_PATH
+            if log_dir:
+                try:
+                    os.makedirs(log_dir, exist_ok=True)
+                    state_path = os.path.join(log_dir, "compression_ratios.json")
+                except OSError as e:
+                    logger.warning(f"Learned compression ratios will not be kept: {str(e)}")
+            _estimator = CompressionEstimator(state_path)
+        return _estimator
@@ -2,19 +2,32 @@
 SMTP management utilities for email sending.
 
 This module provides SMTP connection management and email sending functionality.
+A single authenticated session is kept open and reused across messages.
 """
 
 import smtplib
-from typing import Tuple
+import logging
+import time
+from threading import RLock
+from typing import Optional, Tuple
+
+from ....core.config import get_settings
+from .streaming_mime import send_smtp_message
+
+logger = logging.getLogger(__name__)
 
 class SMTPManager:
     """
     Manages SMTP connections and email sending operations.
     
-    This class encapsulates SMTP server configuration and provides methods
-    for connection testing and message sending.
+    This class encapsulates SMTP server configuration and keeps one long-lived,
+    authenticated session that is reused for every message. Idle sessions are
+    probed with NOOP before reuse, dropped sessions are reconnected automatically,
+    and the session is recycled after max_messages_per_session messages.
     """
-    def __init__(self, smtp_server: str, port: int, username: str, password: str, use_tls: bool = True):
+    def __init__(self, smtp_server: str, port: int, username: str, password: str, use_tls: bool = True,
+                 max_messages_per_session: Optional[int] = None,
+                 keepalive_interval: Optional[float] = None):
         """
         Initialize SMTP manager with connection parameters.
         
@@ -24,22 +37,85 @@ class SMTPManager:
             username: SMTP username
             password: SMTP password
             use_tls: Whether to use TLS encryption
+            max_messages_per_session: Messages to send before reconnecting (default from settings)
+            keepalive_interval: Idle seconds after which the session is checked with NOOP (default from settings)
         """
+        settings = get_settings()
+        
         self.smtp_server = smtp_server
         self.port = port
         self.username = username
         self.password = password
         self.use_tls = use_tls
+        self.max_messages_per_session = max_messages_per_session or settings.SMTP_MAX_MESSAGES_PER_SESSION
+        self.keepalive_interval = keepalive_interval if keepalive_interval is not None else settings.SMTP_KEEPALIVE_SECONDS
+        
+        self._server: Optional[smtplib.SMTP] = None
+        self._messages_sent = 0
+        self._last_used = 0.0
+        self._lock = RLock()
+        
+    def _connect(self) -> smtplib.SMTP:
+        """Open and authenticate a new SMTP session"""
+        server = smtplib.SMTP(self.smtp_server, self.port)
+        try:
+            if self.use_tls:
+                server.starttls()
+            server.login(self.username, self.password)
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+            raise
+            
+        logger.debug(f"Opened SMTP session to {self.smtp_server}:{self.port}")
+        return server
+        
+    def _close_session(self):
+        """Close the current session, if any (caller holds the lock)"""
+        if self._server is None:
+            return
+            
+        server, self._server = self._server, None
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+                
+    def _get_session(self) -> smtplib.SMTP:
+        """Return a live session, recycling or reconnecting as needed (caller holds the lock)"""
+        if self._server is not None:
+            if self._messages_sent >= self.max_messages_per_session:
+                logger.debug(f"Recycling SMTP session after {self._messages_sent} messages")
+                self._close_session()
+            elif time.monotonic() - self._last_used >= self.keepalive_interval:
+                try:
+                    code, _ = self._server.noop()
+                    if code != 250:
+                        self._close_session()
+                except (smtplib.SMTPException, OSError):
+                    self._close_session()
+                    
+        if self._server is None:
+            self._server = self._connect()
+            self._messages_sent = 0
+            
+        self._last_used = time.monotonic()
+        return self._server
     
     def check_smtp_connection(self) -> Tuple[bool, str]:
-        """Check if connection to SMTP server can be established"""
+        """Check that an authenticated session to the SMTP server is available"""
         try:
-            with smtplib.SMTP(self.smtp_server, self.port) as server:
-                if self.use_tls:
-                    server.starttls()
-                server.login(self.username, self.password)
+            with self._lock:
+                self._get_session()
             return True, ""
         except Exception as e:
+            with self._lock:
+                self._close_session()
             return False, str(e)
     
     def send_message(self, msg):
@@ -52,8 +128,29 @@ class SMTPManager:
         Raises:
             smtplib.SMTPException: If sending fails
         """
-        with smtplib.SMTP(self.smtp_server, self.port) as server:
-            if self.use_tls:
-                server.starttls()
-            server.login(self.username, self.password)
-            server.send_message(msg)
+        with self._lock:
+            for attempt in range(2):
+                server = self._get_session()
+                try:
+                    send_smtp_message(server, msg)
+                    break
+                except smtplib.SMTPServerDisconnected:
+                    self._close_session()
+                    if attempt:
+                        raise
+                    logger.info("SMTP session was disconnected, reconnecting")
+                except smtplib.SMTPRecipientsRefused:
+                    # The session itself is still usable
+                    raise
+                except Exception:
+                    # Unknown protocol state - start the next message on a fresh session
+                    self._close_session()
+                    raise
+
+            self._messages_sent += 1
+            self._last_used = time.monotonic()
+            
+    def close(self):
+        """Close the persistent SMTP session"""
+        with self._lock:
+            self._close_session()
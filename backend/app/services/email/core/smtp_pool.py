@@ -0,0 +1,260 @@
+"""
+SMTP session pool for parallel email delivery.
+
+This module keeps several authenticated SMTPManager sessions so multiple
+worker threads can send at the same time. Concurrency towards each SMTP
+server is capped, and the cap shrinks when the relay answers with 421/4xx
+throttling replies, then grows back as messages are accepted again.
+"""
+
+import smtplib
+import logging
+import time
+from threading import Lock, Condition
+from typing import Dict, List, Optional, Tuple
+
+from ....core.config import get_settings
+from .smtp_manager import SMTPManager
+
+logger = logging.getLogger(__name__)
+
+
+def _is_throttle_error(error: Exception) -> bool:
+    """Check whether an SMTP error is a transient 4xx reply (e.g. 421 or 451 rate limiting)"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        codes = [code for code, _ in error.recipients.values()]
+        return bool(codes) and all(400 <= code < 500 for code in codes)
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return False
+
+
+class ServerLimiter:
+    """
+    Concurrency limit for one SMTP server, shared by every pool that talks to it.
+    
+    The limit starts at max_concurrency. A throttling reply halves it and makes
+    new sends wait for an exponentially growing back-off; each run of accepted
+    messages as long as the current limit raises it by one again.
+    """
+    
+    def __init__(self, max_concurrency: int, backoff_base: float = 1.0, backoff_max: float = 60.0):
+        self.max_concurrency = max(1, max_concurrency)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        
+        self._limit = self.max_concurrency
+        self._active = 0
+        self._successes = 0
+        self._backoff = 0.0
+        self._paused_until = 0.0
+        self._condition = Condition(Lock())
+        
+    @property
+    def limit(self) -> int:
+        """Current number of concurrent sends allowed"""
+        return self._limit
+        
+    def acquire(self, timeout: Optional[float] = None):
+        """
+        Wait for a send slot.
+        
+        Raises:
+            TimeoutError: If no slot became available within timeout seconds
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                if now >= self._paused_until and self._active < self._limit:
+                    self._active += 1
+                    return
+                    
+                wait = self._paused_until - now if now < self._paused_until else None
+                if deadline is not None:
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        raise TimeoutError("Timed out waiting for an SMTP send slot")
+                    wait = min(wait, remaining) if wait is not None else remaining
+                self._condition.wait(wait)
+                
+    def release(self):
+        """Give a send slot back"""
+        with self._condition:
+            self._active -= 1
+            self._condition.notify()
+            
+    def record_success(self):
+        """Register an accepted message and slowly restore the concurrency limit"""
+        with self._condition:
+            self._backoff = 0.0
+            if self._limit < self.max_concurrency:
+                self._successes += 1
+                if self._successes >= self._limit:
+                    self._limit += 1
+                    self._successes = 0
+                    self._condition.notify()
+                    
+    def record_throttle(self) -> float:
+        """
+        Register a throttling reply: halve the limit and pause new sends.
+        
+        Returns:
+            Back-off in seconds applied before the next send
+        """
+        with self._condition:
+            self._limit = max(1, self._limit // 2)
+            self._successes = 0
+            self._backoff = min(self.backoff_max, self._backoff * 2 if self._backoff else self.backoff_base)
+            self._paused_until = max(self._paused_until, time.monotonic() + self._backoff)
+            return self._backoff
+
+
+# Limiters are per SMTP server, not per pool
+_server_limiters: Dict[Tuple[str, int], ServerLimiter] = {}
+_limiters_lock = Lock()
+
+def get_server_limiter(smtp_server: str, port: int) -> ServerLimiter:
+    """Get the shared concurrency limiter for an SMTP server"""
+    key = (smtp_server.lower(), int(port))
+    with _limiters_lock:
+        limiter = _server_limiters.get(key)
+        if limiter is None:
+            settings = get_settings()
+            limiter = ServerLimiter(
+                settings.SMTP_MAX_CONCURRENCY_PER_SERVER,
+                backoff_base=settings.SMTP_THROTTLE_BACKOFF_SECONDS,
+                backoff_max=settings.SMTP_THROTTLE_BACKOFF_MAX_SECONDS
+            )
+            _server_limiters[key] = limiter
+        return limiter
+
+
+class SMTPSessionPool:
+    """
+    Pool of persistent SMTP sessions that can be used from several threads.
+    
+    Exposes the same interface as SMTPManager (send_message, check_smtp_connection,
+    close). Sessions are opened lazily up to pool_size; a send first takes a slot
+    from the server's ServerLimiter and then borrows an idle session. Throttling
+    replies are retried with back-off up to max_retries times.
+    """
+    
+    def __init__(self, smtp_server: str, port: int, username: str, password: str, use_tls: bool = True,
+                 pool_size: Optional[int] = None,
+                 max_retries: Optional[int] = None):
+        """
+        Initialize the SMTP session pool.
+        
+        Args:
+            smtp_server: SMTP server hostname
+            port: SMTP server port
+            username: SMTP username
+            password: SMTP password
+            use_tls: Whether to use TLS encryption
+            pool_size: Maximum number of sessions (default from settings)
+            max_retries: Retries for a message that hit a throttling reply (default from settings)
+        """
+        settings = get_settings()
+        
+        self.smtp_server = smtp_server
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.pool_size = max(1, pool_size or settings.SMTP_POOL_SIZE)
+        self.max_retries = max_retries if max_retries is not None else settings.SMTP_THROTTLE_MAX_RETRIES
+        
+        self._limiter = get_server_limiter(smtp_server, port)
+        self._idle: List[SMTPManager] = []
+        self._sessions: List[SMTPManager] = []
+        self._condition = Condition(Lock())
+        
+    def _checkout(self) -> SMTPManager:
+        """Borrow an idle session, creating one if the pool is not full yet"""
+        with self._condition:
+            while not self._idle and len(self._sessions) >= self.pool_size:
+                self._condition.wait()
+                
+            if self._idle:
+                return self._idle.pop()
+                
+            manager = SMTPManager(self.smtp_server, self.port, self.username, self.password, self.use_tls)
+            self._sessions.append(manager)
+            return manager
+            
+    def _checkin(self, manager: SMTPManager):
+        """Return a session to the pool"""
+        with self._condition:
+            if manager in self._sessions:
+                self._idle.append(manager)
+                self._condition.notify()
+                return
+                
+        # The pool was closed while this session was in use
+        manager.close()
+        
+    def check_smtp_connection(self) -> Tuple[bool, str]:
+        """Check that an authenticated session to the SMTP server is available"""
+        manager = self._checkout()
+        try:
+            return manager.check_smtp_connection()
+        finally:
+            self._checkin(manager)
+            
+    def send_message(self, msg):
+        """
+        Send email message via one of the pooled sessions.
+        
+        Args:
+            msg: Email message object to send
+            
+        Raises:
+            smtplib.SMTPException: If sending fails or the server keeps throttling
+        """
+        for attempt in range(self.max_retries + 1):
+            self._limiter.acquire()
+            try:
+                manager = self._checkout()
+                try:
+                    manager.send_message(msg)
+                finally:
+                    self._checkin(manager)
+            except Exception as e:
+                if not _is_throttle_error(e):
+                    raise
+                backoff = self._limiter.record_throttle()
+                if attempt >= self.max_retries:
+                    raise
+                logger.warning(
+                    f"SMTP server {self.smtp_server} is throttling ({str(e)}), "
+                    f"limit now {self._limiter.limit}, retrying in {backoff:.1f}s"
+                )
+                continue
+            finally:
+                self._limiter.release()
+                
+            self._limiter.record_success()
+            return
+            
+    def stats(self) -> Dict[str, int]:
+        """Get current pool usage counters"""
+        with self._condition:
+            return {
+                "sessions": len(self._sessions),
+                "idle": len(self._idle),
+                "pool_size": self.pool_size,
+                "server_limit": self._limiter.limit
+            }
+            
+    def close(self):
+        """Close every pooled session"""
+        with self._condition:
+            sessions = list(self._sessions)
+            self._sessions = []
+            self._idle = []
+            self._condition.notify_all()
+            
+        for manager in sessions:
+            manager.close()
@@ -0,0 +1,161 @@
+"""
+Streaming MIME generation for large attachments.
+
+A FileAttachment part only references its file. When the message is sent, the
+attachment is read and base64-encoded in fixed-size chunks that are written
+straight to the SMTP DATA stream, so the memory used per send stays bounded
+no matter how large the attachment is (instead of holding the raw file, its
+base64 payload and the flattened message at the same time).
+"""
+
+import base64
+import re
+import smtplib
+import uuid
+from email import policy
+from email.mime.base import MIMEBase
+from email.utils import getaddresses
+from typing import Iterator, List
+
+CRLF = b"\r\n"
+
+# 57 input bytes encode to one 76-character base64 line, the MIME maximum
+_LINE_INPUT_BYTES = 57
+_CHUNK_LINES = 1024
+
+_SMTP_POLICY = policy.compat32.clone(linesep="\r\n")
+_LINE_START_DOT = re.compile(rb"(\r\n)\.")
+
+
+class FileAttachment(MIMEBase):
+    """
+    Base64 attachment part whose content is streamed from disk when the message is sent.
+    
+    Args:
+        path: File to attach
+        filename: File name shown to the recipient
+        subtype: MIME subtype of application/* (default: zip)
+    """
+    
+    def __init__(self, path: str, filename: str, subtype: str = "zip"):
+        MIMEBase.__init__(self, "application", subtype)
+        self.path = path
+        self["Content-Transfer-Encoding"] = "base64"
+        self.add_header("Content-Disposition", "attachment", filename=filename)
+
+
+def has_file_attachments(msg) -> bool:
+    """Check whether a message has parts that must be streamed"""
+    return msg.is_multipart() and any(isinstance(part, FileAttachment) for part in msg.get_payload())
+
+
+def _header_bytes(msg) -> bytes:
+    return b"".join(_SMTP_POLICY.fold_binary(name, value) for name, value in msg.items())
+
+
+def _iter_base64(path: str) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(_LINE_INPUT_BYTES * _CHUNK_LINES)
+            if not chunk:
+                return
+            yield base64.encodebytes(chunk).replace(b"\n", CRLF)
+
+
+def iter_message_bytes(msg) -> Iterator[bytes]:
+    """
+    Generate a multipart message in wire format (CRLF line endings), streaming FileAttachment parts.
+    
+    Every chunk ends at a line boundary.
+    """
+    boundary = msg.get_boundary()
+    if boundary is None:
+        boundary = f"==============={uuid.uuid4().hex}=="
+        msg.set_boundary(boundary)
+    delimiter = b"--" + boundary.encode("ascii")
+    
+    yield _header_bytes(msg) + CRLF
+    
+    for part in msg.get_payload():
+        yield delimiter + CRLF
+        if isinstance(part, FileAttachment):
+            yield _header_bytes(part) + CRLF
+            yield from _iter_base64(part.path)
+        else:
+            # Body parts are small; the email package renders them as usual
+            rendered = part.as_bytes(policy=_SMTP_POLICY)
+            yield rendered if rendered.endswith(CRLF) else rendered + CRLF
+            
+    yield delimiter + b"--" + CRLF
+
+
+def stuff_dots(chunk: bytes) -> bytes:
+    """Dot-stuff a chunk from iter_message_bytes for the SMTP DATA section"""
+    # Every chunk starts on a new line, so a leading dot is stuffed by prefixing CRLF
+    return _LINE_START_DOT.sub(rb"\1..", CRLF + chunk)[len(CRLF):]
+
+
+def message_envelope(msg) -> tuple:
+    """Envelope sender and recipients of a message, as smtplib.SMTP.send_message derives them"""
+    from_addr = msg["Sender"] or msg["From"]
+    from_addr = getaddresses([from_addr])[0][1] if from_addr else ""
+    to_addrs: List[str] = [address for _, address in getaddresses(
+        msg.get_all("To", []) + msg.get_all("Cc", []) + msg.get_all("Bcc", [])
+    )]
+    return from_addr, to_addrs
+
+
+def send_streamed_message(server: smtplib.SMTP, msg) -> dict:
+    """
+    Send a message over an open SMTP session, streaming the DATA section.
+    
+    Mirrors smtplib.SMTP.send_message (same exceptions and refused-recipient
+    result) but writes the message in chunks instead of flattening it first.
+    Bcc headers are removed from the transmitted message as send_message does.
+    """
+    from_addr, to_addrs = message_envelope(msg)
+    bcc = msg.get_all("Bcc")
+    if bcc:
+        del msg["Bcc"]
+        
+    try:
+        server.ehlo_or_helo_if_needed()
+        code, response = server.mail(from_addr)
+        if code != 250:
+            server.rset()
+            raise smtplib.SMTPSenderRefused(code, response, from_addr)
+            
+        refused = {}
+        for address in to_addrs:
+            code, response = server.rcpt(address)
+            if code not in (250, 251):
+                refused[address] = (code, response)
+        if len(refused) == len(to_addrs):
+            server.rset()
+            raise smtplib.SMTPRecipientsRefused(refused)
+            
+        code, response = server.docmd("data")
+        if code != 354:
+            server.rset()
+            raise smtplib.SMTPDataError(code, response)
+            
+        for chunk in iter_message_bytes(msg):
+            server.send(stuff_dots(chunk))
+        server.send(b"." + CRLF)
+        
+        code, response = server.getreply()
+        if code != 250:
+            server.rset()
+            raise smtplib.SMTPDataError(code, response)
+        return refused
+    finally:
+        if bcc:
+            for value in bcc:
+                msg["Bcc"] = value
+
+
+def send_smtp_message(server: smtplib.SMTP, msg) -> dict:
+    """Send a message over an open SMTP session, streaming attachments when it has any"""
+    if has_file_attachments(msg):
+        return send_streamed_message(server, msg)
+    return server.send_message(msg)
@@ -10,7 +10,7 @@ from ....utils.file_utils import format_file_size
 SERVER_ENV = os.environ.get('SERVER_ENV', '').lower() == 'true'
 
 try:
-    from ...storage import GoogleDriveService
+    from ...storage import get_gdrive_client
     GDRIVE_AVAILABLE = True
     
     if SERVER_ENV:
@@ -53,8 +53,8 @@ class GDriveIntegration:
         # If we have valid OAuth credentials and a valid credential file exists
         if os.path.exists(creds_path):
             try:
-                gdrive = GoogleDriveService()
-                if gdrive.is_authenticated:
+                # Shared client: authenticates once per process, not once per email
+                if get_gdrive_client().ensure_authenticated():
                     return True, "Google Drive service is available"
                 else:
                     # Enable mock mode for testing in non-interactive environments
@@ -79,7 +79,7 @@ class GDriveIntegration:
             return False, None, "Google Drive service not available"
         
         try:
-            gdrive = GoogleDriveService()
+            gdrive = get_gdrive_client()
             logger.info("Using Google Drive account for file upload")
             
             file_size_bytes = os.path.getsize(attachment_path)
@@ -96,35 +96,19 @@ class GDriveIntegration:
                 )
                 email_logger.log_info(f"Shared file with restricted access to {recipient}")
             elif gdrive_share_type == 'specific' and specific_emails:
+                email_list = []
+                if isinstance(specific_emails, str):
+                    email_list = [email.strip() for email in specific_emails.split(',') if email.strip()]
+                elif isinstance(specific_emails, list):
+                    email_list = specific_emails
+                    
+                # The recipient and every listed address are shared in one batch request
                 upload_success, drive_link, error_msg = gdrive.upload_and_get_link(
                     attachment_path,
                     share_type='restricted',
-                    recipient_email=recipient
+                    recipient_email=recipient,
+                    additional_emails=email_list
                 )
-                
-                if upload_success and drive_link:
-                    email_list = []
-                    if isinstance(specific_emails, str):
-                        email_list = [email.strip() for email in specific_emails.split(',') if email.strip()]
-                    elif isinstance(specific_emails, list):
-                        email_list = specific_emails
-                    
-                    for email in email_list:
-                        if email != recipient:
-                            try:
-                                file_id = drive_link.split('/')[-2]
-                                permission = {
-                                    'type': 'user',
-                                    'role': 'reader',
-                                    'emailAddress': email
-                                }
-                                gdrive.drive_service.permissions().create(
-                                    fileId=file_id,
-                                    body=permission
-                                ).execute()
-                                email_logger.log_info(f"Added specific access for {email}")
-                            except Exception as e:
-                                email_logger.log_warning(f"Failed to share with {email}: {str(e)}")
             else:
                 upload_success, drive_link, error_msg = gdrive.upload_and_get_link(attachment_path)
             
@@ -1,12 +1,60 @@
 import logging
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Tuple, List, Any
 
 from ....core.config import get_settings
 from ....utils.db_utils import get_db_connection
 
 logger = logging.getLogger(__name__)
 
+def build_status_update(
+    email_id: int, 
+    status: str, 
+    reason: Optional[str] = None,
+    send_date: Optional[datetime] = None,
+    date: Optional[datetime] = None,
+    lease_owner: Optional[str] = None
+) -> Tuple[str, List[Any]]:
+    """
+    Build the UPDATE statement and parameters for an email status change
+    
+    With lease_owner set, the row is only updated while that owner still holds
+    its claim, and the lease is released.
+    """
+    settings = get_settings()
+    
+    update_fields = ["Email_Status = ?"] 
+    params = [status]
+    
+    if reason is not None:
+        update_fields.append("Reason = ?")
+        params.append(reason)
+        
+    if send_date is not None:
+        update_fields.append("Email_Send_Date = ?")
+        params.append(send_date)
+        
+    if date is not None:
+        update_fields.append("Date = ?")
+        params.append(date)
+        
+    where = "Email_ID = ?"
+    params.append(email_id)
+    
+    if lease_owner is not None:
+        update_fields.append("Lease_Owner = NULL")
+        update_fields.append("Lease_Expires = NULL")
+        where += " AND Lease_Owner = ?"
+        params.append(lease_owner)
+    
+    query = f"""
+        UPDATE {settings.EMAIL_TABLE}
+        SET {', '.join(update_fields)}
+        WHERE {where}
+    """
+    
+    return query, params
+
 def update_email_status(
     email_id: int, 
     status: str, 
@@ -18,30 +66,8 @@ def update_email_status(
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
-        settings = get_settings()
-        
-        update_fields = ["Email_Status = ?"] 
-        params = [status]
-        
-        if reason is not None:
-            update_fields.append("Reason = ?")
-            params.append(reason)
-            
-        if send_date is not None:
-            update_fields.append("Email_Send_Date = ?")
-            params.append(send_date)
-            
-        if date is not None:
-            update_fields.append("Date = ?")
-            params.append(date)
-            
-        params.append(email_id)
         
-        query = f"""
-            UPDATE {settings.EMAIL_TABLE}
-            SET {', '.join(update_fields)}
-            WHERE Email_ID = ?
-        """
+        query, params = build_status_update(email_id, status, reason, send_date, date)
         
         cursor.execute(query, params)
         conn.commit()
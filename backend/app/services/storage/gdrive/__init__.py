@@ -5,13 +5,15 @@ This module provides Google Drive integration with a refactored structure:
 - authentication.py: Handles OAuth 2.0 authentication
 - file_operations.py: Handles file uploads and link generation
 - gdrive_client.py: Main client using composition pattern
+- upload_index.py: Reuses uploaded files across recipients
 
 For backward compatibility, GoogleDriveClient is exported as GoogleDriveService.
 """
 
-from .gdrive_client import GoogleDriveClient
+from .gdrive_client import GoogleDriveClient, get_gdrive_client
 from .authentication import GoogleDriveAuthenticator
 from .file_operations import GoogleDriveFileOperations
+from .upload_index import DriveUploadIndex, get_drive_upload_index
 
 # Backward compatibility - export GoogleDriveClient as GoogleDriveService
 GoogleDriveService = GoogleDriveClient
@@ -20,5 +22,8 @@ __all__ = [
     'GoogleDriveClient',
     'GoogleDriveService',  # Backward compatibility
     'GoogleDriveAuthenticator',
-    'GoogleDriveFileOperations'
+    'GoogleDriveFileOperations',
+    'get_gdrive_client',
+    'DriveUploadIndex',
+    'get_drive_upload_index'
 ]
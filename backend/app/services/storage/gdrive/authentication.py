@@ -37,6 +37,26 @@ class GoogleDriveAuthenticator:
         Returns:
             Google Drive service object if authentication was successful, None otherwise
         """
+        try:
+            creds = self.load_credentials()
+            if not creds:
+                return None
+                
+            drive_service = self.build_service(creds)
+            return drive_service if self.verify(drive_service) else None
+            
+        except Exception as e:
+            logger.error(f"Failed to authenticate with Google Drive: {str(e)}")
+            return None
+            
+    def load_credentials(self) -> Optional[object]:
+        """
+        Load OAuth 2.0 credentials from the token file, refreshing them or running
+        the OAuth flow when they are not valid
+        
+        Returns:
+            Valid credentials, or None if they could not be obtained
+        """
         try:
             creds = None
             
@@ -100,40 +120,74 @@ class GoogleDriveAuthenticator:
                         return None
                 
                 # Save the credentials securely for the next run
-                try:
-                    # Ensure credentials directory exists
-                    os.makedirs(os.path.dirname(self.token_file), exist_ok=True)
-                    
-                    with open(self.token_file, 'wb') as token:
-                        pickle.dump(creds, token)
-                    logger.info(f"Credentials saved to {self.token_file}")
+                self._save_credentials(creds)
                     
-                    # Set more restrictive permissions on Windows if possible
-                    self._set_file_permissions()
-                    
-                except Exception as e:
-                    logger.error(f"Failed to save credentials: {str(e)}")
-                    email_logger.log_error(f"Failed to save Google Drive credentials: {str(e)}")
-                    # We can still continue with the current session even if saving fails
+            return creds
             
-            # Build the Drive service
-            drive_service = build('drive', 'v3', credentials=creds)
+        except Exception as e:
+            logger.error(f"Failed to load Google Drive credentials: {str(e)}")
+            return None
             
-            # Verify the authentication works by making a simple API call
-            try:
-                about = drive_service.about().get(fields="user").execute()
-                email = about.get('user', {}).get('emailAddress')
-                logger.info(f"Successfully authenticated with Google Drive as {email}")
-                email_logger.log_info(f"Successfully authenticated with Google Drive as {email}")
-                return drive_service
-            except Exception as e:
-                logger.error(f"Authentication verification failed: {str(e)}")
-                email_logger.log_error(f"Google Drive authentication verification failed: {str(e)}")
-                return None
+    def refresh_credentials(self, creds) -> bool:
+        """
+        Refresh credentials with their refresh token and save them
+        
+        Returns:
+            bool: True if the credentials were refreshed
+        """
+        if not creds.refresh_token:
+            return False
             
+        try:
+            logger.info("Refreshing Google Drive credentials before they expire...")
+            creds.refresh(Request())
         except Exception as e:
-            logger.error(f"Failed to authenticate with Google Drive: {str(e)}")
-            return None
+            logger.error(f"Failed to refresh credentials: {str(e)}")
+            email_logger.log_error(f"Failed to refresh Google Drive credentials: {str(e)}")
+            return False
+            
+        self._save_credentials(creds)
+        return True
+        
+    def build_service(self, creds) -> object:
+        """Build a Drive v3 service from the discovery document bundled with the client library"""
+        return build('drive', 'v3', credentials=creds, cache_discovery=False, static_discovery=True)
+        
+    def verify(self, drive_service) -> bool:
+        """
+        Verify the authentication works by making a simple API call
+        
+        Returns:
+            bool: True if the call succeeded
+        """
+        try:
+            about = drive_service.about().get(fields="user").execute()
+            email = about.get('user', {}).get('emailAddress')
+            logger.info(f"Successfully authenticated with Google Drive as {email}")
+            email_logger.log_info(f"Successfully authenticated with Google Drive as {email}")
+            return True
+        except Exception as e:
+            logger.error(f"Authentication verification failed: {str(e)}")
+            email_logger.log_error(f"Google Drive authentication verification failed: {str(e)}")
+            return False
+            
+    def _save_credentials(self, creds):
+        """Save credentials to the token file; the current session continues if this fails"""
+        try:
+            # Ensure credentials directory exists
+            os.makedirs(os.path.dirname(self.token_file), exist_ok=True)
+            
+            with open(self.token_file, 'wb') as token:
+                pickle.dump(creds, token)
+            logger.info(f"Credentials saved to {self.token_file}")
+            
+            # Set more restrictive permissions on Windows if possible
+            self._set_file_permissions()
+            
+        except Exception as e:
+            logger.error(f"Failed to save credentials: {str(e)}")
+            email_logger.log_error(f"Failed to save Google Drive credentials: {str(e)}")
+            
     
     def _set_file_permissions(self):
         """Set restrictive permissions on the token file (Windows-specific)"""
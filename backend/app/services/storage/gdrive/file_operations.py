@@ -1,13 +1,59 @@
 import os
 import logging
-from typing import Optional, Tuple
+import random
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+import httplib2
+from googleapiclient.errors import HttpError
 from googleapiclient.http import MediaFileUpload
 from ....core.config import get_settings
 from ....utils.email_logger import email_logger
 from ....utils.file_utils import get_formatted_file_size
+from .upload_index import get_drive_upload_index
 
 logger = logging.getLogger(__name__)
 
+# Drive requires resumable chunks to be a multiple of 256 KB
+_CHUNK_ALIGNMENT = 256 * 1024
+
+# Responses worth retrying; the upload resumes from the last acknowledged byte
+_RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+_RETRYABLE_ERRORS = (ConnectionError, TimeoutError, httplib2.HttpLib2Error)
+
+# The resumable session has expired and the upload must start again
+_SESSION_EXPIRED_STATUSES = {404, 410}
+
+_MAX_BACKOFF_SECONDS = 32
+
+# Fields requested from files().create so no follow-up files().get is needed for the link
+_UPLOAD_FIELDS = 'id,webViewLink,webContentLink'
+
+# Drive accepts at most 100 calls per batch request
+_MAX_BATCH_CALLS = 100
+
+def _is_not_found(error: Optional[Exception]) -> bool:
+    return isinstance(error, HttpError) and error.resp.status == 404
+
+
+# Limits concurrent uploads across all threads of the process
+_upload_slots: Optional[threading.BoundedSemaphore] = None
+_upload_slots_lock = threading.Lock()
+
+
+def _get_upload_slots() -> threading.BoundedSemaphore:
+    global _upload_slots
+    with _upload_slots_lock:
+        if _upload_slots is None:
+            _upload_slots = threading.BoundedSemaphore(max(1, get_settings().GDRIVE_UPLOAD_WORKERS))
+        return _upload_slots
+
+
+def _upload_chunk_size() -> int:
+    """Configured chunk size rounded to a multiple of 256 KB"""
+    chunk_size = int(get_settings().GDRIVE_UPLOAD_CHUNK_MB * 1024 * 1024)
+    return max(_CHUNK_ALIGNMENT, chunk_size // _CHUNK_ALIGNMENT * _CHUNK_ALIGNMENT)
+
 
 class GoogleDriveFileOperations:
     """Handles Google Drive file operations including upload and link generation"""
@@ -33,6 +79,17 @@ class GoogleDriveFileOperations:
             Tuple[bool, Optional[str], Optional[str]]: 
                 (success, file_id if successful, error message if failed)
         """
+        upload_success, file, upload_error = self._upload(file_path, folder_id)
+        return upload_success, file.get('id') if file else None, upload_error
+        
+    def _upload(self, file_path: str, folder_id: Optional[str] = None) -> Tuple[bool, Optional[dict], Optional[str]]:
+        """
+        Upload a file to Google Drive
+        
+        Returns:
+            Tuple[bool, Optional[dict], Optional[str]]: 
+                (success, file resource with id and links if successful, error message if failed)
+        """
         try:
             file_name = os.path.basename(file_path)
             file_metadata = {'name': file_name}
@@ -64,45 +121,130 @@ class GoogleDriveFileOperations:
             else:
                 logger.info("GDrive Upload - No folder ID specified, using root folder")
             
-            # Create media file upload object
-            media = MediaFileUpload(
-                file_path,
-                mimetype='application/zip',
-                resumable=True
-            )
-            
-            # Execute the upload
-            file = self.drive_service.files().create(
-                body=file_metadata,
-                media_body=media,
-                fields='id'
-            ).execute()
+            # Bounded so parallel senders do not split the uplink too many ways
+            with _get_upload_slots():
+                file = self._upload_in_chunks(file_path, file_name, file_metadata, size_bytes)
             
             file_id = file.get('id')
             success_message = f"Successfully uploaded file {file_name} ({formatted_size}) to Google Drive with ID: {file_id}"
             logger.info(success_message)
             email_logger.log_info(f"Upload complete: {file_name} successfully uploaded to Google Drive")
             
-            return True, file_id, None
+            return True, file, None
             
         except Exception as e:
             error_message = f"Failed to upload file to Google Drive: {str(e)}"
             logger.error(error_message)
             return False, None, error_message
+            
+    def _create_request(self, file_path: str, file_metadata: dict):
+        media = MediaFileUpload(
+            file_path,
+            mimetype='application/zip',
+            chunksize=_upload_chunk_size(),
+            resumable=True
+        )
+        return self.drive_service.files().create(
+            body=file_metadata,
+            media_body=media,
+            fields=_UPLOAD_FIELDS
+        )
+        
+    def _upload_in_chunks(self, file_path: str, file_name: str, file_metadata: dict, size_bytes: int) -> dict:
+        """
+        Run a resumable upload chunk by chunk, reporting progress
+        
+        After a transient error the same request is resumed: googleapiclient asks
+        Drive how many bytes it has and continues from there. If the upload session
+        itself has expired the upload starts over.
+        
+        Returns:
+            The created file resource
+        """
+        max_retries = get_settings().GDRIVE_UPLOAD_MAX_RETRIES
+        request = self._create_request(file_path, file_metadata)
+        response = None
+        retries = 0
+        last_reported = 0
+        
+        while response is None:
+            try:
+                status, response = request.next_chunk()
+            except HttpError as e:
+                status_code = e.resp.status
+                if status_code in _SESSION_EXPIRED_STATUSES and retries < max_retries:
+                    retries += 1
+                    logger.warning(f"Upload session for {file_name} expired, restarting upload (attempt {retries}/{max_retries})")
+                    request = self._create_request(file_path, file_metadata)
+                    continue
+                if status_code not in _RETRYABLE_STATUSES or retries >= max_retries:
+                    raise
+                retries += 1
+                self._wait_before_retry(file_name, retries, max_retries, f"HTTP {status_code}")
+                continue
+            except _RETRYABLE_ERRORS as e:
+                if retries >= max_retries:
+                    raise
+                retries += 1
+                self._wait_before_retry(file_name, retries, max_retries, str(e))
+                continue
+                
+            if status:
+                # Progress was made, so allow a fresh set of retries for the next error
+                retries = 0
+                percent = int(status.progress() * 100)
+                if percent - last_reported >= 10:
+                    last_reported = percent
+                    email_logger.log_info(
+                        f"Uploading {file_name} to Google Drive: {percent}% "
+                        f"({status.resumable_progress}/{size_bytes} bytes)"
+                    )
+                    
+        return response
+        
+    def _wait_before_retry(self, file_name: str, attempt: int, max_retries: int, reason: str):
+        delay = min(_MAX_BACKOFF_SECONDS, 2 ** (attempt - 1)) + random.random()
+        logger.warning(f"Upload of {file_name} interrupted ({reason}), resuming in {delay:.1f}s (attempt {attempt}/{max_retries})")
+        email_logger.log_warning(f"Google Drive upload of {file_name} interrupted, resuming (attempt {attempt}/{max_retries})")
+        time.sleep(delay)
     
-    def generate_shareable_link(self, file_id: str, share_type: str = 'anyone', recipient_email: Optional[str] = None) -> Tuple[bool, Optional[str], Optional[str]]:
+    def generate_shareable_link(self, file_id: str, share_type: str = 'anyone', recipient_email: Optional[str] = None,
+                                additional_emails: Optional[List[str]] = None,
+                                file: Optional[dict] = None) -> Tuple[bool, Optional[str], Optional[str]]:
         """
         Generate a shareable link for a file in Google Drive with specified permissions
         
+        All permission calls (and the link lookup, when the links are not already
+        known from the upload response) go to Drive in a single batch request.
+        
         Args:
             file_id: ID of the file in Google Drive
             share_type: Type of sharing permission ('anyone', 'restricted', or 'specific')
             recipient_email: Email address of the recipient (used for 'restricted' or 'specific' share_type)
+            additional_emails: Other addresses to give read access; failures for these are only logged
+            file: File resource from the upload, with webViewLink/webContentLink
             
         Returns:
             Tuple[bool, Optional[str], Optional[str]]: 
                 (success, shareable_link if successful, error message if failed)
         """
+        shareable_link, error_message, _, _ = self._share(file_id, share_type, recipient_email, additional_emails, file)
+        return shareable_link is not None, shareable_link, error_message
+        
+    def _share(self, file_id: str, share_type: str, recipient_email: Optional[str],
+               additional_emails: Optional[List[str]], file: Optional[dict],
+               already_shared: Iterable[str] = (), verify_exists: bool = False) -> Tuple[Optional[str], Optional[str], List[str], bool]:
+        """
+        Grant the permissions a send needs and get the file's link, in one batch request
+        
+        Args:
+            already_shared: Permission keys ('anyone' or an address) granted earlier, which are skipped
+            verify_exists: Also fetch the file, to detect that it was deleted or trashed on Drive
+            
+        Returns:
+            Tuple of (shareable link or None, error message, permission keys now granted,
+            whether the file no longer exists on Drive)
+        """
         try:
             # Update permissions based on the specified share_type
             if share_type == 'restricted' and recipient_email:
@@ -130,34 +272,92 @@ class GoogleDriveFileOperations:
                 }
                 logger.info(f"Setting 'anyone with the link' access for file {file_id}")
             
-            self.drive_service.permissions().create(
-                fileId=file_id,
-                body=permission
-            ).execute()
+            already_shared = set(already_shared)
+            primary_key = permission.get('emailAddress', 'anyone')
+            granted = list(already_shared)
+            
+            calls = []
+            if primary_key not in already_shared:
+                calls.append(('permission', permission))
+            for email in dict.fromkeys(additional_emails or []):
+                if email != recipient_email and email not in already_shared:
+                    calls.append((email, {'type': 'user', 'role': 'reader', 'emailAddress': email}))
             
-            # Get the file to construct the shareable link
-            file = self.drive_service.files().get(
-                fileId=file_id,
-                fields='webContentLink,webViewLink'
-            ).execute()
+            links = {} if file is None else file
+            if verify_exists or (not links.get('webViewLink') and not links.get('webContentLink')):
+                calls.append(('file', None))
+                
+            results = self._execute_batch(file_id, calls) if calls else {}
+            
+            # A deleted file fails every call with 404; a trashed one still answers the lookup
+            file_response, file_error = results.get('file', (None, None))
+            if any(_is_not_found(error) for _, error in results.values()) or (file_response or {}).get('trashed'):
+                logger.info(f"File {file_id} no longer exists on Google Drive")
+                return None, f"File {file_id} no longer exists on Google Drive", [], True
+                
+            if 'permission' in results:
+                error = results['permission'][1]
+                if error is not None:
+                    raise error
+                granted.append(primary_key)
+                
+            for email, _ in calls:
+                if email in ('permission', 'file'):
+                    continue
+                email_error = results[email][1]
+                if email_error is None:
+                    granted.append(email)
+                    email_logger.log_info(f"Added specific access for {email}")
+                else:
+                    email_logger.log_warning(f"Failed to share with {email}: {str(email_error)}")
+                    
+            if file_error is not None:
+                raise file_error
+            if file_response is not None:
+                links = file_response
             
             # Prefer webViewLink (shows file in Drive interface) over webContentLink (direct download)
             # This provides a better user experience similar to Gmail attachments, showing the file in Drive UI
             # rather than triggering the "Google Drive can't scan this file for viruses" warning
-            shareable_link = file.get('webViewLink', file.get('webContentLink'))
+            shareable_link = links.get('webViewLink', links.get('webContentLink'))
             
             if not shareable_link:
-                return False, None, "Failed to generate shareable link"
+                return None, "Failed to generate shareable link", granted, False
                 
             logger.info(f"Generated shareable link for file ID {file_id}")
-            return True, shareable_link, None
+            return shareable_link, None, granted, False
             
         except Exception as e:
             error_message = f"Failed to generate shareable link: {str(e)}"
             logger.error(error_message)
-            return False, None, error_message
+            return None, error_message, [], False
     
-    def upload_and_get_link(self, file_path: str, folder_id: Optional[str] = None, share_type: str = 'anyone', recipient_email: Optional[str] = None) -> Tuple[bool, Optional[str], Optional[str]]:
+    def _execute_batch(self, file_id: str, calls: List[Tuple[str, Optional[dict]]]) -> Dict[str, Tuple[Optional[dict], Optional[Exception]]]:
+        """
+        Run permission creates (and a files().get for the 'file' call) as batch requests
+        
+        Returns:
+            Dict mapping each call key to (response, exception)
+        """
+        results: Dict[str, Tuple[Optional[dict], Optional[Exception]]] = {}
+        
+        def callback(request_id, response, exception):
+            results[request_id] = (response, exception)
+            
+        for start in range(0, len(calls), _MAX_BATCH_CALLS):
+            batch = self.drive_service.new_batch_http_request(callback=callback)
+            for key, body in calls[start:start + _MAX_BATCH_CALLS]:
+                if key == 'file':
+                    request = self.drive_service.files().get(fileId=file_id, fields='id,trashed,webContentLink,webViewLink')
+                else:
+                    request = self.drive_service.permissions().create(fileId=file_id, body=body, fields='id')
+                batch.add(request, request_id=key)
+            batch.execute()
+            
+        return results
+        
+    def upload_and_get_link(self, file_path: str, folder_id: Optional[str] = None, share_type: str = 'anyone', recipient_email: Optional[str] = None,
+                            additional_emails: Optional[List[str]] = None) -> Tuple[bool, Optional[str], Optional[str]]:
         """
         Upload a file to Google Drive and generate a shareable link with specified permissions
         
@@ -166,11 +366,61 @@ class GoogleDriveFileOperations:
             folder_id: Optional folder ID to upload to (root folder if None)
             share_type: Type of sharing permission ('anyone', 'restricted', or 'specific')
             recipient_email: Email address of the recipient (used for 'restricted' or 'specific' share_type)
+            additional_emails: Other addresses to give read access
             
         Returns:
             Tuple[bool, Optional[str], Optional[str]]: 
                 (success, shareable_link if successful, error message if failed)
         """
+        # Only 'anyone with the link' uploads are reused. A restricted or specific share
+        # names its recipient, who must not be handed (or listed on) another recipient's file
+        shared_with_anyone = share_type not in ('restricted', 'specific') or not recipient_email
+        
+        index = get_drive_upload_index() if get_settings().GDRIVE_DEDUP_ENABLED and shared_with_anyone else None
+        content_hash = None
+        if index is not None:
+            try:
+                # The share type is part of the key, so an upload is only reused for the same kind of share
+                content_hash = f"anyone:{index.content_hash(file_path)}"
+            except OSError as e:
+                logger.warning(f"Could not hash {file_path} for upload reuse: {str(e)}")
+                
+        if content_hash is None:
+            return self._upload_and_share(file_path, folder_id, share_type, recipient_email, additional_emails)[:3]
+            
+        # Sends of the same archive wait for one upload and then reuse it
+        with index.key_lock(content_hash):
+            entry = index.get(content_hash)
+            if entry:
+                shareable_link, error_message, granted, missing = self._share(
+                    entry['file_id'], share_type, recipient_email, additional_emails, entry,
+                    already_shared=entry['shared'], verify_exists=True
+                )
+                if shareable_link:
+                    index.add_shared(content_hash, granted)
+                    email_logger.log_info(f"Reusing Google Drive upload of {os.path.basename(file_path)} (file ID {entry['file_id']})")
+                    return True, shareable_link, None
+                if not missing:
+                    return False, None, error_message
+                    
+                # Deleted on Drive since it was indexed; upload it again
+                index.invalidate(content_hash)
+                
+            success, shareable_link, error_message, file, granted = self._upload_and_share(
+                file_path, folder_id, share_type, recipient_email, additional_emails
+            )
+            if success:
+                index.put(content_hash, file, granted)
+            return success, shareable_link, error_message
+            
+    def _upload_and_share(self, file_path: str, folder_id: Optional[str], share_type: str, recipient_email: Optional[str],
+                          additional_emails: Optional[List[str]]) -> Tuple[bool, Optional[str], Optional[str], Optional[dict], List[str]]:
+        """
+        Upload a file and share it
+        
+        Returns:
+            Tuple of (success, shareable link, error message, uploaded file resource, permission keys granted)
+        """
         # Get file size for logging
         size_bytes, formatted_size = get_formatted_file_size(file_path)
         file_name = os.path.basename(file_path)
@@ -181,23 +431,25 @@ class GoogleDriveFileOperations:
         email_logger.log_info(process_start_message)
         
         # Upload the file
-        upload_success, file_id, upload_error = self.upload_file(file_path, folder_id)
+        upload_success, file, upload_error = self._upload(file_path, folder_id)
         
         if not upload_success:
-            return False, None, upload_error
+            return False, None, upload_error, None, []
         
         # Log progress
         email_logger.log_info(f"Generating shareable link for {file_name}...")
         
         # Generate shareable link with specified sharing permissions
-        link_success, shareable_link, link_error = self.generate_shareable_link(file_id, share_type, recipient_email)
+        shareable_link, link_error, granted, _ = self._share(
+            file['id'], share_type, recipient_email, additional_emails, file
+        )
         
-        if not link_success:
-            return False, None, link_error
+        if not shareable_link:
+            return False, None, link_error, file, granted
         
         # Log completion of the entire process - only to internal logger, not email_logger
         # This prevents duplicate messages as email_sender.py also logs a success message
         complete_message = f"File {file_name} ({formatted_size}) successfully uploaded and shared on Google Drive"
         logger.info(complete_message)
         
-        return True, shareable_link, None
+        return True, shareable_link, None, file, granted
@@ -3,30 +3,52 @@ Google Drive client for file operations.
 
 This module provides a high-level interface for Google Drive operations,
 composing authentication and file operations into a unified client.
+
+Use get_gdrive_client() for the process-wide client: it authenticates once on
+first use, refreshes the token shortly before it expires and keeps one Drive
+service per thread (httplib2 connections are not thread-safe), so sends do not
+repeat the token load, service build and verification call.
 """
 
 import logging
-from typing import Optional, Tuple
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from ....core.config import get_settings
 from .authentication import GoogleDriveAuthenticator
 from .file_operations import GoogleDriveFileOperations
 
 logger = logging.getLogger(__name__)
 
+# After a failed authentication, wait this long before trying again
+_AUTH_RETRY_SECONDS = 60
+
 
 class GoogleDriveClient:
     """Main Google Drive client using composition pattern for authentication and file operations"""
     
-    def __init__(self, credentials_file: Optional[str] = None, token_file: Optional[str] = None):
+    def __init__(self, credentials_file: Optional[str] = None, token_file: Optional[str] = None, lazy: bool = False):
         """
         Initialize the Google Drive client with credentials
         
         Args:
             credentials_file: Path to the Google OAuth 2.0 client credentials JSON file
             token_file: Path to the token pickle file
+            lazy: Defer authentication until the client is first used
         """
         self.authenticator = GoogleDriveAuthenticator(credentials_file, token_file)
-        self.file_operations = None
-        self.drive_service = None
+        self.credentials = None
+        self.refresh_margin = get_settings().GDRIVE_TOKEN_REFRESH_MARGIN_SECONDS
+        
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._generation = 0
+        self._last_failure = None
+        
+        if lazy:
+            return
         
         # Try to authenticate on initialization, but don't fail if it doesn't work
         try:
@@ -41,11 +63,74 @@ class GoogleDriveClient:
         Returns:
             bool: True if authentication was successful
         """
-        self.drive_service = self.authenticator.authenticate()
-        if self.drive_service:
-            self.file_operations = GoogleDriveFileOperations(self.drive_service)
+        with self._lock:
+            creds = self.authenticator.load_credentials()
+            drive_service = self.authenticator.build_service(creds) if creds else None
+            
+            # Verified once here; later services reuse the same credentials
+            if not drive_service or not self.authenticator.verify(drive_service):
+                self._last_failure = time.monotonic()
+                return False
+                
+            self.credentials = creds
+            self._last_failure = None
+            self._generation += 1
+            self._local.services = (self._generation, drive_service, GoogleDriveFileOperations(drive_service))
             return True
-        return False
+            
+    def ensure_authenticated(self) -> bool:
+        """
+        Authenticate on first use, retrying at most once a minute after a failure
+        
+        Returns:
+            bool: True if the client has valid credentials
+        """
+        if self.credentials is not None:
+            return True
+            
+        with self._lock:
+            if self.credentials is not None:
+                return True
+            if self._last_failure is not None and time.monotonic() - self._last_failure < _AUTH_RETRY_SECONDS:
+                return False
+            return self.authenticate()
+            
+    def _refresh_if_expiring(self):
+        """Refresh the shared credentials before they expire, so threads never refresh them at once"""
+        creds = self.credentials
+        expiry = getattr(creds, 'expiry', None)
+        # Credential expiry is a naive UTC datetime
+        if expiry is None or expiry - datetime.utcnow() > timedelta(seconds=self.refresh_margin):
+            return
+            
+        with self._lock:
+            if creds.expiry - datetime.utcnow() <= timedelta(seconds=self.refresh_margin):
+                self.authenticator.refresh_credentials(creds)
+                
+    def _thread_services(self) -> Optional[Tuple[object, GoogleDriveFileOperations]]:
+        """Drive service and file operations of the calling thread, built on first use"""
+        if not self.ensure_authenticated():
+            return None
+        self._refresh_if_expiring()
+        
+        services = getattr(self._local, 'services', None)
+        if services is None or services[0] != self._generation:
+            drive_service = self.authenticator.build_service(self.credentials)
+            services = (self._generation, drive_service, GoogleDriveFileOperations(drive_service))
+            self._local.services = services
+        return services[1], services[2]
+        
+    @property
+    def drive_service(self):
+        """Drive service for the calling thread, or None if not authenticated"""
+        services = self._thread_services()
+        return services[0] if services else None
+        
+    @property
+    def file_operations(self) -> Optional[GoogleDriveFileOperations]:
+        """File operations for the calling thread, or None if not authenticated"""
+        services = self._thread_services()
+        return services[1] if services else None
     
     def upload_file(self, file_path: str, folder_id: Optional[str] = None) -> Tuple[bool, Optional[str], Optional[str]]:
         """
@@ -59,12 +144,35 @@ class GoogleDriveClient:
             Tuple[bool, Optional[str], Optional[str]]: 
                 (success, file_id if successful, error message if failed)
         """
-        if not self.file_operations:
-            if not self.authenticate():
-                return False, None, "Failed to authenticate with Google Drive"
+        file_operations = self.file_operations
+        if not file_operations:
+            return False, None, "Failed to authenticate with Google Drive"
         
-        return self.file_operations.upload_file(file_path, folder_id)
+        return file_operations.upload_file(file_path, folder_id)
     
+    def upload_files(self, file_paths: List[str], folder_id: Optional[str] = None,
+                     max_workers: Optional[int] = None) -> Dict[str, Tuple[bool, Optional[str], Optional[str]]]:
+        """
+        Upload several files at once
+        
+        Args:
+            file_paths: Paths of the files to upload
+            folder_id: Optional folder ID to upload to (root folder if None)
+            max_workers: Uploads to run at once (default: GDRIVE_UPLOAD_WORKERS)
+            
+        Returns:
+            Dict mapping each file path to its upload_file result
+        """
+        if not file_paths:
+            return {}
+            
+        workers = max(1, min(len(file_paths), max_workers or get_settings().GDRIVE_UPLOAD_WORKERS))
+        
+        # Each worker thread gets its own Drive service through file_operations
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gdrive-upload") as executor:
+            futures = {file_path: executor.submit(self.upload_file, file_path, folder_id) for file_path in file_paths}
+            return {file_path: future.result() for file_path, future in futures.items()}
+            
     def generate_shareable_link(self, file_id: str, share_type: str = 'anyone', recipient_email: Optional[str] = None) -> Tuple[bool, Optional[str], Optional[str]]:
         """
         Generate a shareable link for a file in Google Drive with specified permissions
@@ -78,18 +186,19 @@ class GoogleDriveClient:
             Tuple[bool, Optional[str], Optional[str]]: 
                 (success, shareable_link if successful, error message if failed)
         """
-        if not self.file_operations:
-            if not self.authenticate():
-                return False, None, "Failed to authenticate with Google Drive"
+        file_operations = self.file_operations
+        if not file_operations:
+            return False, None, "Failed to authenticate with Google Drive"
         
-        return self.file_operations.generate_shareable_link(file_id, share_type, recipient_email)
+        return file_operations.generate_shareable_link(file_id, share_type, recipient_email)
     
     @property
     def is_authenticated(self) -> bool:
         """Check if we're authenticated with Google Drive"""
-        return self.drive_service is not None
+        return self.credentials is not None
     
-    def upload_and_get_link(self, file_path: str, folder_id: Optional[str] = None, share_type: str = 'anyone', recipient_email: Optional[str] = None) -> Tuple[bool, Optional[str], Optional[str]]:
+    def upload_and_get_link(self, file_path: str, folder_id: Optional[str] = None, share_type: str = 'anyone', recipient_email: Optional[str] = None,
+                            additional_emails: Optional[List[str]] = None) -> Tuple[bool, Optional[str], Optional[str]]:
         """
         Upload a file to Google Drive and generate a shareable link with specified permissions
         
@@ -98,13 +207,27 @@ class GoogleDriveClient:
             folder_id: Optional folder ID to upload to (root folder if None)
             share_type: Type of sharing permission ('anyone', 'restricted', or 'specific')
             recipient_email: Email address of the recipient (used for 'restricted' or 'specific' share_type)
+            additional_emails: Other addresses to give read access, shared in the same batch request
             
         Returns:
             Tuple[bool, Optional[str], Optional[str]]: 
                 (success, shareable_link if successful, error message if failed)
         """
-        if not self.file_operations:
-            if not self.authenticate():
-                return False, None, "Failed to authenticate with Google Drive"
+        file_operations = self.file_operations
+        if not file_operations:
+            return False, None, "Failed to authenticate with Google Drive"
         
-        return self.file_operations.upload_and_get_link(file_path, folder_id, share_type, recipient_email)
+        return file_operations.upload_and_get_link(file_path, folder_id, share_type, recipient_email, additional_emails)
+
+
+_client: Optional[GoogleDriveClient] = None
+_client_lock = threading.Lock()
+
+
+def get_gdrive_client() -> GoogleDriveClient:
+    """Get the process-wide Google Drive client; it authenticates on first use"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = GoogleDriveClient(lazy=True)
+        return _client
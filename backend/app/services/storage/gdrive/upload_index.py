@@ -0,0 +1,201 @@
+"""
+Index of files already uploaded to Google Drive.
+
+Maps the share type and content hash of an uploaded archive to its Drive file
+ID, links and the permissions already granted, so the same archive sent to
+several recipients is uploaded once and later sends only add the new
+permissions. Only uploads shared with anyone holding the link are indexed;
+restricted and specific shares are per recipient and never reused.
+Entries expire after GDRIVE_DEDUP_TTL_HOURS and are dropped as soon as Drive
+reports the file deleted or trashed. The index is kept in LOG_DIR_PATH so it
+survives restarts.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from ....core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+# Least recently used file hashes beyond this are forgotten (and recomputed if needed)
+_MAX_REMEMBERED_HASHES = 4096
+
+
+class DriveUploadIndex:
+    """
+    Content hash -> uploaded Drive file, with the permissions granted on it.
+    
+    Thread-safe; share one instance through get_drive_upload_index().
+    """
+    
+    def __init__(self, state_path: Optional[str] = None, ttl_seconds: Optional[float] = None):
+        self.state_path = state_path
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else get_settings().GDRIVE_DEDUP_TTL_HOURS * 3600
+        
+        self._entries: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        # hash -> [lock, threads holding or waiting for it]; dropped when the count reaches 0
+        self._key_locks: Dict[str, List] = {}
+        
+        # (path, size, mtime_ns) -> content hash, so a reused archive is hashed once
+        self._hashes: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+        
+        self._load()
+        
+    def _load(self):
+        if not self.state_path or not os.path.exists(self.state_path):
+            return
+            
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                self._entries = json.load(f)
+            self._drop_expired_locked()
+        except Exception as e:
+            logger.warning(f"Could not load Google Drive upload index: {str(e)}")
+            
+    def _save_locked(self):
+        if not self.state_path:
+            return
+            
+        try:
+            temp_path = f"{self.state_path}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f)
+            os.replace(temp_path, self.state_path)
+        except Exception as e:
+            logger.warning(f"Could not save Google Drive upload index: {str(e)}")
+            
+    def _drop_expired_locked(self):
+        cutoff = time.time() - self.ttl_seconds
+        for key in [key for key, entry in self._entries.items() if entry["uploaded_at"] < cutoff]:
+            del self._entries[key]
+            
+    def content_hash(self, file_path: str) -> str:
+        """
+        SHA-256 of a file's contents, remembered while its size and mtime are unchanged
+        
+        Raises:
+            OSError: If the file cannot be read
+        """
+        stat = os.stat(file_path)
+        signature = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            cached = self._hashes.get(signature)
+            if cached:
+                self._hashes.move_to_end(signature)
+        if cached:
+            return cached
+            
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+                
+        content_hash = digest.hexdigest()
+        with self._lock:
+            self._hashes[signature] = content_hash
+            self._hashes.move_to_end(signature)
+            while len(self._hashes) > _MAX_REMEMBERED_HASHES:
+                self._hashes.popitem(last=False)
+        return content_hash
+        
+    @contextmanager
+    def key_lock(self, content_hash: str) -> Iterator[None]:
+        """
+        Lock held while a hash is looked up and uploaded, so concurrent sends upload once.
+        Dropped from the index once nobody holds or waits for it.
+        """
+        with self._lock:
+            entry = self._key_locks.setdefault(content_hash, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._key_locks[content_hash]
+            
+    def get(self, content_hash: str) -> Optional[dict]:
+        """Entry for a hash (file_id, links, shared), or None if unknown or expired"""
+        with self._lock:
+            entry = self._entries.get(content_hash)
+            if entry is None:
+                return None
+            if entry["uploaded_at"] < time.time() - self.ttl_seconds:
+                del self._entries[content_hash]
+                self._save_locked()
+                return None
+            return dict(entry, shared=list(entry["shared"]))
+            
+    def put(self, content_hash: str, file: dict, shared: List[str]):
+        """Record a new upload and the permissions granted on it"""
+        with self._lock:
+            self._drop_expired_locked()
+            self._entries[content_hash] = {
+                "file_id": file["id"],
+                "webViewLink": file.get("webViewLink"),
+                "webContentLink": file.get("webContentLink"),
+                "shared": sorted(set(shared)),
+                "uploaded_at": time.time()
+            }
+            self._save_locked()
+            
+    def add_shared(self, content_hash: str, shared: List[str]):
+        """Record permissions granted on an existing upload"""
+        with self._lock:
+            entry = self._entries.get(content_hash)
+            if entry is None:
+                return
+            entry["shared"] = sorted(set(entry["shared"]) | set(shared))
+            self._save_locked()
+            
+    def invalidate(self, content_hash: Optional[str] = None, file_id: Optional[str] = None) -> int:
+        """
+        Forget an upload by content hash or Drive file ID (e.g. after it was deleted on Drive)
+        
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            keys = [
+                key for key, entry in self._entries.items()
+                if key == content_hash or (file_id is not None and entry["file_id"] == file_id)
+            ]
+            for key in keys:
+                del self._entries[key]
+            if keys:
+                self._save_locked()
+            return len(keys)
+
+
+_index: Optional[DriveUploadIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_drive_upload_index() -> DriveUploadIndex:
+    """Get the shared upload index, keeping it in LOG_DIR_PATH"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            state_path = None
+            log_dir = get_settings().LOG_DIR_PATH
+            if log_dir:
+                try:
+                    os.makedirs(log_dir, exist_ok=True)
+                    state_path = os.path.join(log_dir, "gdrive_uploads.json")
+                except OSError as e:
+                    logger.warning(f"Google Drive upload index will not be kept: {str(e)}")
+            _index = DriveUploadIndex(state_path)
+        return _index
@@ -23,14 +23,20 @@ from .core import (
     clear_template_cache,
     clear_metadata_cache,
     clear_all_caches,
-    get_template_metadata
+    get_template_metadata,
+    CompiledTemplate,
+    compile_template,
+    render_template,
+    clear_compiled_template_cache,
+    get_template_store
 )
 
 # Template validation
 from .validation import (
     TemplateValidator,
     TemplateValidationError,
-    validate_template
+    validate_template,
+    validate_template_directory
 )
 
 # Public API - these are the functions that external modules should use
@@ -48,9 +54,17 @@ __all__ = [
     'clear_metadata_cache',
     'clear_all_caches',
     'get_template_metadata',
+    'clear_compiled_template_cache',
+    'get_template_store',
+    
+    # Template rendering
+    'CompiledTemplate',
+    'compile_template',
+    'render_template',
     
     # Template validation
     'TemplateValidator',
     'TemplateValidationError',
-    'validate_template'
+    'validate_template',
+    'validate_template_directory'
 ]
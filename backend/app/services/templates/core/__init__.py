@@ -5,6 +5,7 @@ This module provides core functionality for email template management including:
 - Template CRUD operations
 - Template loading and caching
 - Template metadata management
+- Precompiled template rendering
 """
 
 from .template_manager import (
@@ -23,6 +24,19 @@ from .template_loader import (
     get_template_metadata
 )
 
+from .template_renderer import (
+    CompiledTemplate,
+    compile_template,
+    render_template,
+    clear_compiled_template_cache
+)
+
+from .template_store import (
+    TemplateFile,
+    TemplateStore,
+    get_template_store
+)
+
 __all__ = [
     'TEMPLATE_MAPPINGS',
     'get_email_templates',
@@ -33,5 +47,12 @@ __all__ = [
     'clear_template_cache',
     'clear_metadata_cache',
     'clear_all_caches',
-    'get_template_metadata'
+    'get_template_metadata',
+    'CompiledTemplate',
+    'compile_template',
+    'render_template',
+    'clear_compiled_template_cache',
+    'TemplateFile',
+    'TemplateStore',
+    'get_template_store'
 ]
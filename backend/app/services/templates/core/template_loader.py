@@ -2,21 +2,22 @@
 Template loading and caching utilities.
 
 This module provides efficient template loading with caching capabilities,
-metadata management, and template content preprocessing.
+metadata management, and template content preprocessing. Template files are
+served by the template store, which re-reads a file only when it changes.
 """
 
 import logging
-import os
 from typing import Dict, Optional
-from functools import lru_cache
+
+from .template_renderer import clear_compiled_template_cache
+from .template_store import get_template_store
 
 logger = logging.getLogger(__name__)
 
 
-@lru_cache(maxsize=32)
 def load_template_content(template_id: str) -> str:
     """
-    Load template content from file with caching.
+    Load template content from file with caching (up to date with the file).
     
     Args:
         template_id: ID of the template
@@ -37,7 +38,7 @@ def load_template_content(template_id: str) -> str:
 
 def clear_template_cache():
     """Clear the template content cache."""
-    load_template_content.cache_clear()
+    get_template_store().invalidate()
 
 
 def _get_template_name(template_id: str) -> str:
@@ -93,24 +94,16 @@ def _get_template_preview(file_path: str, max_length: int = 100) -> str:
     Returns:
         Template preview
     """
-    try:
-        if os.path.exists(file_path):
-            with open(file_path, "r", encoding="utf-8") as file:
-                content = file.read()
-                
-            if len(content) > max_length:
-                return content[:max_length] + "..."
-            return content
-    except Exception as e:
-        logger.error(f"Error reading template preview: {str(e)}")
+    template_file = get_template_store().get(file_path)
+    if template_file:
+        return template_file.preview(max_length)
         
     return "Error reading template"
 
 
-@lru_cache(maxsize=16)
 def get_template_metadata(template_id: str) -> Dict[str, str]:
     """
-    Get cached template metadata (name, subject, etc.)
+    Get template metadata (name, subject, etc.)
     
     Args:
         template_id: Template ID
@@ -125,11 +118,11 @@ def get_template_metadata(template_id: str) -> Dict[str, str]:
 
 
 def clear_metadata_cache():
-    """Clear the template metadata cache."""
-    get_template_metadata.cache_clear()
+    """Clear the template metadata cache (metadata is built from constant tables, so there is nothing to clear)."""
 
 
 def clear_all_caches():
     """Clear all template caches."""
     clear_template_cache()
     clear_metadata_cache()
+    clear_compiled_template_cache()
@@ -12,10 +12,10 @@ This module provides comprehensive template management including:
 import logging
 import os
 from typing import List, Dict, Any, Optional
-from datetime import datetime
 from pathlib import Path
 
 from ....core.config import get_settings
+from .template_store import get_template_store
 
 logger = logging.getLogger(__name__)
 
@@ -41,27 +41,29 @@ def get_email_templates(
     Returns:
         List of template dictionaries with id, name, and file path
     """
-    from .template_loader import _get_template_name, _get_template_subject, _get_template_preview
+    from .template_loader import _get_template_name, _get_template_subject
     
     templates = []
     settings = get_settings()
     template_dir = os.path.dirname(settings.DEFAULT_EMAIL_TEMPLATE_PATH)
+    store = get_template_store()
     
-    # Add predefined templates
+    # Add predefined templates (served from memory unless a file changed)
     for template_id, filename in TEMPLATE_MAPPINGS.items():
         file_path = os.path.join(template_dir, filename)
-        template_exists = os.path.exists(file_path)
+        template_file = store.get(file_path)
+        template_exists = template_file is not None
         
         # Create template info
         template = {
             "id": template_id,
             "name": _get_template_name(template_id),
             "subject": _get_template_subject(template_id),
-            "body": _get_template_preview(file_path) if template_exists else "Template file not found",
+            "body": template_file.preview() if template_exists else "Template file not found",
             "file_path": file_path,
             "exists": template_exists,
-            "created_date": datetime.fromtimestamp(os.path.getctime(file_path)).isoformat() if template_exists else None,
-            "modified_date": datetime.fromtimestamp(os.path.getmtime(file_path)).isoformat() if template_exists else None
+            "created_date": template_file.created_date if template_exists else None,
+            "modified_date": template_file.modified_date if template_exists else None
         }
         
         templates.append(template)
@@ -102,8 +104,11 @@ def get_template_by_id(template_id: str) -> Optional[Dict[str, Any]]:
     filename = TEMPLATE_MAPPINGS[template_id]
     file_path = os.path.join(template_dir, filename)
     
+    # Read the template content (from memory unless the file changed)
+    template_file = get_template_store().get(file_path)
+    
     # Check if the file exists
-    if not os.path.exists(file_path):
+    if template_file is None:
         # If the requested template doesn't exist, fall back to default
         if template_id != "default":
             logger.warning(f"Template {template_id} not found, falling back to default")
@@ -112,23 +117,15 @@ def get_template_by_id(template_id: str) -> Optional[Dict[str, Any]]:
             logger.error(f"Default template not found at {file_path}")
             return None
     
-    # Read the template content
-    try:
-        with open(file_path, "r", encoding="utf-8") as file:
-            body_template = file.read()
-            
-        return {
-            "id": template_id,
-            "name": _get_template_name(template_id),
-            "subject": _get_template_subject(template_id),
-            "body_template": body_template,
-            "file_path": file_path,
-            "created_date": datetime.fromtimestamp(os.path.getctime(file_path)).isoformat(),
-            "modified_date": datetime.fromtimestamp(os.path.getmtime(file_path)).isoformat()
-        }
-    except Exception as e:
-        logger.error(f"Error reading template file: {str(e)}")
-        return None
+    return {
+        "id": template_id,
+        "name": _get_template_name(template_id),
+        "subject": _get_template_subject(template_id),
+        "body_template": template_file.content,
+        "file_path": file_path,
+        "created_date": template_file.created_date,
+        "modified_date": template_file.modified_date
+    }
 
 
 def create_email_template(template_data: Dict[str, Any]) -> str:
@@ -153,6 +150,7 @@ def create_email_template(template_data: Dict[str, Any]) -> str:
         # Write the template content
         with open(file_path, "w", encoding="utf-8") as file:
             file.write(template_data.get("body", ""))
+        get_template_store().invalidate(file_path)
         
         return template_id
     except Exception as e:
@@ -187,6 +185,7 @@ def update_email_template(template_id: str, template_data: Dict[str, Any]) -> bo
         # Write the template content
         with open(file_path, "w", encoding="utf-8") as file:
             file.write(template_data.get("body", ""))
+        get_template_store().invalidate(file_path)
         
         return True
     except Exception as e:
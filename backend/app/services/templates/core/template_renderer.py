@@ -0,0 +1,57 @@
+"""
+Precompiled template rendering.
+
+A template body is parsed once into a list of segments (literal text
+alternating with {{placeholder}} names) and rendered with a single join,
+instead of one str.replace pass over the whole body per placeholder.
+Compiled templates are cached by body text; template files are cached by
+template_store.
+"""
+
+import re
+from functools import lru_cache
+from typing import Mapping, NamedTuple, Tuple
+
+PLACEHOLDER_PATTERN = re.compile(r"\{\{(\w+)\}\}")
+
+
+class CompiledTemplate(NamedTuple):
+    """Literal text at even indices of segments, placeholder names at odd indices"""
+    source: str
+    segments: Tuple[str, ...]
+    
+    @property
+    def placeholders(self) -> Tuple[str, ...]:
+        """Placeholder names in order of appearance (with repeats)"""
+        return self.segments[1::2]
+        
+    def render(self, values: Mapping[str, object]) -> str:
+        """
+        Fill in placeholders; ones without a value are left as they are.
+        
+        Args:
+            values: Placeholder name (without braces) -> value
+        """
+        segments = self.segments
+        parts = list(segments)
+        for i in range(1, len(segments), 2):
+            name = segments[i]
+            parts[i] = str(values[name]) if name in values else f"{{{{{name}}}}}"
+        return "".join(parts)
+
+
+@lru_cache(maxsize=64)
+def compile_template(source: str) -> CompiledTemplate:
+    """Parse a template body into segments (cached by body text)"""
+    # re.split with one group alternates literal text and placeholder names
+    return CompiledTemplate(source, tuple(PLACEHOLDER_PATTERN.split(source)))
+
+
+def render_template(source: str, values: Mapping[str, object]) -> str:
+    """Render a template body with placeholder values (name without braces -> value)"""
+    return compile_template(source).render(values)
+
+
+def clear_compiled_template_cache():
+    """Forget compiled templates"""
+    compile_template.cache_clear()
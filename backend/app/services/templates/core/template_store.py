@@ -0,0 +1,128 @@
+"""
+In-memory store of template files.
+
+Each template file is read and compiled once and served from memory, together
+with its preview and file dates, for as long as its mtime and size are
+unchanged. Checking costs one os.stat per access, which also picks up edits
+made outside the application (inotify is not used because the service also
+runs on Windows). Writes through the template manager invalidate the written
+file immediately.
+"""
+
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Dict, NamedTuple, Optional
+
+from .template_renderer import CompiledTemplate, compile_template
+
+logger = logging.getLogger(__name__)
+
+
+class TemplateFile(NamedTuple):
+    """A template file as read from disk"""
+    path: str
+    compiled: CompiledTemplate
+    mtime_ns: int
+    size: int
+    created: float
+    modified: float
+    
+    @property
+    def content(self) -> str:
+        return self.compiled.source
+        
+    @property
+    def created_date(self) -> str:
+        return datetime.fromtimestamp(self.created).isoformat()
+        
+    @property
+    def modified_date(self) -> str:
+        return datetime.fromtimestamp(self.modified).isoformat()
+        
+    def preview(self, max_length: int = 100) -> str:
+        """First max_length characters of the template"""
+        content = self.compiled.source
+        if len(content) > max_length:
+            return content[:max_length] + "..."
+        return content
+
+
+class TemplateStore:
+    """
+    Template files keyed by path, re-read only when the file changes.
+    
+    Thread-safe; share one instance through get_template_store().
+    """
+    
+    def __init__(self):
+        self._files: Dict[str, TemplateFile] = {}
+        self._lock = threading.Lock()
+        
+    def _key(self, file_path: str) -> str:
+        return os.path.normcase(os.path.abspath(file_path))
+        
+    def get(self, file_path: str) -> Optional[TemplateFile]:
+        """
+        Get a template file, reading it only if it changed since the last read.
+        
+        Returns:
+            The template file, or None if it does not exist or cannot be read
+        """
+        key = self._key(file_path)
+        try:
+            stat = os.stat(key)
+        except OSError:
+            self.invalidate(file_path)
+            return None
+            
+        with self._lock:
+            cached = self._files.get(key)
+        if cached and cached.mtime_ns == stat.st_mtime_ns and cached.size == stat.st_size:
+            return cached
+            
+        try:
+            with open(key, "r", encoding="utf-8") as file:
+                compiled = compile_template(file.read())
+        except Exception as e:
+            logger.error(f"Error reading template file {file_path}: {str(e)}")
+            return None
+            
+        template_file = TemplateFile(key, compiled, stat.st_mtime_ns, stat.st_size, stat.st_ctime, stat.st_mtime)
+        with self._lock:
+            self._files[key] = template_file
+        logger.info(f"Loaded template from {file_path}")
+        return template_file
+        
+    def invalidate(self, file_path: Optional[str] = None):
+        """Forget one template file, or every file"""
+        with self._lock:
+            if file_path is None:
+                self._files.clear()
+            else:
+                self._files.pop(self._key(file_path), None)
+
+
+_store: Optional[TemplateStore] = None
+_store_lock = threading.Lock()
+
+
+def get_template_store() -> TemplateStore:
+    """Get the shared template store"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = TemplateStore()
+        return _store
+
+
+def load_compiled_template_file(file_path: str) -> Optional[CompiledTemplate]:
+    """
+    Read and compile a template file, reusing the stored result while the file is unchanged.
+    
+    Returns:
+        The compiled template, or None if the file does not exist or cannot be read
+    """
+    template_file = get_template_store().get(file_path)
+    return template_file.compiled if template_file else None
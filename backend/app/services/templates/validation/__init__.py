@@ -11,11 +11,17 @@ This module provides functionality for validating email templates including:
 from .template_validator import (
     TemplateValidator,
     TemplateValidationError,
-    validate_template
+    TemplateScan,
+    scan_template,
+    validate_template,
+    validate_template_directory
 )
 
 __all__ = [
     'TemplateValidator',
     'TemplateValidationError',
-    'validate_template'
+    'TemplateScan',
+    'scan_template',
+    'validate_template',
+    'validate_template_directory'
 ]
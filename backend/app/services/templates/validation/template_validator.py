@@ -1,11 +1,119 @@
 import logging
 import os
 import re
-from typing import Dict, List, Optional, Tuple, Any
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Tuple, Any
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+# Constructs reported as potentially dangerous, by kind
+DANGEROUS_PATTERNS = {
+    "script": r'<script[^>]*>.*?</script>',
+    "javascript": r'javascript:',
+    "event_handler": r'on\w+\s*=',
+    "iframe": r'<iframe[^>]*>',
+    "object": r'<object[^>]*>',
+    "embed": r'<embed[^>]*>'
+}
+
+_PLACEHOLDER_SCANNER = re.compile(r'\{[^}]*\}')
+
+_DANGEROUS_SCANNERS = {
+    name: re.compile(pattern, re.IGNORECASE | re.DOTALL) for name, pattern in DANGEROUS_PATTERNS.items()
+}
+
+_HTML_TAG_PATTERN = re.compile(r'<[^>]+>')
+
+
+class TemplateScan(NamedTuple):
+    """Result of scanning a template once; offsets are character positions"""
+    placeholders: List[Tuple[int, str]]
+    open_braces: int
+    close_braces: int
+    unmatched_braces: List[int]
+    dangerous: List[Tuple[int, str, str]]
+
+
+def _brace_offsets(template_content: str, start: int, end: int) -> List[Tuple[int, bool]]:
+    """(offset, is_opening) of the braces between start and end, in order"""
+    offsets = []
+    for brace, is_opening in (("{", True), ("}", False)):
+        offset = template_content.find(brace, start, end)
+        while offset != -1:
+            offsets.append((offset, is_opening))
+            offset = template_content.find(brace, offset + 1, end)
+    offsets.sort()
+    return offsets
+
+
+def _unmatched_braces(template_content: str, placeholders: List[Tuple[int, str]]) -> List[int]:
+    """Offsets of the braces that do not pair up, walking placeholders and the braces around them in order"""
+    braces = []
+    position = 0
+    for start, text in placeholders:
+        braces.extend(_brace_offsets(template_content, position, start))
+        inner = 0
+        while inner != -1:
+            braces.append((start + inner, True))
+            inner = text.find("{", inner + 1)
+        position = start + len(text)
+        braces.append((position - 1, False))
+    braces.extend(_brace_offsets(template_content, position, len(template_content)))
+    
+    open_offsets = []
+    unmatched = []
+    for offset, is_opening in braces:
+        if is_opening:
+            open_offsets.append(offset)
+        elif open_offsets:
+            open_offsets.pop()
+        else:
+            unmatched.append(offset)
+    return sorted(unmatched + open_offsets)
+
+
+@lru_cache(maxsize=32)
+def scan_template(template_content: str) -> TemplateScan:
+    """
+    Scan a template for placeholders, unmatched braces and dangerous constructs.
+    
+    Placeholders are found like re.findall(r'\{[^}]*\}') and each dangerous
+    construct is one precompiled search. Braces are only walked one by one when
+    some of them are not a placeholder's own pair. Cached by content, so the
+    syntax, placeholder and info checks of one template share a single scan.
+    """
+    placeholders = [(match.start(), match.group()) for match in _PLACEHOLDER_SCANNER.finditer(template_content)]
+    open_braces = template_content.count("{")
+    close_braces = template_content.count("}")
+    
+    unmatched = []
+    if open_braces != len(placeholders) or close_braces != len(placeholders):
+        unmatched = _unmatched_braces(template_content, placeholders)
+    
+    dangerous = sorted(
+        (match.start(), name, match.group())
+        for name, scanner in _DANGEROUS_SCANNERS.items()
+        for match in scanner.finditer(template_content)
+    )
+    return TemplateScan(placeholders, open_braces, close_braces, unmatched, dangerous)
+
+
+def _format_offsets(offsets: List[int], limit: int = 10) -> str:
+    """'offset N' or 'offsets N, M, ...' for messages, listing at most limit offsets"""
+    if len(offsets) == 1:
+        return f"offset {offsets[0]}"
+    shown = ", ".join(str(offset) for offset in offsets[:limit])
+    if len(offsets) > limit:
+        shown += f", ... (+{len(offsets) - limit} more)"
+    return f"offsets {shown}"
+
+
+def _placeholder_names(template_content: str) -> set:
+    """Names of the non-empty placeholders in a template"""
+    return {placeholder[1:-1] for _, placeholder in scan_template(template_content).placeholders if len(placeholder) > 2}
+
 
 class TemplateValidationError(Exception):
     """Exception raised for template validation errors."""
@@ -32,6 +140,9 @@ class TemplateValidator:
         "{unsubscribe_link}": "Unsubscribe link"
     }
     
+    # Single pass over a template shared by the checks below
+    scan_template = staticmethod(scan_template)
+    
     @staticmethod
     def validate_template_syntax(template_content: str) -> Tuple[bool, List[str]]:
         """
@@ -49,36 +160,30 @@ class TemplateValidator:
             errors.append("Template content cannot be empty")
             return False, errors
         
-        # Check for unmatched braces
-        open_braces = template_content.count('{')
-        close_braces = template_content.count('}')
+        scan = scan_template(template_content)
         
-        if open_braces != close_braces:
-            errors.append(f"Unmatched braces: {open_braces} opening, {close_braces} closing")
+        # Check for unmatched braces
+        if scan.open_braces != scan.close_braces:
+            errors.append(f"Unmatched braces: {scan.open_braces} opening, {scan.close_braces} closing "
+                          f"({_format_offsets(scan.unmatched_braces)})")
+        elif scan.unmatched_braces:
+            # Counts agree but some braces close before they open, e.g. "}{"
+            logger.warning(f"Misordered braces in template ({_format_offsets(scan.unmatched_braces)})")
         
         # Check for malformed placeholders
-        placeholder_pattern = r'\{[^}]*\}'
-        placeholders = re.findall(placeholder_pattern, template_content)
-        
-        for placeholder in placeholders:
+        for offset, placeholder in scan.placeholders:
             if not placeholder.strip('{}'):
-                errors.append(f"Empty placeholder found: {placeholder}")
+                errors.append(f"Empty placeholder found: {placeholder} (offset {offset})")
             elif ' ' in placeholder.strip('{}'):
-                errors.append(f"Placeholder contains spaces: {placeholder}")
-        
-        # Check for potentially dangerous content
-        dangerous_patterns = [
-            r'<script[^>]*>.*?</script>',
-            r'javascript:',
-            r'on\w+\s*=',
-            r'<iframe[^>]*>',
-            r'<object[^>]*>',
-            r'<embed[^>]*>'
-        ]
-        
-        for pattern in dangerous_patterns:
-            if re.search(pattern, template_content, re.IGNORECASE | re.DOTALL):
-                errors.append(f"Potentially dangerous content detected: {pattern}")
+                errors.append(f"Placeholder contains spaces: {placeholder} (offset {offset})")
+        
+        # Check for potentially dangerous content, once per kind at its first occurrence
+        first_offsets = {}
+        for offset, kind, _ in scan.dangerous:
+            first_offsets.setdefault(kind, offset)
+        for kind, pattern in DANGEROUS_PATTERNS.items():
+            if kind in first_offsets:
+                errors.append(f"Potentially dangerous content detected: {pattern} (offset {first_offsets[kind]})")
         
         return len(errors) == 0, errors
     
@@ -97,8 +202,7 @@ class TemplateValidator:
         errors = []
         
         # Find all placeholders in the template
-        placeholder_pattern = r'\{([^}]+)\}'
-        found_placeholders = set(re.findall(placeholder_pattern, template_content))
+        found_placeholders = _placeholder_names(template_content)
         
         # Check for required placeholders
         if required_placeholders:
@@ -218,15 +322,14 @@ class TemplateValidator:
             Dictionary with template information
         """
         # Find all placeholders
-        placeholder_pattern = r'\{([^}]+)\}'
-        placeholders = list(set(re.findall(placeholder_pattern, template_content)))
+        placeholders = list(_placeholder_names(template_content))
         
         # Count characters and lines
         char_count = len(template_content)
         line_count = len(template_content.splitlines())
         
         # Check for HTML content
-        html_tags = re.findall(r'<[^>]+>', template_content)
+        html_tags = _HTML_TAG_PATTERN.findall(template_content)
         is_html = len(html_tags) > 0
         
         return {
@@ -296,3 +399,50 @@ def validate_template(template_id: str, template_content: Optional[str] = None,
         "errors": all_errors,
         "info": info
     }
+
+
+def validate_template_directory(template_dir: Optional[str] = None,
+                                max_workers: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Validate every template file in a directory in parallel.
+    
+    Args:
+        template_dir: Directory to validate (defaults to the directory of DEFAULT_EMAIL_TEMPLATE_PATH)
+        max_workers: Files validated at once (defaults to one per file, at most 8)
+        
+    Returns:
+        Dictionary mapping each file name to its validate_template result
+    """
+    if template_dir is None:
+        # Import here to avoid circular imports
+        from ....core.config import get_settings
+        template_dir = os.path.dirname(get_settings().DEFAULT_EMAIL_TEMPLATE_PATH)
+        
+    try:
+        file_names = sorted(
+            entry.name for entry in os.scandir(template_dir)
+            if entry.is_file() and entry.name.lower().endswith(('.txt', '.html', '.htm'))
+        )
+    except OSError as e:
+        logger.error(f"Error listing templates in {template_dir}: {str(e)}")
+        return {}
+        
+    if not file_names:
+        return {}
+        
+    workers = max_workers or min(8, len(file_names))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="template-validate") as executor:
+        futures = {
+            file_name: executor.submit(
+                validate_template, os.path.splitext(file_name)[0], file_path=os.path.join(template_dir, file_name)
+            )
+            for file_name in file_names
+        }
+        results = {file_name: future.result() for file_name, future in futures.items()}
+        
+    invalid = [file_name for file_name, result in results.items() if not result["is_valid"]]
+    if invalid:
+        for file_name in invalid:
+            logger.warning(f"Template {file_name} has issues: {'; '.join(results[file_name]['errors'][:5])}")
+    logger.info(f"Validated {len(results)} templates in {template_dir}, {len(invalid)} with issues")
+    return results
@@ -128,6 +128,7 @@ def test_connection(connection_params: Optional[Dict[str, Any]] = None) -> Tuple
 
 
 def get_db_connection():
-    """Create and return a connection to the database."""
-    conn_str = get_connection_string()
-    return pyodbc.connect(conn_str)
+    """Borrow a connection from the shared pool; close() returns it to the pool."""
+    # Import here to avoid circular imports
+    from ..services.database.core.connection_manager import get_connection_manager
+    return get_connection_manager().get_connection()
@@ -2,6 +2,8 @@ import os
 import logging
 import json
 import uuid
+import threading
+from collections import deque
 from datetime import datetime
 from logging.handlers import RotatingFileHandler
 from typing import List, Dict, Any, Optional
@@ -49,13 +51,92 @@ class SuccessLogFilter(logging.Filter):
         return ("success" in record.getMessage().lower() and 
                 record.levelno < logging.ERROR)
 
+class LogCache:
+    """
+    Ring buffer of recent log entries, indexed by email_id and process_id.
+    
+    Appending is O(1) once full: the deque drops the oldest entry, and the
+    oldest entry of an email or process is always at the front of its index
+    bucket, so the indexes are trimmed in O(1) too. Thread-safe.
+    """
+    
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries = deque(maxlen=max_size)
+        self._by_email: Dict[Any, deque] = {}
+        self._by_process: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+        
+    def __len__(self) -> int:
+        return len(self._entries)
+        
+    def _append_locked(self, entry: Dict[str, Any]):
+        email_id = entry.get("email_id")
+        process_id = entry.get("process_id")
+        
+        if len(self._entries) == self.max_size:
+            _, oldest_email_id, oldest_process_id = self._entries[0]
+            self._unindex_locked(self._by_email, oldest_email_id)
+            self._unindex_locked(self._by_process, oldest_process_id)
+            
+        # Keys are kept with the entry so eviction matches what was indexed
+        self._entries.append((entry, email_id, process_id))
+        if email_id is not None:
+            self._by_email.setdefault(email_id, deque()).append(entry)
+        if process_id is not None:
+            self._by_process.setdefault(process_id, deque()).append(entry)
+            
+    @staticmethod
+    def _unindex_locked(index: Dict[Any, deque], key):
+        if key is None:
+            return
+        bucket = index.get(key)
+        if bucket:
+            bucket.popleft()
+            if not bucket:
+                del index[key]
+                
+    def append(self, entry: Dict[str, Any]):
+        """Add an entry, dropping the oldest one if the buffer is full"""
+        with self._lock:
+            self._append_locked(entry)
+            
+    def extend(self, entries):
+        """Add entries in order, keeping only the most recent max_size"""
+        with self._lock:
+            for entry in entries:
+                self._append_locked(entry)
+                
+    def entries(self) -> List[Dict[str, Any]]:
+        """Snapshot of the cached entries, oldest first"""
+        with self._lock:
+            return [entry for entry, _, _ in self._entries]
+            
+    def for_email(self, email_id) -> List[Dict[str, Any]]:
+        """Cached entries of one email, oldest first"""
+        with self._lock:
+            return list(self._by_email.get(email_id, ()))
+            
+    def for_process(self, process_id: str) -> List[Dict[str, Any]]:
+        """Cached entries of one automation process, oldest first"""
+        with self._lock:
+            return list(self._by_process.get(process_id, ()))
+            
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_email.clear()
+            self._by_process.clear()
+
+
 class EmailLogger:
     """Enhanced logger for email transactions with detailed information"""
     
     def __init__(self):
         self.logger = self._setup_logger()
-        self._log_entries = []  # In-memory cache of recent log entries for quick retrieval
         self._max_cache_size = 500  # Maximum number of log entries to keep in memory
+        self._log_entries = LogCache(self._max_cache_size)  # In-memory cache of recent log entries for quick retrieval
+        self._load_lock = threading.Lock()
         self._process_start_times = {}  # Dictionary to track process start times
         self._current_process_id = None  # Track the current automation process
         self._active_processes = {}  # Track active processes with their details
@@ -379,16 +460,24 @@ class EmailLogger:
         # Add to in-memory cache for quick retrieval
         self._log_entries.append(log_data)
         
-        # Keep cache size in check
-        if len(self._log_entries) > self._max_cache_size:
-            self._log_entries = self._log_entries[-self._max_cache_size:]
-    
-    def get_recent_logs(self, limit: int = 1000, status_filter: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Get the most recent log entries, optionally filtered by status and deduplicated"""
-        if len(self._log_entries) == 0:
-            self._load_logs_from_file()
+    def get_recent_logs(self, limit: int = 1000, status_filter: Optional[str] = None,
+                        email_id: Optional[int] = None, process_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Get the most recent log entries, optionally filtered by status and deduplicated
             
-        filtered_logs = self._log_entries
+        Entries of one email or automation process come from the cache's indexes
+        instead of a scan over every cached entry.
+        """
+        if email_id is not None:
+            filtered_logs = self.get_logs_for_email(email_id)
+            if process_id is not None:
+                filtered_logs = [log for log in filtered_logs if log.get("process_id") == process_id]
+        elif process_id is not None:
+            filtered_logs = self.get_logs_for_process(process_id)
+        else:
+            if len(self._log_entries) == 0:
+                self._load_logs_from_file()
+            filtered_logs = self._log_entries.entries()
         
         # Apply status filter if provided
         if status_filter:
@@ -460,6 +549,18 @@ class EmailLogger:
         
         return deduplicated_logs
     
+    def get_logs_for_email(self, email_id: int) -> List[Dict[str, Any]]:
+        """Get the cached log entries of one email, oldest first"""
+        if len(self._log_entries) == 0:
+            self._load_logs_from_file()
+        return self._log_entries.for_email(email_id)
+        
+    def get_logs_for_process(self, process_id: str) -> List[Dict[str, Any]]:
+        """Get the cached log entries of one automation process, oldest first"""
+        if len(self._log_entries) == 0:
+            self._load_logs_from_file()
+        return self._log_entries.for_process(process_id)
+        
     def _create_log_key(self, log: Dict[str, Any]) -> str:
         """Create a unique key for a log entry to detect duplicates"""
         email_id = log.get("email_id")
@@ -499,6 +600,8 @@ class EmailLogger:
             return
             
         try:
+            # Only the last max_cache_size lines can end up in the cache
+            recent_entries = deque(maxlen=self._max_cache_size)
             with open(self.log_file_path, "r", encoding="utf-8") as f:
                 for line in f:
                     try:
@@ -508,20 +611,22 @@ class EmailLogger:
                         if len(parts) >= 3:
                             json_data = parts[2].strip()
                             log_entry = json.loads(json_data)
-                            self._log_entries.append(log_entry)
+                            recent_entries.append(log_entry)
                     except json.JSONDecodeError:
                         # Skip lines that don't contain valid JSON
                         continue
                         
-            # Keep only the most recent entries
-            self._log_entries = self._log_entries[-self._max_cache_size:]
+            # Concurrent readers of an empty cache load it once
+            with self._load_lock:
+                if len(self._log_entries) == 0:
+                    self._log_entries.extend(recent_entries)
         except Exception as e:
             self.logger.error(f"Error loading logs from file: {str(e)}")
     
     def clear_logs(self):
         """Clear all logs"""
         # Clear in-memory cache
-        self._log_entries = []
+        self._log_entries.clear()
         
         # Create a new empty log file
         try:
@@ -605,10 +710,6 @@ class EmailLogger:
             
         # Add to in-memory cache for quick retrieval
         self._log_entries.append(log_data)
-        
-        # Keep cache size in check
-        if len(self._log_entries) > self._max_cache_size:
-            self._log_entries = self._log_entries[-self._max_cache_size:]
 
     def start_process(self, process_id: Optional[str] = None, description: str = "Email Automation Process"):
         """
@@ -0,0 +1,65 @@
+-- Add claim/lease support to EmailRecords so several backend instances can drain the table
+USE EmailDB;
+GO
+
+-- Lease columns: which instance holds a 'Processing' row and until when
+IF NOT EXISTS (
+    SELECT 1
+FROM sys.columns c
+    JOIN sys.tables t ON c.object_id = t.object_id
+WHERE t.name = 'EmailRecords'
+    AND c.name = 'Lease_Owner'
+)
+BEGIN
+    PRINT 'Adding Lease_Owner and Lease_Expires columns...';
+
+    ALTER TABLE EmailRecords
+    ADD Lease_Owner NVARCHAR(100) NULL,
+        Lease_Expires DATETIME NULL;
+
+    PRINT 'Lease columns have been added.';
+END
+ELSE
+BEGIN
+    PRINT 'Lease columns already exist.';
+END
+GO
+
+-- Allow the 'Processing' status in the Email_Status check constraint
+DECLARE @constraint NVARCHAR(256);
+
+SELECT @constraint = cc.name
+FROM sys.check_constraints cc
+    JOIN sys.tables t ON cc.parent_object_id = t.object_id
+WHERE t.name = 'EmailRecords'
+    AND cc.definition LIKE '%Email_Status%'
+    AND cc.definition NOT LIKE '%Processing%';
+
+IF @constraint IS NOT NULL
+BEGIN
+    PRINT 'Updating Email_Status check constraint...';
+
+    EXEC('ALTER TABLE EmailRecords DROP CONSTRAINT ' + @constraint);
+    ALTER TABLE EmailRecords
+    ADD CONSTRAINT CK_EmailRecords_Status
+    CHECK (Email_Status IN ('Pending', 'Processing', 'Failed', 'Success'));
+
+    PRINT 'Email_Status now accepts Processing.';
+END
+ELSE
+BEGIN
+    PRINT 'Email_Status check constraint already accepts Processing.';
+END
+GO
+
+-- Claims look up Pending rows and expired Processing rows
+IF NOT EXISTS (
+    SELECT 1
+FROM sys.indexes
+WHERE name = 'IX_EmailRecords_Lease'
+    AND object_id = OBJECT_ID('EmailRecords')
+)
+BEGIN
+    CREATE INDEX IX_EmailRecords_Lease ON EmailRecords (Email_Status, Lease_Expires);
+END
+GO
@@ -7,12 +7,15 @@ CREATE TABLE EmailRecords
     Subject NVARCHAR(500) NOT NULL,
     File_Path NVARCHAR(1000) NULL,
     Email_Send_Date DATETIME NULL,
-    Email_Status NVARCHAR(50) DEFAULT 'Pending' CHECK (Email_Status IN ('Pending', 'Failed', 'Success')),
+    Email_Status NVARCHAR(50) DEFAULT 'Pending' CHECK (Email_Status IN ('Pending', 'Processing', 'Failed', 'Success')),
     Date DATETIME DEFAULT GETDATE(),
-    Reason NVARCHAR(MAX) NULL
+    Reason NVARCHAR(MAX) NULL,
+    Lease_Owner NVARCHAR(100) NULL,
+    Lease_Expires DATETIME NULL
 );
 
 -- Add indexes for better performance
 CREATE INDEX IX_EmailRecords_Status ON EmailRecords (Email_Status);
 CREATE INDEX IX_EmailRecords_SendDate ON EmailRecords (Email_Send_Date);
 CREATE INDEX IX_EmailRecords_Email ON EmailRecords (Email);
+CREATE INDEX IX_EmailRecords_Lease ON EmailRecords (Email_Status, Lease_Expires);
@@ -0,0 +1,48 @@
+"""
+Shared test setup.
+
+Settings are read from the environment, so the required values are filled in
+before the app is imported, with archives and logs kept in a temporary
+directory. Tests never open a real database connection; when the ODBC driver
+manager is not installed, a minimal pyodbc stand-in is registered instead.
+"""
+
+import os
+import sys
+import tempfile
+import types
+
+_TEST_DIR = tempfile.mkdtemp(prefix="email_automation_tests_")
+
+for name, value in {
+    "DB_SERVER": "test-server",
+    "DB_NAME": "test-db",
+    "DB_USER": "test-user",
+    "DB_PASSWORD": "test-password",
+    "DB_DRIVER": "ODBC Driver 17 for SQL Server",
+    "EMAIL_TABLE": "EmailRecords",
+}.items():
+    os.environ.setdefault(name, value)
+
+os.environ["EMAIL_ARCHIVE_PATH"] = os.path.join(_TEST_DIR, "archive")
+os.environ["LOG_DIR_PATH"] = os.path.join(_TEST_DIR, "logs")
+
+try:
+    import pyodbc  # noqa: F401
+except ImportError:
+    pyodbc = types.ModuleType("pyodbc")
+    
+    class Error(Exception):
+        pass
+        
+    class Connection:
+        pass
+        
+    def connect(*args, **kwargs):
+        raise Error("pyodbc is not available in the test environment")
+        
+    pyodbc.Error = Error
+    pyodbc.Connection = Connection
+    pyodbc.connect = connect
+    pyodbc.pooling = True
+    sys.modules["pyodbc"] = pyodbc
@@ -0,0 +1,147 @@
+"""Tests for the asyncio email sender"""
+
+import asyncio
+import email
+import threading
+from email import policy
+
+import pytest
+
+aiosmtplib = pytest.importorskip("aiosmtplib")
+
+from app.core.config import get_settings
+from app.services.email.core import async_email_sender
+from app.services.email.core import streaming_mime
+from app.services.email.core.async_email_sender import AsyncEmailSender, _send_with_client
+
+from test_streaming_mime import build_message
+
+
+class FakeSMTPServer:
+    """Minimal SMTP server recording the envelope and DATA of each message"""
+    
+    def __init__(self, refused=()):
+        self.refused = set(refused)
+        self.recipients = []
+        self.messages = []
+        
+    async def handle(self, reader, writer):
+        writer.write(b"220 localhost ready\r\n")
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            command = line.strip().upper()
+            if command.startswith(b"EHLO"):
+                writer.write(b"250-localhost\r\n250 OK\r\n")
+            elif command.startswith(b"RCPT"):
+                address = line.strip()[len(b"RCPT TO:"):].strip(b"<>").decode()
+                if address in self.refused:
+                    writer.write(b"550 No such user\r\n")
+                else:
+                    self.recipients.append(address)
+                    writer.write(b"250 OK\r\n")
+            elif command == b"DATA":
+                writer.write(b"354 Go ahead\r\n")
+                data = await reader.readuntil(b"\r\n.\r\n")
+                self.messages.append(data[:-len(b".\r\n")])
+                writer.write(b"250 Queued\r\n")
+            elif command == b"QUIT":
+                writer.write(b"221 Bye\r\n")
+                await writer.drain()
+                break
+            else:
+                writer.write(b"250 OK\r\n")
+            await writer.drain()
+        writer.close()
+        
+    async def send(self, msg):
+        server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            client = aiosmtplib.SMTP(hostname="127.0.0.1", port=port, start_tls=False)
+            await client.connect()
+            try:
+                await _send_with_client(client, msg)
+            finally:
+                await client.quit()
+
+
+def test_streams_attachments_off_the_event_loop(tmp_path, monkeypatch):
+    monkeypatch.setattr(streaming_mime, "_CHUNK_LINES", 3)
+    content = bytes(range(256)) * 40
+    msg = build_message(tmp_path, content)
+    
+    render_threads = set()
+    
+    def recording_iter(message):
+        for chunk in streaming_mime.iter_message_bytes(message):
+            render_threads.add(threading.current_thread())
+            yield chunk
+            
+    monkeypatch.setattr(async_email_sender, "iter_message_bytes", recording_iter)
+    smtp_server = FakeSMTPServer()
+    
+    asyncio.run(smtp_server.send(msg))
+    
+    assert threading.main_thread() not in render_threads
+    assert smtp_server.recipients == ["to@example.com", "hidden@example.com"]
+    data, = smtp_server.messages
+    assert b"\r\n..\r\n" in data
+    assert b"Bcc" not in data
+    assert msg["Bcc"] == "hidden@example.com"
+    
+    parsed = email.message_from_bytes(data.replace(b"\r\n..", b"\r\n."), policy=policy.default)
+    assert list(parsed.iter_parts())[1].get_content() == content
+
+
+def test_streamed_send_raises_when_every_recipient_is_refused(tmp_path):
+    msg = build_message(tmp_path, b"payload")
+    smtp_server = FakeSMTPServer(refused={"to@example.com", "hidden@example.com"})
+    
+    with pytest.raises(aiosmtplib.SMTPRecipientsRefused):
+        asyncio.run(smtp_server.send(msg))
+        
+    assert smtp_server.messages == []
+    assert msg["Bcc"] == "hidden@example.com"
+
+
+class FakeEmailSender:
+    def __init__(self, *args):
+        pass
+        
+    def _prepare_email(self, context, body, sender, gdrive_share_type, specific_emails):
+        return object(), None
+        
+    def _record_sent(self, context):
+        return None
+
+
+class SlowPool:
+    """Records how many messages are being delivered at once"""
+    
+    def __init__(self, *args):
+        self.active = 0
+        self.peak = 0
+        
+    async def send_message(self, msg):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+
+
+def test_concurrent_sends_are_bounded_by_setting(monkeypatch):
+    monkeypatch.setattr(get_settings(), "AUTOMATION_ASYNC_MAX_SENDS", 3)
+    monkeypatch.setattr(async_email_sender, "EmailSender", FakeEmailSender)
+    monkeypatch.setattr(async_email_sender, "AsyncSMTPSessionPool", SlowPool)
+    
+    async def run():
+        sender = AsyncEmailSender("smtp.example.com", 587, "user", "secret")
+        results = await asyncio.gather(*(sender._send({}, "body", None, "anyone", None) for _ in range(10)))
+        return sender, results
+        
+    sender, results = asyncio.run(run())
+    
+    assert results == [(True, None)] * 10
+    assert sender.smtp_pool.peak == 3
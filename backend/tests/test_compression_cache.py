@@ -0,0 +1,182 @@
+"""Tests for the content-addressed compression cache"""
+
+import os
+import threading
+import time
+
+from app.core.config import get_settings
+from app.services.email.core import attachment_manager, compression_cache
+from app.services.email.core.attachment_manager import AttachmentManager
+from app.services.email.core.compression_cache import CompressionCache, build_manifest_hash
+
+
+def make_folder(root, name, mtime=1_700_000_000):
+    folder = root / name
+    (folder / "sub").mkdir(parents=True)
+    (folder / "report.txt").write_bytes(b"report " * 100)
+    (folder / "sub" / "data.csv").write_bytes(b"1,2,3\n" * 50)
+    for path in (folder / "report.txt", folder / "sub" / "data.csv"):
+        os.utime(path, ns=(mtime * 10**9, mtime * 10**9))
+    return str(folder)
+
+
+def archive_creator(cache, calls):
+    def create(folder_path, zip_filename):
+        calls.append(folder_path)
+        path = os.path.join(cache.archive_path, zip_filename)
+        with open(path, "wb") as f:
+            f.write(folder_path.encode("utf-8"))
+        return path, os.path.getsize(path)
+    return create
+
+
+def test_identical_folders_get_different_keys(tmp_path):
+    first = make_folder(tmp_path / "a", "Invoices")
+    second = make_folder(tmp_path / "b", "Invoices")
+    
+    assert build_manifest_hash(first) != build_manifest_hash(second)
+    assert build_manifest_hash(first) == build_manifest_hash(first)
+
+
+def test_identical_folders_never_share_an_archive(tmp_path):
+    first = make_folder(tmp_path / "a", "Invoices")
+    second = make_folder(tmp_path / "b", "Invoices")
+    archive_path = tmp_path / "archive"
+    archive_path.mkdir()
+    cache = CompressionCache(str(archive_path), max_bytes=10**9)
+    calls = []
+    create = archive_creator(cache, calls)
+    
+    first_archive, _ = cache.get_or_create(first, create)
+    second_archive, _ = cache.get_or_create(second, create)
+    
+    assert calls == [first, second]
+    assert first_archive != second_archive
+    with open(second_archive, "rb") as f:
+        assert f.read() == second.encode("utf-8")
+
+
+def test_repeated_folder_is_compressed_once(tmp_path):
+    folder = make_folder(tmp_path, "Invoices")
+    archive_path = tmp_path / "archive"
+    archive_path.mkdir()
+    cache = CompressionCache(str(archive_path), max_bytes=10**9)
+    calls = []
+    
+    results = {cache.get_or_create(folder, archive_creator(cache, calls)) for _ in range(3)}
+    
+    assert len(calls) == 1
+    assert len(results) == 1
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_changed_folder_is_compressed_again(tmp_path):
+    folder = make_folder(tmp_path, "Invoices")
+    archive_path = tmp_path / "archive"
+    archive_path.mkdir()
+    cache = CompressionCache(str(archive_path), max_bytes=10**9)
+    calls = []
+    create = archive_creator(cache, calls)
+    
+    cache.get_or_create(folder, create)
+    (tmp_path / "Invoices" / "extra.txt").write_bytes(b"new")
+    cache.get_or_create(folder, create)
+    
+    assert len(calls) == 2
+
+
+def test_index_is_rebuilt_from_the_archive_directory(tmp_path):
+    folder = make_folder(tmp_path, "Invoices")
+    archive_path = tmp_path / "archive"
+    archive_path.mkdir()
+    calls = []
+    
+    first_cache = CompressionCache(str(archive_path), max_bytes=10**9)
+    archive, _ = first_cache.get_or_create(folder, archive_creator(first_cache, calls))
+    restarted = CompressionCache(str(archive_path), max_bytes=10**9)
+    
+    assert restarted.get_or_create(folder, archive_creator(restarted, calls))[0] == archive
+    assert len(calls) == 1
+
+
+def test_concurrent_requests_share_one_compression_and_drop_the_lock(tmp_path):
+    folder = make_folder(tmp_path, "Invoices")
+    archive_path = tmp_path / "archive"
+    archive_path.mkdir()
+    cache = CompressionCache(str(archive_path), max_bytes=10**9)
+    calls = []
+    create = archive_creator(cache, calls)
+    
+    def slow_create(folder_path, zip_filename):
+        time.sleep(0.05)
+        return create(folder_path, zip_filename)
+        
+    threads = [threading.Thread(target=cache.get_or_create, args=(folder, slow_create)) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+        
+    assert len(calls) == 1
+    assert cache._key_locks == {}
+
+
+def test_evict_removes_least_recently_used_archives(tmp_path, monkeypatch):
+    monkeypatch.setattr(compression_cache, "_MIN_EVICTION_AGE_SECONDS", 0)
+    archive_path = tmp_path / "archive"
+    archive_path.mkdir()
+    cache = CompressionCache(str(archive_path), max_bytes=10**9)
+    calls = []
+    folders = [make_folder(tmp_path / str(number), "Invoices") for number in range(3)]
+    archives = [cache.get_or_create(folder, archive_creator(cache, calls))[0] for folder in folders]
+    # Last used long ago, so none is protected by the minimum eviction age
+    for path in archives:
+        os.utime(path, (1, 1))
+        
+    removed = cache.evict(max_bytes=os.path.getsize(archives[2]))
+    
+    assert removed == 2
+    assert not os.path.exists(archives[0]) and not os.path.exists(archives[1])
+    assert os.path.exists(archives[2])
+
+
+def test_in_memory_zips_are_reused_per_folder(tmp_path):
+    first = make_folder(tmp_path / "a", "Invoices")
+    second = make_folder(tmp_path / "b", "Invoices")
+    cache = CompressionCache(str(tmp_path), max_bytes=10**9, memory_max_bytes=10**6)
+    calls = []
+    
+    def create(folder_path):
+        calls.append(folder_path)
+        return folder_path.encode("utf-8")
+        
+    results = [cache.get_or_create_in_memory(folder, create) for folder in (first, second, first, second)]
+    
+    assert calls == [first, second]
+    assert results == [first.encode("utf-8"), second.encode("utf-8")] * 2
+
+
+def test_in_memory_cache_is_bounded(tmp_path):
+    folders = [make_folder(tmp_path / str(number), "Invoices") for number in range(3)]
+    cache = CompressionCache(str(tmp_path), max_bytes=10**9, memory_max_bytes=250)
+    
+    for folder in folders:
+        cache.get_or_create_in_memory(folder, lambda folder_path: b"z" * 100)
+        
+    assert cache.stats()["memory_entries"] == 2
+    assert cache.stats()["memory_bytes"] == 200
+
+
+def test_attachment_manager_zips_small_folders_in_memory_once(tmp_path, monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "ATTACHMENT_IN_MEMORY_MAX_MB", 1)
+    folder = make_folder(tmp_path, "Invoices")
+    manager = AttachmentManager(str(tmp_path / "archive"))
+    zips = []
+    monkeypatch.setattr(attachment_manager, "_write_zip", lambda out, members, level: zips.append(members) or out.write(b"PK"))
+    
+    for _ in range(3):
+        data, size = manager.compress_folder_in_memory(folder, manager.get_folder_size(folder))
+        assert (data, size) == (b"PK", 2)
+        
+    assert len(zips) == 1
@@ -0,0 +1,198 @@
+"""Tests for the pooled database connections"""
+
+import threading
+import time
+
+import pytest
+
+from app.services.database.core import connection_manager
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        
+    def execute(self, *args):
+        if not self.connection.alive:
+            raise RuntimeError("connection lost")
+            
+    def fetchone(self):
+        return (1,)
+        
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.alive = True
+        self.closed = False
+        self.autocommit = False
+        self.commits = 0
+        self.rollbacks = 0
+        
+    def cursor(self):
+        return FakeCursor(self)
+        
+    def commit(self):
+        self.commits += 1
+        
+    def rollback(self):
+        if not self.alive:
+            raise RuntimeError("connection lost")
+        self.rollbacks += 1
+        
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def opened(monkeypatch):
+    connections = []
+    
+    def connect(*args, **kwargs):
+        connection = FakeConnection()
+        connections.append(connection)
+        return connection
+        
+    monkeypatch.setattr(connection_manager.pyodbc, "connect", connect)
+    return connections
+
+
+def make_pool(**kwargs):
+    options = dict(min_size=1, max_size=3, idle_timeout=300, max_lifetime=1800,
+                   validation_interval=30, acquire_timeout=0.2)
+    options.update(kwargs)
+    return connection_manager.ConnectionPool(connection_manager.ConnectionManager(), "DSN=test", **options)
+
+
+def test_released_connection_is_reused(opened):
+    pool = make_pool()
+    
+    first = pool.acquire()
+    raw = first.raw_connection
+    first.close()
+    second = pool.acquire()
+    
+    assert second.raw_connection is raw
+    assert len(opened) == 1
+    assert raw.rollbacks == 1
+    assert pool.stats() == {"size": 1, "idle": 0, "in_use": 1, "max_size": 3}
+
+
+def test_with_block_commits_only_without_error(opened):
+    pool = make_pool()
+    
+    with pool.acquire() as connection:
+        raw = connection.raw_connection
+    assert raw.commits == 1
+    
+    with pytest.raises(ValueError):
+        with pool.acquire():
+            raise ValueError("failed")
+    assert raw.commits == 1
+    assert raw.rollbacks == 2
+    assert pool.stats()["in_use"] == 0
+
+
+def test_double_close_returns_connection_once(opened):
+    pool = make_pool()
+    
+    pooled = pool.acquire()
+    pooled.close()
+    pooled.close()
+    
+    assert pool.stats()["idle"] == 1
+    assert pool.stats()["size"] == 1
+
+
+def test_pool_is_bounded_under_concurrency(opened):
+    pool = make_pool(acquire_timeout=5)
+    
+    def work():
+        for _ in range(50):
+            pooled = pool.acquire()
+            time.sleep(0.0005)
+            pooled.close()
+            
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+        
+    assert len(opened) <= pool.max_size
+    assert pool.stats()["in_use"] == 0
+
+
+def test_acquire_times_out_when_exhausted(opened):
+    pool = make_pool(max_size=2)
+    held = [pool.acquire(), pool.acquire()]
+    
+    with pytest.raises(TimeoutError):
+        pool.acquire()
+        
+    for pooled in held:
+        pooled.close()
+
+
+def test_failed_rollback_discards_connection(opened):
+    pool = make_pool()
+    
+    pooled = pool.acquire()
+    pooled.raw_connection.alive = False
+    pooled.close()
+    
+    assert opened[0].closed
+    assert pool.stats()["size"] == 0
+    assert pool.acquire().raw_connection is not opened[0]
+
+
+def test_stale_connection_is_validated_and_discarded(opened):
+    pool = make_pool(validation_interval=0)
+    
+    pooled = pool.acquire()
+    pooled.close()
+    opened[0].alive = False
+    replacement = pool.acquire()
+    
+    assert opened[0].closed
+    assert replacement.raw_connection is opened[1]
+    assert pool.stats()["size"] == 1
+
+
+def test_expired_connection_is_recycled(opened):
+    pool = make_pool(max_lifetime=0.05)
+    
+    pooled = pool.acquire()
+    pooled.close()
+    time.sleep(0.06)
+    replacement = pool.acquire()
+    
+    assert opened[0].closed
+    assert replacement.raw_connection is opened[1]
+
+
+def test_idle_connections_above_min_size_are_reaped(opened):
+    pool = make_pool(min_size=1, idle_timeout=0.05)
+    
+    held = [pool.acquire() for _ in range(3)]
+    for pooled in held:
+        pooled.close()
+    time.sleep(0.06)
+    pool.acquire().close()
+    
+    assert pool.stats()["size"] == 1
+    assert sum(connection.closed for connection in opened) == 2
+
+
+def test_close_all_refuses_checkouts(opened):
+    pool = make_pool()
+    pool.acquire().close()
+    
+    pool.close_all()
+    
+    assert opened[0].closed
+    assert pool.stats()["size"] == 0
+    with pytest.raises(RuntimeError):
+        pool.acquire()
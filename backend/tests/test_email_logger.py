@@ -0,0 +1,88 @@
+"""Tests for the in-memory log cache"""
+
+import pytest
+
+from app.utils.email_logger import EmailLogger, LogCache
+
+
+def entry(number, email_id=None, process_id=None):
+    return {"message": f"entry {number}", "email_id": email_id, "process_id": process_id}
+
+
+def test_cache_keeps_most_recent_entries():
+    cache = LogCache(3)
+    
+    cache.extend(entry(number) for number in range(5))
+    
+    assert len(cache) == 3
+    assert [item["message"] for item in cache.entries()] == ["entry 2", "entry 3", "entry 4"]
+
+
+def test_indexes_are_trimmed_with_the_buffer():
+    cache = LogCache(4)
+    
+    cache.append(entry(0, email_id=1, process_id="p1"))
+    cache.append(entry(1, email_id=2, process_id="p1"))
+    cache.append(entry(2, email_id=1))
+    cache.append(entry(3, process_id="p2"))
+    assert [item["message"] for item in cache.for_email(1)] == ["entry 0", "entry 2"]
+    
+    cache.append(entry(4, email_id=3, process_id="p2"))
+    cache.append(entry(5, email_id=1, process_id="p2"))
+    
+    assert [item["message"] for item in cache.for_email(1)] == ["entry 2", "entry 5"]
+    assert cache.for_email(2) == []
+    assert cache.for_process("p1") == []
+    assert [item["message"] for item in cache.for_process("p2")] == ["entry 3", "entry 4", "entry 5"]
+    assert 2 not in cache._by_email
+    assert "p1" not in cache._by_process
+
+
+@pytest.mark.parametrize("max_size", [1, 2, 7])
+def test_indexes_match_a_full_rebuild(max_size):
+    cache = LogCache(max_size)
+    
+    for number in range(40):
+        cache.append(entry(number, email_id=number % 3 or None, process_id=f"p{number % 4}"))
+        
+        entries = cache.entries()
+        for email_id in (1, 2):
+            assert cache.for_email(email_id) == [item for item in entries if item["email_id"] == email_id]
+        for process in range(4):
+            process_id = f"p{process}"
+            assert cache.for_process(process_id) == [item for item in entries if item["process_id"] == process_id]
+        assert sum(len(bucket) for bucket in cache._by_process.values()) == len(entries)
+
+
+def test_clear_empties_buffer_and_indexes():
+    cache = LogCache(3)
+    cache.append(entry(0, email_id=1, process_id="p1"))
+    
+    cache.clear()
+    
+    assert len(cache) == 0
+    assert cache.for_email(1) == [] and cache.for_process("p1") == []
+
+
+def make_logger(entries):
+    email_logger = EmailLogger.__new__(EmailLogger)
+    email_logger._log_entries = LogCache(50)
+    email_logger._log_entries.extend(entries)
+    return email_logger
+
+
+def test_recent_logs_of_one_email_or_process_use_the_indexes(monkeypatch):
+    entries = [
+        dict(entry(number, email_id=number % 3, process_id=f"p{number % 2}"), timestamp=f"2024-01-01 00:00:{number:02d}")
+        for number in range(12)
+    ]
+    email_logger = make_logger(entries)
+    monkeypatch.setattr(email_logger._log_entries, "entries", lambda: pytest.fail("scanned every entry"))
+    
+    by_email = email_logger.get_recent_logs(10, email_id=1)
+    by_process = email_logger.get_recent_logs(10, process_id="p0")
+    by_both = email_logger.get_recent_logs(10, email_id=1, process_id="p0")
+    
+    assert [log["message"] for log in by_email] == ["entry 10", "entry 7", "entry 4", "entry 1"]
+    assert [log["message"] for log in by_process] == [f"entry {number}" for number in (10, 8, 6, 4, 2, 0)]
+    assert [log["message"] for log in by_both] == ["entry 10", "entry 4"]
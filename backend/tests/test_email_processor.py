@@ -0,0 +1,91 @@
+"""Tests for the staged automation pipeline"""
+
+from unittest import mock
+
+from app.core.config import get_settings
+from app.models.email import EmailStatus
+from app.services.automation.core.state_manager import get_automation_state
+from app.services.automation.processing import email_processor
+
+
+class FakeSource:
+    def __init__(self, records):
+        self.records = list(records)
+        
+    def next_record(self):
+        return self.records.pop(0) if self.records else None
+
+
+class FakeUnits:
+    def current(self):
+        return None
+        
+    def close_all(self):
+        pass
+
+
+class FakeStatusWriter:
+    def __init__(self):
+        self.updates = []
+        
+    def add(self, email_id, status, reason=None, **dates):
+        self.updates.append((email_id, status, reason))
+
+
+class FailingSender:
+    """Raises while preparing the message for one email"""
+    
+    def __init__(self, failing_id):
+        self.failing_id = failing_id
+        
+    def prepare_message(self, email_id, **kwargs):
+        if email_id == self.failing_id:
+            raise RuntimeError("disk unavailable")
+        return object(), {}, None
+        
+    def deliver_message(self, msg, context):
+        return True, None
+
+
+def record(email_id):
+    return {"Email_ID": email_id, "Email": f"user{email_id}@example.com", "Subject": "Report", "File_Path": ""}
+
+
+def test_stage_errors_are_recorded_as_failed(monkeypatch):
+    state = get_automation_state()
+    monkeypatch.setitem(state, "email_source", FakeSource([record(1), record(2), record(3)]))
+    monkeypatch.setitem(state, "stop_requested", False)
+    monkeypatch.setitem(state, "pipeline", None)
+    monkeypatch.setitem(state, "summary", {"processed": 0, "successful": 0, "failed": 0, "pending": 0})
+    monkeypatch.setattr(get_settings(), "AUTOMATION_RENDER_WORKERS", 1)
+    monkeypatch.setattr(email_processor, "ThreadLocalUnitsOfWork", FakeUnits)
+    monkeypatch.setattr(email_processor, "email_logger", mock.Mock())
+    monkeypatch.setattr(email_processor, "_prepare_email_job", lambda email_record, *args: "body")
+    monkeypatch.setattr(
+        email_processor, "_build_send_arguments",
+        lambda email_record, body, sender: {"email_id": email_record["Email_ID"]}
+    )
+    status_writer = FakeStatusWriter()
+    
+    email_processor._run_pipeline(
+        FailingSender(failing_id=2), "sender@example.com", None, None, status_writer, "run-1", "*"
+    )
+    
+    statuses = {email_id: (status, reason) for email_id, status, reason in status_writer.updates}
+    assert len(status_writer.updates) == 3
+    assert statuses[1][0] == statuses[3][0] == EmailStatus.SUCCESS.value
+    assert statuses[2] == (EmailStatus.FAILED.value, "Error processing email: disk unavailable")
+    assert state["summary"]["successful"] == 2
+    assert state["summary"]["failed"] == 1
+
+
+def test_error_after_outcome_is_recorded_is_only_logged(monkeypatch):
+    monkeypatch.setitem(get_automation_state(), "summary", {"processed": 0, "successful": 0, "failed": 0, "pending": 0})
+    monkeypatch.setattr(email_processor, "email_logger", mock.Mock())
+    status_writer = FakeStatusWriter()
+    
+    email_processor._record_email_error(record(1), RuntimeError("log full"), status_writer, "run-1", "*", recorded=True)
+    
+    assert status_writer.updates == []
+    assert get_automation_state()["summary"]["failed"] == 0
+    email_processor.email_logger.log_error.assert_called_once()
@@ -0,0 +1,132 @@
+"""Tests for claiming and releasing email leases"""
+
+from datetime import datetime
+
+import pytest
+
+from app.services.automation.database import email_repository
+
+COLUMNS = ["Email_ID", "Company_Name", "Email", "Subject", "File_Path", "Email_Send_Date",
+           "Email_Status", "Date", "Reason", "Previous_Lease_Owner"]
+
+
+class FakeCursor:
+    def __init__(self, rows=(), rowcount=0, error=None):
+        self.rows = list(rows)
+        self.rowcount = rowcount
+        self.error = error
+        self.executed = []
+        self.description = [(column,) for column in COLUMNS]
+        
+    def execute(self, query, params=()):
+        self.executed.append((query, list(params)))
+        if self.error:
+            raise self.error
+            
+    def fetchall(self):
+        return self.rows
+
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.committed = False
+        self.closed = False
+        
+    def cursor(self):
+        return self._cursor
+        
+    def commit(self):
+        self.committed = True
+        
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def database(monkeypatch):
+    """Serve the given cursor through get_db_connection and return the connection"""
+    def install(cursor):
+        connection = FakeConnection(cursor)
+        monkeypatch.setattr(email_repository, "get_db_connection", lambda: connection)
+        return connection
+    return install
+
+
+def row(email_id, send_date, previous_owner=None):
+    return (email_id, "Company", "a@example.com", "Subject", "C:/files", send_date,
+            "Processing", None, None, previous_owner)
+
+
+def test_claim_returns_records_in_send_order(database):
+    cursor = FakeCursor(rows=[
+        row(3, datetime(2024, 1, 2)),
+        row(2, None),
+        row(1, datetime(2024, 1, 2)),
+        row(4, datetime(2024, 1, 1)),
+    ])
+    connection = database(cursor)
+    
+    records = email_repository._claim_emails("owner-1", batch_size=10, lease_seconds=60)
+    
+    assert [record["Email_ID"] for record in records] == [2, 4, 1, 3]
+    assert connection.committed and connection.closed
+    query, params = cursor.executed[0]
+    assert "UPDLOCK, READPAST" in query
+    assert "Email_ID IN" not in query
+    assert params == [10, "Pending", "Processing", "Processing", "owner-1", 60]
+
+
+def test_claim_filters_by_email_ids(database):
+    cursor = FakeCursor(rows=[row(7, None), row(9, None)])
+    database(cursor)
+    
+    records = email_repository._claim_emails("owner-1", batch_size=5, lease_seconds=60, email_ids=[7, 8, 9])
+    
+    assert [record["Email_ID"] for record in records] == [7, 9]
+    query, params = cursor.executed[0]
+    assert "AND Email_ID IN (?, ?, ?)" in query
+    assert params == [5, "Pending", "Processing", 7, 8, 9, "Processing", "owner-1", 60]
+
+
+def test_claim_with_no_email_ids_skips_the_database(database):
+    cursor = FakeCursor()
+    database(cursor)
+    
+    assert email_repository._claim_emails("owner-1", email_ids=[]) == []
+    assert cursor.executed == []
+
+
+def test_claim_reports_reclaimed_leases(database, caplog):
+    database(FakeCursor(rows=[row(5, None, previous_owner="dead-owner"), row(6, None)]))
+    
+    records = email_repository._claim_emails("owner-1", batch_size=10, lease_seconds=60)
+    
+    assert len(records) == 2
+    assert "Reclaimed 1 emails with expired leases: [5]" in caplog.text
+
+
+def test_claim_failure_returns_no_records(database):
+    connection = database(FakeCursor(error=RuntimeError("deadlock")))
+    
+    assert email_repository._claim_emails("owner-1", batch_size=10, lease_seconds=60) == []
+    assert not connection.committed
+    assert connection.closed
+
+
+def test_release_returns_rows_to_pending(database):
+    cursor = FakeCursor(rowcount=3)
+    connection = database(cursor)
+    
+    assert email_repository._release_claims("owner-1") == 3
+    query, params = cursor.executed[0]
+    assert "Lease_Owner = NULL" in query
+    assert params == ["Pending", "Processing", "owner-1"]
+    assert connection.committed and connection.closed
+
+
+def test_release_failure_returns_zero(database):
+    connection = database(FakeCursor(error=RuntimeError("connection lost")))
+    
+    assert email_repository._release_claims("owner-1") == 0
+    assert connection.closed
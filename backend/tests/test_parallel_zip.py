@@ -0,0 +1,59 @@
+"""Tests for the multi-core zip builder"""
+
+import random
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services.email.core import parallel_zip
+
+
+def write_members(tmp_path):
+    generator = random.Random(7)
+    contents = {
+        "folder/notes.txt": b"compressible text " * 5000,
+        "folder/sub/empty.txt": b"",
+        "folder/sub/noise.bin": generator.randbytes(50000),
+        "folder/photo.jpg": generator.randbytes(2000),
+        "folder/unicodé.csv": b"a,b,c\n1,2,3\n" * 100,
+        "folder/big.log": b"a large member streamed by the caller\n" * 20000,
+        "folder/big_noise.dat": generator.randbytes(300000),
+    }
+    members = []
+    for arcname, content in contents.items():
+        path = tmp_path.joinpath(*arcname.split("/"))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+        members.append((str(path), arcname))
+    return members, contents
+
+
+def test_archive_is_readable_by_zipfile(tmp_path, monkeypatch):
+    # Small limits so serial members and a full in-flight window are exercised
+    monkeypatch.setattr(parallel_zip, "_MAX_PARALLEL_MEMBER_BYTES", 200000)
+    monkeypatch.setattr(parallel_zip, "_MAX_BYTES_IN_FLIGHT", 60000)
+    members, contents = write_members(tmp_path)
+    zip_path = tmp_path / "out.zip"
+    
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        parallel_zip.write_parallel_zip(str(zip_path), members, executor, level=6)
+        
+    with zipfile.ZipFile(zip_path) as archive:
+        assert archive.testzip() is None
+        assert archive.namelist() == [arcname for _, arcname in members]
+        for arcname, content in contents.items():
+            assert archive.read(arcname) == content
+            
+        infos = {info.filename: info for info in archive.infolist()}
+        
+    assert infos["folder/notes.txt"].compress_type == zipfile.ZIP_DEFLATED
+    assert infos["folder/big.log"].compress_type == zipfile.ZIP_DEFLATED
+    assert infos["folder/photo.jpg"].compress_type == zipfile.ZIP_STORED
+    # Incompressible members are stored whether deflated by a worker or by the caller
+    assert infos["folder/sub/noise.bin"].compress_type == zipfile.ZIP_STORED
+    assert infos["folder/big_noise.dat"].compress_type == zipfile.ZIP_STORED
+
+
+def test_supports_parallel_zip_limits():
+    assert parallel_zip.supports_parallel_zip([("a", "a")], 1024)
+    assert not parallel_zip.supports_parallel_zip([("a", "a")], 0xFFFFFFFF)
+    assert not parallel_zip.supports_parallel_zip([("a", "a")] * 0xFFFF, 1024)
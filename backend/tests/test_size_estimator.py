@@ -0,0 +1,142 @@
+"""Tests for compressed-size prediction and pre-flight attachment routing"""
+
+import io
+import random
+import zipfile
+
+import pytest
+
+from app.services.email.core import email_sender
+from app.services.email.core.email_sender import (
+    ATTACHMENT_ROUTE_ATTACH, ATTACHMENT_ROUTE_GDRIVE, ATTACHMENT_ROUTE_REJECT, EmailSender
+)
+from app.services.email.core.size_estimator import CompressionEstimator
+
+MB = 1024 * 1024
+
+
+def actual_zip_size(files):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED, compresslevel=6) as archive:
+        for path, _ in files:
+            archive.write(path, path.name)
+    return len(buffer.getvalue())
+
+
+def test_sampled_estimate_is_close_to_the_real_archive(tmp_path):
+    generator = random.Random(15)
+    text = tmp_path / "notes.txt"
+    text.write_bytes(b"".join(f"line {number} of the report\n".encode() for number in range(20000)))
+    noise = tmp_path / "noise.dat"
+    noise.write_bytes(generator.randbytes(200000))
+    files = [(text, text.stat().st_size), (noise, noise.stat().st_size)]
+    estimator = CompressionEstimator(compression_level=6)
+    
+    estimate = estimator.estimate_files([(str(path), size) for path, size in files])
+    actual = actual_zip_size(files)
+    
+    assert abs(estimate - actual) / actual < 0.1
+
+
+def test_precompressed_files_count_at_full_size(tmp_path):
+    photo = tmp_path / "photo.jpg"
+    photo.write_bytes(b"\0" * 10000)
+    estimator = CompressionEstimator(compression_level=6)
+    
+    assert estimator.estimate_files([(str(photo), 10000)]) >= 10000
+
+
+def test_learned_ratios_replace_sampling(tmp_path, monkeypatch):
+    estimator = CompressionEstimator(compression_level=6)
+    estimator.learn(".csv", 2 * MB, MB // 2)
+    monkeypatch.setattr(estimator, "sample_ratio", lambda *args: pytest.fail("sampled a learned extension"))
+    
+    assert estimator.learned_ratio(".csv") == 0.25
+    assert estimator.estimate_files([(str(tmp_path / "data.csv"), 4 * MB)]) == pytest.approx(MB, rel=0.01)
+
+
+def test_ratios_are_learned_from_archives_and_kept(tmp_path):
+    archive_path = tmp_path / "built.zip"
+    with zipfile.ZipFile(archive_path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("big.log", b"same line again\n" * 100000)
+        archive.writestr("photo.jpg", b"\0" * 1000, compress_type=zipfile.ZIP_STORED)
+    state_path = tmp_path / "ratios.json"
+    
+    estimator = CompressionEstimator(str(state_path), compression_level=6)
+    estimator.learn_from_archive(str(archive_path))
+    estimator.flush()
+    restarted = CompressionEstimator(str(state_path), compression_level=6)
+    
+    assert restarted.learned_ratio(".log") is not None and restarted.learned_ratio(".log") < 0.05
+    assert restarted.learned_ratio(".jpg") is None
+
+
+class FakeAttachmentManager:
+    def __init__(self, estimate):
+        self.estimate = estimate
+        self.estimated = []
+        
+    def estimate_compressed_size(self, folder_path):
+        self.estimated.append(folder_path)
+        return self.estimate
+
+
+class FakeGDrive:
+    def __init__(self, available):
+        self.available = available
+        self.checks = 0
+        
+    def check_gdrive_availability(self):
+        self.checks += 1
+        return self.available, None if self.available else "no credentials"
+
+
+def make_sender(estimate, gdrive_available):
+    sender = EmailSender.__new__(EmailSender)
+    sender.attachment_manager = FakeAttachmentManager(estimate)
+    sender.gdrive_integration = FakeGDrive(gdrive_available)
+    return sender
+
+
+def test_small_folders_attach_without_estimating():
+    sender = make_sender(estimate=0, gdrive_available=True)
+    
+    assert sender._route_attachment("C:/files", email_sender.GDRIVE_UPLOAD_THRESHOLD) == (ATTACHMENT_ROUTE_ATTACH, None, None)
+    assert sender.attachment_manager.estimated == []
+    assert sender.gdrive_integration.checks == 0
+
+
+def test_large_folders_that_compress_well_attach():
+    threshold = email_sender.GDRIVE_UPLOAD_THRESHOLD
+    sender = make_sender(estimate=threshold // 2, gdrive_available=True)
+    
+    assert sender._route_attachment("C:/files", threshold * 3) == (ATTACHMENT_ROUTE_ATTACH, None, threshold // 2)
+    assert sender.gdrive_integration.checks == 0
+
+
+def test_large_archives_go_to_drive():
+    threshold = email_sender.GDRIVE_UPLOAD_THRESHOLD
+    sender = make_sender(estimate=threshold * 2, gdrive_available=True)
+    
+    assert sender._route_attachment("C:/files", threshold * 3) == (ATTACHMENT_ROUTE_GDRIVE, None, threshold * 2)
+
+
+def test_oversized_archives_without_drive_are_rejected():
+    estimate = email_sender.SAFE_MAX_SIZE * 3
+    sender = make_sender(estimate=estimate, gdrive_available=False)
+    
+    route, reason, estimated = sender._route_attachment("C:/files", estimate * 2)
+    
+    assert route == ATTACHMENT_ROUTE_REJECT
+    assert "too large" in reason
+    assert estimated == estimate
+
+
+def test_borderline_archives_without_drive_still_attach():
+    # Within the estimate margin of the limit, so the real archive may still fit
+    estimate = int(email_sender.SAFE_MAX_SIZE * 1.01)
+    sender = make_sender(estimate=estimate, gdrive_available=False)
+    
+    route, reason, _ = sender._route_attachment("C:/files", estimate * 2)
+    
+    assert (route, reason) == (ATTACHMENT_ROUTE_ATTACH, None)
@@ -0,0 +1,126 @@
+"""Tests for the persistent SMTP session"""
+
+import smtplib
+
+import pytest
+
+from app.services.email.core import smtp_manager
+from app.services.email.core.smtp_manager import SMTPManager
+
+
+class FakeSMTP:
+    instances = []
+    
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.logged_in = False
+        self.closed = False
+        self.noop_code = 250
+        self.sent = []
+        FakeSMTP.instances.append(self)
+        
+    def starttls(self):
+        pass
+        
+    def login(self, username, password):
+        if password == "wrong":
+            raise smtplib.SMTPAuthenticationError(535, b"bad credentials")
+        self.logged_in = True
+        
+    def noop(self):
+        if self.noop_code is None:
+            raise smtplib.SMTPServerDisconnected("gone")
+        return self.noop_code, b"OK"
+        
+    def quit(self):
+        self.closed = True
+        
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def smtp(monkeypatch):
+    FakeSMTP.instances = []
+    failures = []
+    
+    def send(server, msg):
+        if failures:
+            raise failures.pop(0)
+        server.sent.append(msg)
+        
+    monkeypatch.setattr(smtp_manager.smtplib, "SMTP", FakeSMTP)
+    monkeypatch.setattr(smtp_manager, "send_smtp_message", send)
+    return failures
+
+
+def make_manager(**kwargs):
+    options = dict(max_messages_per_session=100, keepalive_interval=60)
+    options.update(kwargs)
+    return SMTPManager("smtp.example.com", 587, "user", "secret", **options)
+
+
+def test_session_is_reused_across_messages(smtp):
+    manager = make_manager()
+    
+    for number in range(5):
+        manager.send_message(f"message {number}")
+        
+    assert len(FakeSMTP.instances) == 1
+    assert len(FakeSMTP.instances[0].sent) == 5
+    manager.close()
+    assert FakeSMTP.instances[0].closed
+
+
+def test_session_is_recycled_after_max_messages(smtp):
+    manager = make_manager(max_messages_per_session=2)
+    
+    for number in range(5):
+        manager.send_message(f"message {number}")
+        
+    assert [len(server.sent) for server in FakeSMTP.instances] == [2, 2, 1]
+    assert all(server.closed for server in FakeSMTP.instances[:2])
+
+
+def test_idle_session_is_probed_and_replaced(smtp):
+    manager = make_manager(keepalive_interval=0)
+    manager.send_message("first")
+    FakeSMTP.instances[0].noop_code = None
+    
+    manager.send_message("second")
+    
+    assert len(FakeSMTP.instances) == 2
+    assert FakeSMTP.instances[1].sent == ["second"]
+
+
+def test_disconnected_session_is_reconnected_once(smtp):
+    manager = make_manager()
+    manager.send_message("first")
+    smtp.append(smtplib.SMTPServerDisconnected("connection closed"))
+    
+    manager.send_message("second")
+    
+    assert len(FakeSMTP.instances) == 2
+    assert FakeSMTP.instances[1].sent == ["second"]
+
+
+def test_refused_recipients_keep_the_session(smtp):
+    manager = make_manager()
+    manager.send_message("first")
+    smtp.append(smtplib.SMTPRecipientsRefused({"x@example.com": (550, b"unknown")}))
+    
+    with pytest.raises(smtplib.SMTPRecipientsRefused):
+        manager.send_message("second")
+    manager.send_message("third")
+    
+    assert len(FakeSMTP.instances) == 1
+
+
+def test_failed_login_reports_and_closes(smtp):
+    manager = SMTPManager("smtp.example.com", 587, "user", "wrong", max_messages_per_session=100, keepalive_interval=60)
+    
+    ok, error = manager.check_smtp_connection()
+    
+    assert not ok and "bad credentials" in error
+    assert FakeSMTP.instances[0].closed
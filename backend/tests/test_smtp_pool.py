@@ -0,0 +1,157 @@
+"""Tests for the SMTP session pool and its per-server back-pressure"""
+
+import smtplib
+import threading
+import time
+
+import pytest
+
+from app.services.email.core import smtp_pool
+from app.services.email.core.smtp_pool import ServerLimiter, SMTPSessionPool
+
+
+class FakeManager:
+    """Stands in for SMTPManager inside the pool"""
+    
+    created = []
+    failures = []
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+    
+    def __init__(self, *args):
+        self.sent = []
+        self.closed = False
+        FakeManager.created.append(self)
+        
+    def send_message(self, msg):
+        with FakeManager.lock:
+            FakeManager.active += 1
+            FakeManager.peak = max(FakeManager.peak, FakeManager.active)
+            failure = FakeManager.failures.pop(0) if FakeManager.failures else None
+        try:
+            time.sleep(0.005)
+            if failure:
+                raise failure
+            self.sent.append(msg)
+        finally:
+            with FakeManager.lock:
+                FakeManager.active -= 1
+                
+    def check_smtp_connection(self):
+        return True, ""
+        
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def managers(monkeypatch):
+    FakeManager.created = []
+    FakeManager.failures = []
+    FakeManager.active = 0
+    FakeManager.peak = 0
+    monkeypatch.setattr(smtp_pool, "SMTPManager", FakeManager)
+    return FakeManager
+
+
+def make_pool(pool_size=3, max_concurrency=10, max_retries=3):
+    pool = SMTPSessionPool("smtp.example.com", 587, "user", "secret", pool_size=pool_size, max_retries=max_retries)
+    pool._limiter = ServerLimiter(max_concurrency, backoff_base=0.01, backoff_max=0.05)
+    return pool
+
+
+def throttled():
+    return smtplib.SMTPResponseException(421, b"Too many connections, slow down")
+
+
+def test_parallel_sends_share_a_bounded_set_of_sessions(managers):
+    pool = make_pool(pool_size=3)
+    
+    def work(worker):
+        for number in range(10):
+            pool.send_message(f"{worker}-{number}")
+            
+    threads = [threading.Thread(target=work, args=(worker,)) for worker in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+        
+    assert len(managers.created) <= 3
+    assert managers.peak <= 3
+    assert sum(len(manager.sent) for manager in managers.created) == 60
+    assert pool.stats()["idle"] == len(managers.created)
+    
+    pool.close()
+    assert all(manager.closed for manager in managers.created)
+
+
+def test_server_limit_caps_concurrency_below_pool_size(managers):
+    pool = make_pool(pool_size=5, max_concurrency=2)
+    
+    threads = [threading.Thread(target=pool.send_message, args=(number,)) for number in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+        
+    assert managers.peak <= 2
+
+
+def test_throttling_reply_is_retried_with_a_lower_limit(managers):
+    pool = make_pool(max_concurrency=8)
+    managers.failures.extend([throttled(), throttled()])
+    
+    pool.send_message("hello")
+    
+    assert sum(len(manager.sent) for manager in managers.created) == 1
+    assert pool._limiter.limit == 2
+
+
+def test_persistent_throttling_gives_up(managers):
+    pool = make_pool(max_retries=1)
+    managers.failures.extend([throttled(), throttled()])
+    
+    with pytest.raises(smtplib.SMTPResponseException):
+        pool.send_message("hello")
+
+
+def test_permanent_errors_are_not_retried(managers):
+    pool = make_pool()
+    managers.failures.append(smtplib.SMTPRecipientsRefused({"x@example.com": (550, b"no such user")}))
+    
+    with pytest.raises(smtplib.SMTPRecipientsRefused):
+        pool.send_message("hello")
+    assert pool._limiter.limit == 10
+
+
+def test_limiter_recovers_after_accepted_messages():
+    limiter = ServerLimiter(4, backoff_base=0.01)
+    limiter.record_throttle()
+    assert limiter.limit == 2
+    
+    for _ in range(2):
+        limiter.record_success()
+    assert limiter.limit == 3
+    for _ in range(3):
+        limiter.record_success()
+    assert limiter.limit == 4
+
+
+def test_limiter_pauses_sends_after_throttling():
+    limiter = ServerLimiter(4, backoff_base=0.2)
+    limiter.record_throttle()
+    
+    with pytest.raises(TimeoutError):
+        limiter.acquire(timeout=0.05)
+        
+    started = time.monotonic()
+    limiter.acquire(timeout=1)
+    assert time.monotonic() - started >= 0.1
+    limiter.release()
+
+
+def test_limiters_are_shared_per_server():
+    assert smtp_pool.get_server_limiter("SMTP.example.com", 587) is smtp_pool.get_server_limiter("smtp.example.com", 587)
+    assert smtp_pool.get_server_limiter("smtp.example.com", 587) is not smtp_pool.get_server_limiter("smtp.example.com", 465)
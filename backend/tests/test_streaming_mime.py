@@ -0,0 +1,94 @@
+"""Tests for streamed MIME generation"""
+
+import email
+from email import policy
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from app.services.email.core import streaming_mime
+from app.services.email.core.streaming_mime import FileAttachment, has_file_attachments, iter_message_bytes
+
+
+class FakeSMTP:
+    """Records the DATA stream of a send"""
+    
+    def __init__(self):
+        self.sent = b""
+        self.recipients = []
+        
+    def ehlo_or_helo_if_needed(self):
+        pass
+        
+    def mail(self, sender):
+        self.sender = sender
+        return 250, b"OK"
+        
+    def rcpt(self, address):
+        self.recipients.append(address)
+        return 250, b"OK"
+        
+    def docmd(self, command):
+        return 354, b"Go ahead"
+        
+    def send(self, data):
+        self.sent += data
+        
+    def getreply(self):
+        return 250, b"Queued"
+        
+    def rset(self):
+        pass
+
+
+def build_message(tmp_path, content: bytes):
+    path = tmp_path / "report.zip"
+    path.write_bytes(content)
+    
+    msg = MIMEMultipart()
+    msg["From"] = "sender@example.com"
+    msg["To"] = "to@example.com"
+    msg["Bcc"] = "hidden@example.com"
+    msg["Subject"] = "Monthly report"
+    msg.attach(MIMEText("Hello\n.\nA line with a dot above", "plain"))
+    msg.attach(FileAttachment(str(path), "report.zip"))
+    return msg
+
+
+def test_streamed_message_round_trips(tmp_path, monkeypatch):
+    # Small chunks so the attachment spans many of them
+    monkeypatch.setattr(streaming_mime, "_CHUNK_LINES", 3)
+    content = bytes(range(256)) * 40 + b"\x00tail"
+    msg = build_message(tmp_path, content)
+    
+    assert has_file_attachments(msg)
+    chunks = list(iter_message_bytes(msg))
+    assert len(chunks) > 5
+    assert all(chunk.endswith(b"\r\n") for chunk in chunks)
+    
+    parsed = email.message_from_bytes(b"".join(chunks), policy=policy.default)
+    body, attachment = parsed.iter_parts()
+    assert body.get_content().replace("\r\n", "\n").rstrip("\n") == "Hello\n.\nA line with a dot above"
+    assert attachment.get_filename() == "report.zip"
+    assert attachment.get_content() == content
+    
+    lines = b"".join(chunks).split(b"\r\n")
+    assert max(len(line) for line in lines if line and not line.startswith(b"Content-")) <= 998
+
+
+def test_send_stuffs_dots_and_hides_bcc(tmp_path):
+    msg = build_message(tmp_path, b"payload")
+    server = FakeSMTP()
+    
+    refused = streaming_mime.send_streamed_message(server, msg)
+    
+    assert refused == {}
+    assert server.recipients == ["to@example.com", "hidden@example.com"]
+    assert server.sent.endswith(b"\r\n.\r\n")
+    data = server.sent[:-len(b".\r\n")]
+    assert b"\r\n..\r\n" in data
+    assert b"Bcc" not in data
+    assert msg["Bcc"] == "hidden@example.com"
+    
+    unstuffed = data.replace(b"\r\n..", b"\r\n.")
+    parsed = email.message_from_bytes(unstuffed, policy=policy.default)
+    assert list(parsed.iter_parts())[1].get_content() == b"payload"
@@ -0,0 +1,39 @@
+"""Tests for precompiled template rendering"""
+
+from app.services.templates.core.template_renderer import compile_template, render_template
+
+
+def replace_each(source, values):
+    """Rendering as it was done before templates were compiled"""
+    for name, value in values.items():
+        source = source.replace(f"{{{{{name}}}}}", str(value))
+    return source
+
+
+def test_render_matches_per_placeholder_replace():
+    source = "Dear {{name}},\n\nInvoice {{invoice}} of {{amount}} is due.\nThanks, {{name}}\n"
+    values = {"name": "Ada", "invoice": 42, "amount": "1,000.00 EUR"}
+    
+    assert render_template(source, values) == replace_each(source, values)
+
+
+def test_placeholders_without_values_are_kept():
+    assert render_template("Hi {{name}}, see {{link}}", {"name": "Ada"}) == "Hi Ada, see {{link}}"
+
+
+def test_values_are_not_expanded_again():
+    assert render_template("{{a}} {{b}}", {"a": "{{b}}", "b": "x"}) == "{{b}} x"
+
+
+def test_text_without_placeholders_and_single_braces():
+    source = "Plain text with {single} braces and {{ spaced }} ones"
+    
+    assert render_template(source, {"single": "x", "spaced": "y"}) == source
+    assert compile_template(source).placeholders == ()
+
+
+def test_compiled_templates_are_cached_by_body():
+    compiled = compile_template("Hello {{name}} and {{name}}")
+    
+    assert compile_template("Hello {{name}} and {{name}}") is compiled
+    assert compiled.placeholders == ("name", "name")
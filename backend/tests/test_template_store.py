@@ -0,0 +1,81 @@
+"""Tests for the mtime-checked template store"""
+
+import os
+
+import pytest
+
+from app.core.config import get_settings
+from app.services.templates.core import template_manager
+from app.services.templates.core.template_store import TemplateStore, get_template_store
+
+
+def write(path, content, mtime_ns=None):
+    path.write_text(content, encoding="utf-8")
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_unchanged_file_is_served_from_memory(tmp_path, monkeypatch):
+    path = tmp_path / "default_template.txt"
+    write(path, "Hello {{name}}")
+    store = TemplateStore()
+    first = store.get(str(path))
+    
+    monkeypatch.setattr("builtins.open", lambda *args, **kwargs: pytest.fail("template re-read"))
+    
+    assert store.get(str(path)) is first
+    assert first.content == "Hello {{name}}"
+
+
+def test_file_changed_outside_the_app_is_reread(tmp_path):
+    path = tmp_path / "default_template.txt"
+    write(path, "Hello {{name}}", mtime_ns=1_700_000_000 * 10**9)
+    store = TemplateStore()
+    store.get(str(path))
+    
+    # Same size, newer mtime
+    write(path, "Howdy {{name}}", mtime_ns=1_700_000_100 * 10**9)
+    
+    assert store.get(str(path)).content == "Howdy {{name}}"
+
+
+def test_deleted_file_is_forgotten(tmp_path):
+    path = tmp_path / "default_template.txt"
+    write(path, "Hello")
+    store = TemplateStore()
+    store.get(str(path))
+    
+    path.unlink()
+    
+    assert store.get(str(path)) is None
+    assert store._files == {}
+
+
+@pytest.fixture
+def template_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_settings(), "DEFAULT_EMAIL_TEMPLATE_PATH", str(tmp_path / "default_template.txt"))
+    get_template_store().invalidate()
+    yield tmp_path
+    get_template_store().invalidate()
+
+
+def test_update_through_the_manager_invalidates_immediately(template_dir):
+    path = template_dir / "followup_template.txt"
+    mtime_ns = 1_700_000_000 * 10**9
+    write(path, "First {{name}}", mtime_ns=mtime_ns)
+    assert template_manager.get_template_by_id("followup")["body_template"] == "First {{name}}"
+    
+    template_manager.update_email_template("followup", {"body": "Again {{name}}"})
+    # Even an edit that keeps size and mtime is picked up
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+    
+    assert template_manager.get_template_by_id("followup")["body_template"] == "Again {{name}}"
+
+
+def test_missing_template_falls_back_to_default(template_dir):
+    write(template_dir / "default_template.txt", "Default body")
+    
+    template = template_manager.get_template_by_id("reminder")
+    
+    assert template["id"] == "default"
+    assert template["body_template"] == "Default body"
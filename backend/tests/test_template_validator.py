@@ -0,0 +1,91 @@
+"""Tests for the single-pass template scan"""
+
+import random
+import re
+
+import pytest
+
+from app.services.templates.validation.template_validator import DANGEROUS_PATTERNS, TemplateValidator, scan_template
+
+
+def reference_unmatched(template_content):
+    """Offsets of unmatched braces, walking every character"""
+    open_offsets = []
+    unmatched = []
+    for offset, char in enumerate(template_content):
+        if char == "{":
+            open_offsets.append(offset)
+        elif char == "}":
+            if open_offsets:
+                open_offsets.pop()
+            else:
+                unmatched.append(offset)
+    return sorted(unmatched + open_offsets)
+
+
+def random_templates(count):
+    generator = random.Random(24)
+    pieces = ["{", "}", "{name}", "{}", "{{", "}}", "a", " ", "\n", "<script>", "</script>",
+              "<iframe src=x>", "javascript:", "onload =", "<OBJECT>", "<embed", "{a{b}", "x}y{"]
+    for _ in range(count):
+        yield "".join(generator.choice(pieces) for _ in range(generator.randint(0, 30)))
+
+
+def assert_matches_regex_validators(template_content):
+    scan = scan_template(template_content)
+    
+    assert [text for _, text in scan.placeholders] == re.findall(r'\{[^}]*\}', template_content)
+    assert all(template_content.startswith(text, offset) for offset, text in scan.placeholders)
+    assert scan.open_braces == template_content.count("{")
+    assert scan.close_braces == template_content.count("}")
+    assert scan.unmatched_braces == reference_unmatched(template_content)
+    
+    found = {name for _, name, _ in scan.dangerous}
+    expected = {
+        name for name, pattern in DANGEROUS_PATTERNS.items()
+        if re.search(pattern, template_content, re.IGNORECASE | re.DOTALL)
+    }
+    assert found == expected
+    assert scan.dangerous == sorted(scan.dangerous)
+
+
+@pytest.mark.parametrize("template_content", [
+    "",
+    "Dear {recipient_name}, your invoice {invoice_number} is due {due_date}.",
+    "Unclosed {brace and a stray } here",
+    "<script>alert(1)</script><a onclick=\"x\">{link}</a>",
+])
+def test_scan_matches_regex_validators(template_content):
+    assert_matches_regex_validators(template_content)
+
+
+def test_scan_matches_regex_validators_on_random_templates():
+    for template_content in random_templates(2000):
+        assert_matches_regex_validators(template_content)
+
+
+def test_scan_is_cached_by_content():
+    scan_template.cache_clear()
+    
+    assert scan_template("Hello {name}") is scan_template("Hello {name}")
+
+
+def test_unmatched_brace_error_lists_offsets():
+    is_valid, errors = TemplateValidator.validate_template_syntax("Hi {name}, {x}} and more")
+    
+    assert not is_valid
+    assert errors == ["Unmatched braces: 2 opening, 3 closing (offset 14)"]
+
+
+def test_unmatched_brace_offsets_are_capped():
+    _, errors = TemplateValidator.validate_template_syntax("x" + "{" * 12)
+    
+    assert errors[0] == ("Unmatched braces: 12 opening, 0 closing "
+                         "(offsets 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, ... (+2 more))")
+
+
+def test_misordered_braces_are_warned_with_offsets(caplog):
+    is_valid, errors = TemplateValidator.validate_template_syntax("a } b { c")
+    
+    assert is_valid and errors == []
+    assert "Misordered braces in template (offsets 2, 6)" in caplog.text
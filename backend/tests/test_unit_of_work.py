@@ -0,0 +1,241 @@
+"""Tests for the per-run unit of work and the buffered status writer"""
+
+import threading
+import time
+
+import pytest
+
+from app.services.automation.database import status_writer, unit_of_work
+from app.services.automation.database.status_writer import BufferedStatusWriter
+from app.services.automation.database.unit_of_work import AutomationUnitOfWork
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.rowcount = 0
+        self.rows = []
+        self.closed = False
+        
+    def execute(self, query, params):
+        self.connection.executed.append((query, list(params)))
+        database = self.connection.database
+        if database.fail_next:
+            error, database.fail_next = database.fail_next, None
+            raise error
+        if "OUTPUT inserted.Email_ID" in query:
+            email_ids = list(params)[0::5][:query.count("CAST(? AS INT)")]
+            self.rows = [(email_id,) for email_id in email_ids if email_id not in self.connection.missing]
+        elif query.lstrip().startswith("UPDATE"):
+            email_id = params[-2] if "Lease_Owner = ?" in query else params[-1]
+            self.rowcount = 0 if email_id in self.connection.missing else 1
+        else:
+            self.rows = [("Pending", "a@example.com", "C:/files")]
+            
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+        
+    def fetchall(self):
+        return self.rows
+        
+    def close(self):
+        self.closed = True
+
+
+class FakeConnection:
+    def __init__(self, database):
+        self.database = database
+        self.executed = database.executed
+        self.missing = database.missing
+        self.commits = 0
+        self.rollbacks = 0
+        self.cursors = []
+        self.closed = False
+        
+    def cursor(self):
+        cursor = FakeCursor(self)
+        self.cursors.append(cursor)
+        return cursor
+        
+    def commit(self):
+        self.commits += 1
+        
+    def rollback(self):
+        self.rollbacks += 1
+        
+    def close(self):
+        self.closed = True
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.executed = []
+        self.missing = set()
+        self.fail_next = None
+        self.connections = []
+        
+    def connect(self):
+        connection = FakeConnection(self)
+        self.connections.append(connection)
+        return connection
+
+
+@pytest.fixture
+def database(monkeypatch):
+    fake = FakeDatabase()
+    monkeypatch.setattr(unit_of_work, "get_db_connection", fake.connect)
+    return fake
+
+
+def outcome(email_id, status="Success"):
+    return (email_id, status, None, None, None)
+
+
+def test_one_connection_and_one_cursor_per_statement(database):
+    with AutomationUnitOfWork() as uow:
+        for email_id in (1, 2, 3):
+            assert uow.validate_recipient_mapping(email_id, "a@example.com", "C:/files") == (True, None)
+            assert uow.update_email_status(email_id, "Success")
+            
+    assert len(database.connections) == 1
+    connection = database.connections[0]
+    assert len(connection.cursors) == 2
+    assert connection.commits == 3
+    assert connection.closed and all(cursor.closed for cursor in connection.cursors)
+
+
+def test_email_state_is_read_once_per_email(database):
+    uow = AutomationUnitOfWork()
+    
+    uow.validate_recipient_mapping(1, "a@example.com", "C:/files")
+    uow.validate_recipient_mapping(1, "a@example.com", "C:/files")
+    
+    assert sum("SELECT Email_Status" in query for query, _ in database.executed) == 1
+    uow.close()
+
+
+def test_dropped_connection_is_replaced_once(database):
+    uow = AutomationUnitOfWork()
+    uow.update_email_status(1, "Success")
+    
+    database.fail_next = unit_of_work.pyodbc.Error("communication link failure")
+    assert uow.update_email_status(2, "Success")
+    
+    assert len(database.connections) == 2
+    assert database.connections[0].closed
+    uow.close()
+
+
+def test_status_update_for_lost_lease_reports_false(database):
+    database.missing.add(7)
+    uow = AutomationUnitOfWork(lease_owner="owner-1")
+    
+    assert not uow.update_email_status(7, "Failed", reason="timeout")
+    query, params = database.executed[-1]
+    assert "Lease_Owner = ?" in query
+    assert params[-2:] == [7, "owner-1"]
+    uow.close()
+
+
+def test_bulk_update_is_chunked_and_committed_once(database, monkeypatch):
+    monkeypatch.setattr(unit_of_work, "_STATUS_UPDATE_CHUNK_SIZE", 3)
+    uow = AutomationUnitOfWork(lease_owner="owner-1")
+    
+    assert uow.update_email_statuses([outcome(email_id) for email_id in range(1, 8)]) == 7
+    
+    statements = [(query, params) for query, params in database.executed if "OUTPUT inserted.Email_ID" in query]
+    assert [len(params) for _, params in statements] == [16, 16, 6]
+    assert all(params[-1] == "owner-1" for _, params in statements)
+    assert "WHERE target.Lease_Owner = ?" in statements[0][0]
+    # Full chunks reuse one prepared statement
+    assert len(database.connections[0].cursors) == 2
+    assert database.connections[0].commits == 1
+    uow.close()
+
+
+def test_bulk_update_logs_rows_it_no_longer_holds(database, caplog):
+    database.missing.update({2, 4})
+    uow = AutomationUnitOfWork(lease_owner="owner-1")
+    
+    assert uow.update_email_statuses([outcome(email_id) for email_id in range(1, 6)]) == 3
+    assert "2 status updates matched no row held by this run" in caplog.text
+    assert "[2, 4]" in caplog.text
+    uow.close()
+
+
+def test_bulk_update_failure_rolls_back_and_raises(database):
+    uow = AutomationUnitOfWork()
+    uow.update_email_status(1, "Success")
+    database.fail_next = RuntimeError("constraint violation")
+    
+    with pytest.raises(RuntimeError):
+        uow.update_email_statuses([outcome(1), outcome(2)])
+    assert database.connections[0].rollbacks == 1
+    uow.close()
+
+
+class RecordingUnitOfWork:
+    """Stands in for AutomationUnitOfWork behind a BufferedStatusWriter"""
+    
+    def __init__(self, fail_bulk=False):
+        self.batches = []
+        self.single = []
+        self.fail_bulk = fail_bulk
+        self.lock = threading.Lock()
+        
+    def update_email_statuses(self, batch):
+        if self.fail_bulk:
+            raise RuntimeError("bulk update failed")
+        with self.lock:
+            self.batches.append([email_id for email_id, *_ in batch])
+        return len(batch)
+        
+    def update_email_status(self, email_id, status, reason=None, send_date=None, date=None):
+        self.single.append(email_id)
+        return email_id != 3
+
+
+def test_writer_flushes_full_batches():
+    uow = RecordingUnitOfWork()
+    writer = BufferedStatusWriter(uow, batch_size=3, flush_interval=60)
+    
+    for email_id in range(1, 8):
+        writer.add(email_id, "Success")
+        
+    assert uow.batches == [[1, 2, 3], [4, 5, 6]]
+    assert writer.pending_count() == 1
+    assert writer.close() == 1
+    assert uow.batches[-1] == [7]
+
+
+def test_writer_flushes_old_outcomes_without_new_adds():
+    uow = RecordingUnitOfWork()
+    writer = BufferedStatusWriter(uow, batch_size=100, flush_interval=0.2)
+    
+    writer.add(1, "Success")
+    deadline = time.monotonic() + 2
+    while writer.pending_count() and time.monotonic() < deadline:
+        time.sleep(0.02)
+        
+    assert uow.batches == [[1]]
+    writer.close()
+
+
+def test_writer_falls_back_to_single_rows(caplog):
+    uow = RecordingUnitOfWork(fail_bulk=True)
+    writer = BufferedStatusWriter(uow, batch_size=10, flush_interval=60)
+    for email_id in (1, 2, 3):
+        writer.add(email_id, "Failed", reason="smtp error")
+        
+    assert writer.close() == 2
+    assert uow.single == [1, 2, 3]
+    assert "1 status updates were not written" in caplog.text
+
+
+def test_writer_defaults_come_from_settings():
+    writer = BufferedStatusWriter(RecordingUnitOfWork())
+    settings = status_writer.get_settings()
+    
+    assert writer.batch_size == settings.AUTOMATION_STATUS_BATCH_SIZE
+    assert writer.flush_interval == settings.AUTOMATION_STATUS_FLUSH_SECONDS
+    writer.close()
@@ -0,0 +1,135 @@
+"""Tests for Drive upload deduplication"""
+
+import time
+
+import pytest
+
+from app.services.storage.gdrive import file_operations, upload_index
+from app.services.storage.gdrive.file_operations import GoogleDriveFileOperations
+from app.services.storage.gdrive.upload_index import DriveUploadIndex
+
+
+def uploaded(file_id):
+    return {"id": file_id, "webViewLink": f"https://drive.example.com/{file_id}", "webContentLink": None}
+
+
+def test_entries_round_trip_through_the_state_file(tmp_path):
+    state_path = str(tmp_path / "uploads.json")
+    index = DriveUploadIndex(state_path, ttl_seconds=3600)
+    
+    index.put("anyone:abc", uploaded("file-1"), ["anyone"])
+    index.add_shared("anyone:abc", ["b@example.com"])
+    restarted = DriveUploadIndex(state_path, ttl_seconds=3600)
+    
+    entry = restarted.get("anyone:abc")
+    assert entry["file_id"] == "file-1"
+    assert entry["shared"] == ["anyone", "b@example.com"]
+
+
+def test_expired_entries_are_dropped():
+    index = DriveUploadIndex(None, ttl_seconds=0.05)
+    index.put("anyone:abc", uploaded("file-1"), ["anyone"])
+    
+    time.sleep(0.06)
+    
+    assert index.get("anyone:abc") is None
+
+
+def test_invalidate_by_file_id():
+    index = DriveUploadIndex(None, ttl_seconds=3600)
+    index.put("anyone:abc", uploaded("file-1"), ["anyone"])
+    index.put("anyone:def", uploaded("file-2"), ["anyone"])
+    
+    assert index.invalidate(file_id="file-1") == 1
+    assert index.get("anyone:abc") is None
+    assert index.get("anyone:def") is not None
+
+
+def test_content_hash_is_remembered_and_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_index, "_MAX_REMEMBERED_HASHES", 2)
+    index = DriveUploadIndex(None, ttl_seconds=3600)
+    paths = []
+    for number in range(3):
+        path = tmp_path / f"archive{number}.zip"
+        path.write_bytes(b"same content")
+        paths.append(str(path))
+        
+    hashes = {index.content_hash(path) for path in paths}
+    
+    assert len(hashes) == 1
+    assert len(index._hashes) == 2
+
+
+def test_key_locks_are_dropped_once_released():
+    index = DriveUploadIndex(None, ttl_seconds=3600)
+    
+    with index.key_lock("anyone:abc"):
+        assert "anyone:abc" in index._key_locks
+        
+    assert index._key_locks == {}
+
+
+class FakeFileOperations(GoogleDriveFileOperations):
+    """Records uploads and shares instead of calling Drive"""
+    
+    def __init__(self):
+        self.uploads = []
+        self.shares = []
+        self.deleted = set()
+        
+    def _upload_and_share(self, file_path, folder_id, share_type, recipient_email, additional_emails):
+        file_id = f"file-{len(self.uploads) + 1}"
+        self.uploads.append((file_path, share_type, recipient_email))
+        return True, f"https://drive.example.com/{file_id}", None, uploaded(file_id), ["anyone"]
+        
+    def _share(self, file_id, share_type, recipient_email, additional_emails, file,
+               already_shared=(), verify_exists=False):
+        if file_id in self.deleted:
+            return None, "File not found", [], True
+        self.shares.append((file_id, recipient_email))
+        return f"https://drive.example.com/{file_id}", None, [recipient_email or "anyone"], False
+
+
+@pytest.fixture
+def operations(tmp_path, monkeypatch):
+    index = DriveUploadIndex(None, ttl_seconds=3600)
+    monkeypatch.setattr(file_operations, "get_drive_upload_index", lambda: index)
+    archive = tmp_path / "report.zip"
+    archive.write_bytes(b"zip bytes")
+    return FakeFileOperations(), str(archive)
+
+
+def test_anyone_links_upload_once(operations):
+    fake, archive = operations
+    
+    first = fake.upload_and_get_link(archive, share_type="anyone", recipient_email="a@example.com")
+    second = fake.upload_and_get_link(archive, share_type="anyone", recipient_email="b@example.com")
+    
+    assert first == (True, "https://drive.example.com/file-1", None)
+    assert second == (True, "https://drive.example.com/file-1", None)
+    assert len(fake.uploads) == 1
+
+
+def test_restricted_and_specific_shares_are_never_reused(operations):
+    fake, archive = operations
+    
+    fake.upload_and_get_link(archive, share_type="anyone")
+    links = [
+        fake.upload_and_get_link(archive, share_type=share_type, recipient_email=recipient)[1]
+        for share_type, recipient in (("restricted", "a@example.com"), ("specific", "b@example.com"),
+                                      ("restricted", "a@example.com"))
+    ]
+    
+    assert len(fake.uploads) == 4
+    assert len(set(links)) == 3
+
+
+def test_upload_deleted_on_drive_is_uploaded_again(operations):
+    fake, archive = operations
+    fake.upload_and_get_link(archive, share_type="anyone")
+    fake.deleted.add("file-1")
+    
+    success, link, _ = fake.upload_and_get_link(archive, share_type="anyone")
+    
+    assert success and link.endswith("file-2")
+    assert len(fake.uploads) == 2
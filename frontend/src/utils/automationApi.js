@@ -119,11 +119,13 @@ export const updateAutomationTemplate = async (templateId) => {
 };
 
 // Get automation logs (full logs)
-export const getAutomationLogs = async (limit = 100, filterStatus = null) => {
+export const getAutomationLogs = async (limit = 100, filterStatus = null, { emailId = null, processId = null } = {}) => {
   try {
     const queryParams = new URLSearchParams();
     if (limit) queryParams.append('limit', limit);
     if (filterStatus) queryParams.append('filter_status', filterStatus);
+    if (emailId !== null) queryParams.append('email_id', emailId);
+    if (processId) queryParams.append('process_id', processId);
     
     const response = await apiClient.get(`${API_BASE}/logs?${queryParams.toString()}`);
     return response;
@@ -134,11 +136,13 @@ export const getAutomationLogs = async (limit = 100, filterStatus = null) => {
 };
 
 // Get cleaned and deduplicated logs for frontend display
-export const getFrontendLogs = async (limit = 50, filterStatus = null) => {
+export const getFrontendLogs = async (limit = 50, filterStatus = null, { emailId = null, processId = null } = {}) => {
   try {
     const queryParams = new URLSearchParams();
     if (limit) queryParams.append('limit', limit);
     if (filterStatus) queryParams.append('filter_status', filterStatus);
+    if (emailId !== null) queryParams.append('email_id', emailId);
+    if (processId) queryParams.append('process_id', processId);
     
     const response = await apiClient.get(`${API_BASE}/logs/frontend?${queryParams.toString()}`);
     return response;